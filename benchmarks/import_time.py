@@ -0,0 +1,84 @@
+"""
+Checks that importing obsidian stays fast. Each import statement below is run
+in a fresh interpreter a few times, and the fastest time is compared against
+its budget. We also check that the heavy dependencies which obsidian loads
+lazily (see obsidian.lazy) haven't been loaded.
+
+Exits with status 1 if anything is over budget, so it can be run in CI:
+
+    python benchmarks/import_time.py
+
+Budgets are in milliseconds, and are deliberately loose (a few times what a
+typical laptop needs) so that this only catches real regressions, like a
+module-level import of drawSvg sneaking back in.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+
+# import statement -> budget in ms
+BUDGETS = {
+    "import obsidian": 20,
+    "from obsidian import Canvas, Group, ShapeGrid, EQ": 150,
+}
+
+# modules which must not be imported by any of the statements above
+LAZY_MODULES = ["numpy", "scipy", "drawSvg", "cairosvg", "cairocffi"]
+
+# ...and ones which particular statements mustn't import. a bare `import
+# obsidian` shouldn't even load pysmt, whose first environment imports every
+# solver backend it can find
+EXTRA_LAZY_MODULES = {
+    "import obsidian": ["pysmt", "z3", "mathsat", "CVC4", "yicespy", "picosat",
+                        "pycudd", "repycudd"],
+}
+
+PROBE = """
+import json, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+exec({stmt!r})
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed * 1000, [m for m in {lazy!r} if m in sys.modules]]))
+"""
+
+
+def measure(stmt, runs):
+    """Returns the fastest of `runs` timings of `stmt` (in ms), along with the
+    lazily loaded modules it imported."""
+    best = float("inf")
+    lazy = LAZY_MODULES + EXTRA_LAZY_MODULES.get(stmt, [])
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(stmt=stmt, lazy=lazy)],
+                             check=True, capture_output=True, text=True).stdout
+        elapsed, loaded = json.loads(out)
+        best = min(best, elapsed)
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5,
+                        help="times to run each import (fastest is used)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply every budget by this, e.g. for slow CI machines")
+    args = parser.parse_args()
+
+    failed = False
+    for stmt, budget in BUDGETS.items():
+        budget *= args.scale
+        elapsed, loaded = measure(stmt, args.runs)
+        ok = elapsed <= budget and not loaded
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {elapsed:7.1f}ms (budget {budget:.0f}ms)  {stmt}")
+        if loaded:
+            print(f"     imported eagerly: {', '.join(loaded)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
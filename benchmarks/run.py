@@ -0,0 +1,142 @@
+"""
+Runs the benchmark scenes (see scenes.py) at a range of sizes, and records
+how long each phase of building and rendering them takes, using the stats
+from Canvas.render(profile=True) plus the time taken to build the scene and
+serialize the SVG. Results are written as JSON.
+
+Usage:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --quick --scene grid --scene board
+    python benchmarks/run.py --output new.json --baseline old.json
+
+With --baseline, every phase which got slower than the baseline by more than
+--threshold (as a ratio) is reported, and the exit status is 1 if there are
+any. Phases faster than --min-time seconds in the baseline are ignored, since
+they're mostly noise.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+
+import pysmt
+
+from scenes import SCENES
+
+
+def run_scene(scene, size, repeat):
+    """Builds and renders `scene` at `size`, `repeat` times. Returns a dict
+    holding the median time of each phase, and the counters from the last
+    run."""
+    times = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        canvas = scene(size)
+        build = time.perf_counter() - start
+
+        canvas.render(profile=True)
+        start = time.perf_counter()
+        svg = canvas.rendered.asSvg()
+        output = time.perf_counter() - start
+
+        stats = canvas.stats
+        run_times = dict(stats.times, build=build, output=output)
+        run_times["total"] = build + stats.times["align"] \
+            + stats.times["constraints"] + stats.times["solve"] \
+            + stats.times["render"] + output
+        for phase, t in run_times.items():
+            times.setdefault(phase, []).append(t)
+
+    counters = dict(stats.counters, output_bytes=len(svg.encode()))
+    return {"times": {phase: statistics.median(ts) for phase, ts in times.items()},
+            "counters": counters,
+            "shapes": dict(stats.shapes)}
+
+
+def compare(results, baseline, threshold, min_time):
+    """Returns a list of (scene, size, phase, old, new) tuples, one for each
+    phase that got slower than `threshold` allows."""
+    old_results = {(r["scene"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = old_results.get((result["scene"], result["size"]))
+        if old is None:
+            continue
+        for phase, new_time in result["times"].items():
+            old_time = old["times"].get(phase)
+            if old_time is None or old_time < min_time:
+                continue
+            if new_time > old_time * threshold:
+                regressions.append((result["scene"], result["size"], phase,
+                                    old_time, new_time))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scene", action="append", choices=sorted(SCENES),
+                        help="scene to run (may be repeated; default: all)")
+    parser.add_argument("--size", action="append", type=int,
+                        help="size to run each scene at (may be repeated; "
+                             "default: each scene's own list)")
+    parser.add_argument("--quick", action="store_true",
+                        help="only run each scene's small sizes")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per scene and size (median is reported)")
+    parser.add_argument("--output", help="file to write JSON results to")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression")
+    parser.add_argument("--min-time", type=float, default=0.005,
+                        help="ignore phases faster than this in the baseline")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+    sys.setrecursionlimit(10000)  # pysmt recurses on deeply nested terms
+
+    results = []
+    for name in args.scene or sorted(SCENES):
+        scene, sizes, quick_sizes = SCENES[name]
+        for size in args.size or (quick_sizes if args.quick else sizes):
+            result = run_scene(scene, size, args.repeat)
+            results.append({"scene": name, "size": size, **result})
+            times = result["times"]
+            print(f"{name:<14} {size:>5}  total {times['total']:8.3f}s  "
+                  f"solve {times['solve']:8.3f}s  render {times['render']:8.3f}s",
+                  flush=True)
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "pysmt": pysmt.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_time)
+        for scene, size, phase, old, new in regressions:
+            print(f"REGRESSION {scene} {size} {phase}: "
+                  f"{old:.4f}s -> {new:.4f}s ({new / old:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
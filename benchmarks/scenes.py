@@ -0,0 +1,113 @@
+"""
+Synthetic scenes for benchmarking. Each scene function takes a size parameter
+and returns a Canvas ready to be rendered. What the size means depends on the
+scene (grid side length, chain length, nesting depth, ...); in every case,
+bigger is harder.
+"""
+
+from obsidian import Canvas, Group, ShapeGrid, EQ
+from obsidian.arrange import left_align, center_align_y, evenly_spaced
+from obsidian.geometry import Rectangle, Circle, Line, Point
+from obsidian.infix import ABOVE_BY, LEFT_BY
+from obsidian.symbols import XorSymbol, EqSymbol, Text
+
+
+FILL = {"fill": "#AA1010"}
+STROKE = {"stroke": "#101010", "stroke_width": 1}
+
+
+def grid(n):
+    """An n x n ShapeGrid of squares."""
+    squares = ShapeGrid(w=n, h=n, spacing=2,
+                        factory=Rectangle.factory(width=10, height=10, style=FILL))
+    return Canvas(squares, margin=4)
+
+
+def compact_grid(n):
+    """Like grid(), but using ShapeGrid's compact mode."""
+    squares = ShapeGrid(w=n, h=n, spacing=2, compact=True,
+                        factory=Rectangle.factory(width=10, height=10, style=FILL))
+    return Canvas(squares, margin=4)
+
+
+def above_chain(n):
+    """n rectangles of varying sizes, stacked with ABOVE_BY."""
+    rects = [Rectangle(width=5 + i % 7, height=3 + i % 5, style=FILL)
+             for i in range(n)]
+    constraints = [a |ABOVE_BY(2)| b for a, b in zip(rects, rects[1:])]
+    constraints.append(left_align(rects))
+    return Canvas(Group(rects, constraints), margin=4)
+
+
+def nested_groups(n):
+    """n levels of Groups, each holding the previous level plus a square."""
+    group = Group([Rectangle(width=10, height=10, style=FILL)])
+    for _ in range(n):
+        square = Rectangle(width=10, height=10, style=FILL)
+        group = Group([group, square], [
+            group |LEFT_BY(2)| square,
+            group.bounds.top_edge |EQ| square.y,
+        ])
+    return Canvas(group, margin=4)
+
+
+def board(n):
+    """A go board style scene: n x n lines between evenly spaced points on
+    the edges of a board, with a stone at every third intersection and a
+    label for each row and column."""
+    size = 20 * n + 40
+    bg = Rectangle(0, 0, size, size, {"fill": "#f2b06d"})
+    corners = (Point(20, 20), Point(size - 20, 20),
+               Point(20, size - 20), Point(size - 20, size - 20))
+    tl, tr, bl, br = corners
+    top, left, right, bottom = ([Point() for _ in range(n)] for _ in range(4))
+    constraints = [evenly_spaced(tl, tr, top), evenly_spaced(tl, bl, left),
+                   evenly_spaced(tr, br, right), evenly_spaced(bl, br, bottom)]
+
+    h_lines = [Line(a, b, STROKE) for a, b in zip(left, right)]
+    v_lines = [Line(a, b, STROKE) for a, b in zip(top, bottom)]
+    labels = [Text(str(i), 10, Point(10, pt.y), {"fill": "#000000"})
+              for i, pt in enumerate(left)]
+
+    stones = []
+    for i in range(0, n * n, 3):
+        stone = Circle(radius=8, style={"fill": "#000000"})
+        intersection = Point(v_lines[i % n].pt1.x, h_lines[i // n].pt1.y)
+        constraints.append(stone.center |EQ| intersection)
+        stones.append(stone)
+
+    group = Group([bg] + h_lines + v_lines + labels + stones, constraints)
+    return Canvas(group)
+
+
+def symbols(n):
+    """A row of n alternating XorSymbols and EqSymbols."""
+    shapes = [XorSymbol(diameter=20, style=STROKE) if i % 2 == 0
+              else EqSymbol(w=20, h=6, style=STROKE)
+              for i in range(n)]
+    constraints = [a |LEFT_BY(5)| b for a, b in zip(shapes, shapes[1:])]
+    constraints.append(center_align_y(shapes))
+    return Canvas(Group(shapes, constraints), margin=4)
+
+
+def symbol_instances(n):
+    """Like symbols(), but placing template instances of the symbols (see
+    obsidian.templates)."""
+    shapes = [XorSymbol.instance(diameter=20, style=STROKE) if i % 2 == 0
+              else EqSymbol.instance(w=20, h=6, style=STROKE)
+              for i in range(n)]
+    constraints = [a |LEFT_BY(5)| b for a, b in zip(shapes, shapes[1:])]
+    constraints.append(center_align_y(shapes))
+    return Canvas(Group(shapes, constraints), margin=4)
+
+
+# scene name -> (scene function, default sizes, quick sizes)
+SCENES = {
+    "grid": (grid, [10, 20, 40], [5, 10]),
+    "compact_grid": (compact_grid, [10, 40, 100], [5, 20]),
+    "above_chain": (above_chain, [50, 200, 800], [20, 100]),
+    "nested_groups": (nested_groups, [5, 20, 60], [5, 10]),
+    "board": (board, [9, 19, 40], [9, 13]),
+    "symbols": (symbols, [10, 50, 200], [10, 20]),
+    "symbol_instances": (symbol_instances, [10, 50, 200], [10, 20]),
+}
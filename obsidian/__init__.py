@@ -3,40 +3,42 @@
 
 __all__ = ("Canvas", "Alignments", "TOP_LEFT", "TOP_RIGHT", "BOT_LEFT",
         "BOT_RIGHT", "CENTER", "Group", "ShapeGrid", "EQ", "NE", "arrange",
-        "geometry", "symbols")
-
-
-from .canvas import Canvas
-from .canvas import Alignments, TOP_LEFT, TOP_RIGHT, BOT_LEFT, BOT_RIGHT, CENTER
-from .groups import Group, ShapeGrid
-from .infix import EQ, NE
-
-
-# here we patch a bug in pysmt so we can use our infix operators
-
-# in brief: pysmt FNode instances override __or__, but when they get an
-# unrecognized `other` argument they raise an exception instead of returning
-# NotImplemented. Returning NotImplemented would cause Python to attempt to
-# delegate to the right-hand argument's __ror__ method, and would raise a
-# ValueError only if that is also unsuccessful. This is the expected behavior.
-
-# to fix this, we wrap FNode.__or__ with a handler that catches the exception
-# and returns NotImpelemented so that Python's usual semantics are restored.
-
-
-from functools import wraps
-from pysmt.fnode import FNode
-from pysmt.exceptions import PysmtTypeError
-
-
-def make_wrapper(f):
-    @wraps(f)
-    def wrapper(*args, **kwargs):
-        try:
-            return f(*args, **kwargs)
-        except PysmtTypeError:
-            return NotImplemented
-    return wrapper
-
-
-FNode.__or__ = make_wrapper(FNode.__or__)
+        "geometry", "symbols", "session", "render_many")
+
+
+# these are imported on first access rather than up front, since importing
+# them means importing pysmt, which takes a while. obsidian.lazy does the same
+# for our other heavy dependencies (numpy, scipy and drawSvg). see PEP 562 for
+# how module-level __getattr__ works
+
+_lazy_attrs = {
+    "Canvas": "canvas",
+    "Alignments": "canvas",
+    "TOP_LEFT": "canvas",
+    "TOP_RIGHT": "canvas",
+    "BOT_LEFT": "canvas",
+    "BOT_RIGHT": "canvas",
+    "CENTER": "canvas",
+    "Group": "groups",
+    "ShapeGrid": "groups",
+    "EQ": "infix",
+    "NE": "infix",
+    "session": "environments",
+    "render_many": "canvas",
+}
+
+
+def __getattr__(name):
+    from importlib import import_module
+    if name in _lazy_attrs:
+        value = getattr(import_module("." + _lazy_attrs[name], __name__), name)
+    elif name in ("arrange", "geometry", "symbols"):
+        value = import_module("." + name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # so we only get here once per name
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
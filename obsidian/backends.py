@@ -0,0 +1,198 @@
+"""
+SMT solver backends. By default, formulas which need an SMT solver go to
+whichever solver pysmt prefers. A Backend lets the caller pick the solver
+(by its pysmt name, e.g. "z3" or "msat") and the logic, and put a time limit
+on solving.
+
+It can also run a portfolio: the formula is sent to several solvers at once,
+each in its own process, and whichever answers first wins. The others are
+killed. Different solvers are fast on different layouts, so this bounds the
+worst case to that of the best solver for the job.
+
+Example:
+>>> canvas.render(solver_name="z3", timeout=5)
+>>> canvas.render(portfolio=["z3", "msat", "cvc4"], timeout=5)
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Sequence
+
+from pysmt.exceptions import SolverReturnedUnknownResultError
+from pysmt.logics import convert_logic_from_string
+from pysmt.shortcuts import Solver, get_env
+
+from obsidian.components import serialize, deserialize
+
+
+# pysmt's z3 solvers all work in z3's main context, which isn't thread-safe,
+# so only one thread at a time gets to use a solver in this process
+solver_lock = threading.RLock()
+
+
+# thrown when a solver runs out of time before finding an answer
+class SolverTimeout(Exception): pass
+
+# thrown when no solver in a portfolio could handle the formula
+class BackendError(Exception): pass
+
+
+@dataclass
+class Backend:
+    """Says which SMT solver(s) to use, and for how long.
+
+    `timeout` (in seconds) covers every SMT solve made through the backend,
+    counting from when the backend is created. Formulas the linear engine
+    handles don't count against it.
+
+    `portfolio` is a list of solver names to race against each other, or True
+    to race every installed solver that supports `logic`. If it's given,
+    `solver_name` is ignored.
+
+    Backends can be pickled, so they can be passed to executors along with
+    the formulas they should solve.
+    """
+
+    solver_name: str = None
+    logic: str = None
+    timeout: float = None
+    portfolio: Sequence[str] = None
+
+    def __post_init__(self):
+        # wall-clock time, so that it means the same thing in other processes
+        self.deadline = None if self.timeout is None else time.time() + self.timeout
+
+    def remaining(self):
+        """Returns the number of seconds left, or None if there's no limit.
+        Raises SolverTimeout if there are none left."""
+        if self.deadline is None:
+            return None
+        remaining = self.deadline - time.time()
+        if remaining <= 0:
+            raise SolverTimeout(f"no time left to solve (timeout was {self.timeout}s)")
+        return remaining
+
+    def solver_names(self):
+        if self.portfolio is True:
+            with solver_lock:  # see chosen_solver_name()
+                factory = get_env().factory
+            return list(factory.all_solvers(convert_logic_from_string(self.logic)))
+        return list(self.portfolio)
+
+    def chosen_solver_name(self):
+        """Returns the name of the solver solve() uses when there's no
+        portfolio: `solver_name`, or else the one pysmt prefers for `logic`
+        (None if there isn't one)."""
+        if self.solver_name is not None:
+            return self.solver_name
+        # an environment's factory is built on first use, by importing every
+        # solver module pysmt knows of, which isn't safe to do from several
+        # threads at once
+        with solver_lock:
+            factory = get_env().factory
+        available = factory.all_solvers(convert_logic_from_string(self.logic))
+        return next((name for name in factory.solver_preference_list
+                     if name in available), None)
+
+    def installed_solvers(self):
+        with solver_lock:  # see chosen_solver_name()
+            return get_env().factory.all_solvers()
+
+    def solve(self, formula):
+        """Returns a dict mapping the symbols of `formula` to their values, or
+        None if `formula` is unsatisfiable."""
+        remaining = self.remaining()
+        if self.portfolio is not None:
+            return race(formula, self.solver_names(), self.logic, remaining)
+
+        name = self.chosen_solver_name()
+        if (remaining is not None and name != "z3"
+                and name in self.installed_solvers()):
+            # only z3 can be interrupted in-process, so give the others a
+            # process. (this doesn't need the lock, nor a solver of our own)
+            return race(formula, [name], self.logic, remaining)
+
+        with solver_lock, Solver(name=self.solver_name, logic=self.logic) as solver:
+            solver.add_assertion(formula)
+            if remaining is not None:
+                # converting the formula can take a while, so check again
+                solver.z3.set(timeout=max(1, int(self.remaining() * 1000)))
+            return check(solver, formula)
+
+
+def check(solver, formula):
+    """Solves what's been asserted in `solver`, and returns the values of
+    `formula`'s symbols (or None)."""
+    try:
+        if not solver.solve():
+            return None
+    except SolverReturnedUnknownResultError:
+        raise SolverTimeout("solver gave up (probably out of time)") from None
+    model = solver.get_model()
+    return {sym: model[sym].constant_value()
+            for sym in formula.get_free_variables()}
+
+
+def race(formula, solver_names, logic, timeout):
+    """Solves `formula` with each of `solver_names` in parallel, in separate
+    processes, and returns the first answer (as with Backend.solve()). The
+    losing processes are killed."""
+    if not solver_names:
+        raise BackendError(f"no solvers available for logic {logic}")
+
+    symbols = {sym.symbol_name(): sym for sym in formula.get_free_variables()}
+    script = serialize(formula)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=race_worker, daemon=True,
+                                       args=(name, logic, script, results))
+               for name in solver_names]
+    for worker in workers:
+        worker.start()
+
+    deadline = None if timeout is None else time.time() + timeout
+    errors = []
+    try:
+        while len(errors) < len(workers):
+            # wake up now and then to check that the workers are still alive
+            wait = 1 if deadline is None else min(1, max(0, deadline - time.time()))
+            try:
+                name, ok, values = results.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and time.time() >= deadline:
+                    raise SolverTimeout(f"no solver finished within {timeout:.3g}s") from None
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    raise BackendError("solver processes exited without answering") from None
+                continue
+            if not ok:
+                errors.append(f"{name}: {values}")
+                continue
+            if values is None:
+                return None
+            return {symbols[name]: val for name, val in values.items()}
+        raise BackendError("every solver failed:\n" + "\n".join(errors))
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.kill()
+            worker.join()
+        results.close()
+
+
+def race_worker(name, logic, script, results):
+    """Process entry point for race(). Reports back a 3-tuple (name, ok,
+    values), where `values` is a name-keyed dict, or None if the formula is
+    unsatisfiable, or an error message if not `ok`."""
+    try:
+        formula = deserialize(script)
+        with Solver(name=name, logic=logic) as solver:
+            solver.add_assertion(formula)
+            values = check(solver, formula)
+    except Exception as e:
+        results.put((name, False, f"{type(e).__name__}: {e}"))
+        return
+    if values is not None:
+        values = {sym.symbol_name(): val for sym, val in values.items()}
+    results.put((name, True, values))
@@ -0,0 +1,275 @@
+"""
+A content-addressed cache for solved models.
+
+Re-rendering the same diagram means building the same constraint formula, up
+to the names of the symbols created with FreshSymbol (which depend on how many
+symbols were created beforehand). So we canonicalize the formula by renaming
+its symbols in order of first occurrence, hash the result, and use that hash
+as the key for the solved values. Keys are stable across processes, which
+makes an on-disk store worthwhile.
+
+Cached values are checked against the formula before they're used, so a stale
+or corrupt entry just means a cache miss.
+
+Example:
+>>> cache = SolveCache(path="~/.cache/obsidian")
+>>> canvas.render(cache=cache)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+
+import pysmt
+import pysmt.operators as op
+
+
+# bump this whenever the canonical form or the on-disk format changes
+FORMAT_VERSION = 1
+
+# relative tolerance used when checking cached values against a formula
+TOLERANCE = 1e-6
+
+# once the on-disk store outgrows max_bytes, it's cut back to this fraction of
+# it, so that the next few stores don't have to evict again
+EVICT_TO = 0.9
+
+
+class Canonical:
+    """A formula's cache key, along with its symbols listed in canonical order
+    (i.e. in order of first occurrence)."""
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.symbols = []
+        self.key = self.digest()
+
+    def digest(self):
+        symbols = self.symbols
+        ids = {}
+        h = hashlib.sha256(f"v{FORMAT_VERSION} pysmt {pysmt.__version__}\n".encode())
+
+        # iterative post-order walk, visiting args from left to right
+        stack = [(self.formula, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node in ids:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((arg, False) for arg in reversed(node.args()))
+                continue
+
+            if node.is_symbol():
+                desc = f"s{len(symbols)}:{node.symbol_type()}"
+                symbols.append(node)
+            elif node.is_constant():
+                desc = f"c{node.constant_type()}:{node.constant_value()}"
+            else:
+                args = ",".join(str(ids[arg]) for arg in node.args())
+                desc = f"{op.op_to_str(node.node_type())}({args})"
+            ids[node] = len(ids)
+            h.update(desc.encode())
+            h.update(b"\n")
+
+        return h.hexdigest()
+
+
+class SolveCache:
+    """Maps canonical formulas to solved values. Keeps up to `maxsize` entries
+    in an in-memory LRU and, if `path` is given, also keeps entries on disk in
+    that directory, evicting the least recently used ones once the store
+    exceeds `max_bytes`.
+
+    The store's size is only counted (by scanning the directory) on the
+    first put and after each eviction; in between, the cache adds up what it
+    writes itself. Other processes' writes to the same directory are noticed
+    at the next scan."""
+
+    def __init__(self, path=None, maxsize=128, max_bytes=64*2**20):
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()  # for everything below, so threads can share the cache
+        self.maxsize = maxsize
+        self.path = None if path is None else os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.disk_bytes = None  # roughly how big the store is (None until scanned)
+        self.hits = self.misses = 0
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    def get(self, canonical):
+        """Returns a {symbol: value} dict for `canonical`'s formula, or None."""
+        with self.lock:
+            values = self.memory.get(canonical.key)
+            if values is not None:
+                self.memory.move_to_end(canonical.key)
+        if values is None:
+            values = self.load(canonical.key)
+
+        if values is not None and len(values) == len(canonical.symbols):
+            values = dict(zip(canonical.symbols, values))
+            if not satisfied(canonical.formula, values):
+                values = None
+        else:
+            values = None
+
+        with self.lock:
+            if values is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return values
+
+    def put(self, canonical, values):
+        """Stores `values`, a dict which maps each of `canonical`'s symbols to
+        a number."""
+        values = tuple(Fraction(values[sym]) for sym in canonical.symbols)
+        self.remember(canonical.key, values)
+        if self.path is not None:
+            self.store(canonical.key, values)
+
+    def remember(self, key, values):
+        with self.lock:
+            memory = self.memory
+            memory[key] = values
+            memory.move_to_end(key)
+            while len(memory) > self.maxsize:
+                memory.popitem(last=False)
+
+    def filename(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def load(self, key):
+        if self.path is None:
+            return None
+        fname = self.filename(key)
+        try:
+            with open(fname) as f:
+                values = tuple(Fraction(v) for v in json.load(f))
+            os.utime(fname)  # mark as recently used
+        except (OSError, ValueError, TypeError):
+            return None
+        self.remember(key, values)
+        return values
+
+    def store(self, key, values):
+        fname = self.filename(key)
+        tmp = f"{fname}.{os.getpid()}.tmp"
+        data = json.dumps([str(v) for v in values])
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, fname)  # atomic, so readers never see partial files
+
+        with self.lock:
+            if self.disk_bytes is not None:
+                self.disk_bytes += len(data)  # (over-counts overwrites; harmless)
+            full = self.disk_bytes is None or self.disk_bytes > self.max_bytes
+        if full:
+            self.evict()
+
+    def evict(self):
+        """Counts up the store, and if it's over max_bytes, removes the least
+        recently used entries until it's down to EVICT_TO of that."""
+        entries = []
+        total = 0
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+        with self.lock:
+            self.disk_bytes = total
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.path is not None:
+                for name in os.listdir(self.path):
+                    if name.endswith(".json"):
+                        os.remove(os.path.join(self.path, name))
+                self.disk_bytes = 0
+
+
+def satisfied(formula, values):
+    """Cheaply checks whether `values` (a {symbol: number} dict) satisfies
+    `formula`, by evaluating it in floating point. Comparisons are made with a
+    small relative tolerance, since the linear engine's solutions may be off
+    in the last few bits. Anything we don't know how to evaluate counts as
+    unsatisfied."""
+    try:
+        return evaluate_formula(formula, values) is True
+    except (KeyError, ZeroDivisionError):
+        return False
+
+
+def evaluate_formula(formula, values):
+    """Evaluates `formula` in floating point, given a {symbol: number} dict.
+    Raises KeyError if it runs into anything evaluate() doesn't support."""
+    results = {}
+    stack = [(formula, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node in results:
+            continue
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((arg, False) for arg in node.args())
+            continue
+        results[node] = evaluate(node, [results[arg] for arg in node.args()], values)
+    return results[formula]
+
+
+def close(a, b):
+    return abs(a - b) <= TOLERANCE * (1 + max(abs(a), abs(b)))
+
+
+def evaluate(node, args, values):
+    """Evaluates a single node given its args' values. Raises KeyError for
+    anything we don't support."""
+    if node.is_symbol():
+        return float(values[node])
+    if node.is_bool_constant():
+        return node.constant_value()
+    if node.is_constant():
+        return float(node.constant_value())
+    if node.is_plus():
+        return sum(args)
+    if node.is_minus():
+        return args[0] - args[1]
+    if node.is_times():
+        result = 1.0
+        for arg in args:
+            result *= arg
+        return result
+    if node.is_div():
+        return args[0] / args[1]
+    if node.is_ite():
+        return args[1] if args[0] else args[2]
+    if node.is_equals():
+        return close(*args)
+    if node.is_le():
+        return args[0] <= args[1] or close(*args)
+    if node.is_lt():
+        return args[0] < args[1]
+    if node.is_and():
+        return all(args)
+    if node.is_or():
+        return any(args)
+    if node.is_not():
+        return not args[0]
+    raise KeyError(node)
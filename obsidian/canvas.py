@@ -1,14 +1,31 @@
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
 from functools import wraps
+from numbers import Real as ABCReal
 
 from .groups import Group
+from .display import DisplayList, style_join
 from .helpers import N, maybe_get_from_model
+from .incremental import SolverSession
+from .solve import AUTO
+from .stats import RenderStats, NULL_STATS, recording
+from .stream import SvgWriter
+from .css import StyleSheet
+from .environments import session, using
 from .infix import EQ
 from .geometry import Rectangle, Circle, Line, Point
 from .symbols import Text
+from .lazy import LazyModule, available
 
-import drawSvg as draw
+from pysmt.shortcuts import get_env
+
+draw = LazyModule("drawSvg")
+cairo = LazyModule("cairocffi")
 
 
 Alignments = Enum("Alignments", "TOP_LEFT TOP_RIGHT BOT_LEFT BOT_RIGHT CENTER")
@@ -21,75 +38,75 @@ class ModelCache:
         self.cache = cache
 
     def __getitem__(self, item):
+        return self.model[item]
+
+    def value(self, item):
         cache = self.cache
         if item not in cache:
-            cache[item] = self.model[item]
+            cache[item] = self.model.value(item)
         return cache[item]
 
 
-def M(sym, drawing):
+def M(val, drawing):
     """
-    Intended for y-coordinates. Works like N(), but also flips the value along
-    the y-axis. An act of open rebellion against drawSvg.
+    Intended for y-coordinates. Takes a number (or a solved symbol, like N()),
+    and flips its value along the y-axis. An act of open rebellion against
+    drawSvg.
 
     In Obsidian, the origin is in the top left with the +y direction pointing
     down. drawSvg places it in the bottom left, with +y pointing upward. This
     function simplifies conversions. Some render methods may need additional
     adjustment (e.g. render_rect must additionally adjust by rect height).
     """
-    return drawing.height - N(sym)
-
-
-def style_join(base, extra):
-    return dict(base, **extra)  # only works because we know all style dict keys will be str - we'll have to change this if they ever become something else (eg Enum elements)
+    return drawing.height - (val if isinstance(val, ABCReal) else N(val))
 
 
 def render_rect(rect, model, target, style=None):
     style = style_join(style or {}, rect.style)
     assert len(style) > 0
-    w = N(model[rect.width])
-    h = N(model[rect.height])
-    x = N(model[rect.x])
-    y = M(model[rect.y], target) - h
+    w = model.value(rect.width)
+    h = model.value(rect.height)
+    x = model.value(rect.x)
+    y = M(model.value(rect.y), target) - h
     target.append(draw.Rectangle(x, y, w, h, **style))
 
 
 def render_circle(circle, model, target, style=None):
     style = style_join(style or {}, circle.style)
     assert len(style) > 0
-    x = N(model[circle.x])
-    y = M(model[circle.y], target)
-    r = N(model[circle.radius])
+    x = model.value(circle.x)
+    y = M(model.value(circle.y), target)
+    r = model.value(circle.radius)
     target.append(draw.Circle(x, y, r, **style))
 
 
 def render_line(line, model, target, style=None):
     style = style_join(style or {}, line.style)
     assert len(style) > 0
-    x1, y1 = N(model[line.pt1.x]), M(model[line.pt1.y], target)
-    x2, y2 = N(model[line.pt2.x]), M(model[line.pt2.y], target)
+    x1, y1 = model.value(line.pt1.x), M(model.value(line.pt1.y), target)
+    x2, y2 = model.value(line.pt2.x), M(model.value(line.pt2.y), target)
     target.append(draw.Line(x1, y1, x2, y2, **style))
 
 
 def render_text(text, model, target, style=None):
     style = style_join(style or {}, text.style)
     assert len(style) > 0
-    x = N(model[text.anchor_point.x])
-    y = M(model[text.anchor_point.y], target)
+    x = model.value(text.anchor_point.x)
+    y = M(model.value(text.anchor_point.y), target)
     target.append(draw.Text(text.text, text.font_size, x, y, center=True, **style))
 
 
-def render_shape(shape, model, target, style=None):
-    style = style or {}
-    if isinstance(shape, Group):  # isinstance check also catches Group subclasses (the type() lookup below would not)
-        if hasattr(shape, 'style'):
-            style = style_join(style, shape.style)
-        for subshape in shape.shapes:
-            render_shape(subshape, model, target, style)
-    else:
-        assert type(shape) in renderers  # make sure we know how to render this
-        renderer = renderers[type(shape)]
-        renderer(shape, model, target, style)
+def render_shape(shape, model, target, style=None, registry=None):
+    """Renders `shape` onto `target` using the renderers in `registry` (which
+    defaults to the drawSvg renderers)."""
+    render_shapes(shape, model, [(registry or renderers, target)], style)
+
+
+def render_shapes(shape, model, targets, style=None):
+    """Like render_shape(), but renders onto several targets in a single walk
+    over the shape tree. `targets` is a list of (registry, target) pairs.
+    To render the same tree repeatedly, keep a DisplayList around instead."""
+    DisplayList(shape, style).render(model, targets)
 
 
 renderers = {
@@ -100,6 +117,212 @@ renderers = {
 }
 
 
+# these write shapes straight out through an obsidian.stream.SvgWriter,
+# producing the same elements the drawSvg renderers above would. the writer
+# does the style joining (and caches it), so we don't call style_join here
+
+TEXT_DEFAULTS = {"text_anchor": "middle", "dy": "0.5em"}  # what center=True adds
+
+
+def write_rect(rect, model, writer, style=None):
+    num = writer.num
+    w = model.value(rect.width)
+    h = model.value(rect.height)
+    x = model.value(rect.x)
+    y = M(model.value(rect.y), writer) - h
+    writer.shape("rect", [(x, -y - h), (x + w, -y)], f' width="{num(w)}" height="{num(h)}"',
+                 writer.attributes(style, rect.style))
+
+
+def write_circle(circle, model, writer, style=None):
+    x = model.value(circle.x)
+    y = M(model.value(circle.y), writer)
+    r = model.value(circle.radius)
+    writer.shape("circle", [(x, -y)], f' r="{writer.num(r)}"',
+                 writer.attributes(style, circle.style))
+
+
+def write_line(line, model, writer, style=None):
+    x1, y1 = model.value(line.pt1.x), M(model.value(line.pt1.y), writer)
+    x2, y2 = model.value(line.pt2.x), M(model.value(line.pt2.y), writer)
+    writer.shape("path", [(x1, -y1), (x2, -y2)], "",
+                 writer.attributes(style, line.style))
+
+
+def write_text(text, model, writer, style=None):
+    x = model.value(text.anchor_point.x)
+    y = M(model.value(text.anchor_point.y), writer)
+    writer.shape("text", [(x, -y)], f' font-size="{text.font_size}"',
+                 writer.attributes(style, text.style, TEXT_DEFAULTS), text.text)
+
+
+svg_writers = {
+    Rectangle: write_rect,
+    Circle: write_circle,
+    Line: write_line,
+    Text: write_text,
+}
+
+
+# the cairo renderers below draw straight onto a cairo.Context, which saves
+# save_png() from having to write out SVG and then parse it back in again.
+# they only understand some of the style keys shapes use with drawSvg (see
+# CAIRO_STYLE_KEYS); anything else (markers, dashes, line caps...) makes
+# render() skip them, and save_png() go via SVG instead. unlike drawSvg, cairo
+# puts the origin in the top left with +y pointing down, just like we do, so
+# there's no flipping here
+
+def cairo_keys(style):
+    """Returns `style` with every key spelt with underscores. drawSvg takes
+    "stroke-width" as well as "stroke_width", but the cairo renderers (and
+    cairo_can_paint()) only look for the latter."""
+    return {key.replace("-", "_"): value for key, value in style.items()}
+
+
+def cairo_style(style, shape_style):
+    style = style_join(style or {}, shape_style)
+    assert len(style) > 0
+    return cairo_keys(style)
+
+
+def cairo_rect(rect, model, ctx, style=None):
+    style = cairo_style(style, rect.style)
+    ctx.rectangle(model.value(rect.x), model.value(rect.y),
+                  model.value(rect.width), model.value(rect.height))
+    cairo_paint(ctx, style)
+
+
+def cairo_circle(circle, model, ctx, style=None):
+    style = cairo_style(style, circle.style)
+    ctx.arc(model.value(circle.x), model.value(circle.y),
+            model.value(circle.radius), 0, 2 * math.pi)
+    cairo_paint(ctx, style)
+
+
+def cairo_line(line, model, ctx, style=None):
+    style = cairo_style(style, line.style)
+    ctx.move_to(model.value(line.pt1.x), model.value(line.pt1.y))
+    ctx.line_to(model.value(line.pt2.x), model.value(line.pt2.y))
+    cairo_paint(ctx, style, default_fill="none")  # lines have nothing to fill
+
+
+def cairo_text(text, model, ctx, style=None):
+    style = cairo_style(style, text.style)
+    weight = (cairo.FONT_WEIGHT_BOLD if style.get("font_weight") == "bold"
+              else cairo.FONT_WEIGHT_NORMAL)
+    ctx.select_font_face(style.get("font_family", "sans-serif"),
+                         cairo.FONT_SLANT_NORMAL, weight)
+    ctx.set_font_size(text.font_size)
+
+    # match drawSvg's center=True: anchored in the middle unless the style
+    # says otherwise, with the baseline half an em below the anchor point
+    advance = ctx.text_extents(text.text)[4]
+    shift = {"start": 0, "middle": advance / 2, "end": advance}
+    x = model.value(text.anchor_point.x) - shift[style.get("text_anchor", "middle")]
+    y = model.value(text.anchor_point.y) + text.font_size / 2
+    ctx.move_to(x, y)
+    ctx.text_path(text.text)
+    cairo_paint(ctx, style)
+
+
+def cairo_paint(ctx, style, default_fill="#000000"):
+    """Fills and/or strokes the current path as `style` says to. Like SVG,
+    shapes are filled black and not stroked unless told otherwise."""
+    opacity = float(style.get("opacity", 1))
+    fill = parse_color(style.get("fill", default_fill))
+    stroke = parse_color(style.get("stroke", "none"))
+    if fill is not None:
+        ctx.set_source_rgba(*fill, opacity * float(style.get("fill_opacity", 1)))
+        ctx.fill_preserve()
+    if stroke is not None:
+        ctx.set_source_rgba(*stroke, opacity * float(style.get("stroke_opacity", 1)))
+        ctx.set_line_width(float(style.get("stroke_width", 1)))
+        ctx.stroke_preserve()
+    ctx.new_path()
+
+
+# a few common CSS color names. anything else has to be given in hex, or the
+# shape goes via SVG (see cairo_can_draw())
+COLOR_NAMES = {
+    "black": "#000000", "white": "#ffffff", "gray": "#808080",
+    "grey": "#808080", "silver": "#c0c0c0", "red": "#ff0000",
+    "maroon": "#800000", "orange": "#ffa500", "yellow": "#ffff00",
+    "olive": "#808000", "lime": "#00ff00", "green": "#008000",
+    "aqua": "#00ffff", "cyan": "#00ffff", "teal": "#008080",
+    "blue": "#0000ff", "navy": "#000080", "fuchsia": "#ff00ff",
+    "magenta": "#ff00ff", "purple": "#800080",
+}
+
+
+def parse_color(color):
+    """Returns `color` (a CSS color name, "#rgb" or "#rrggbb") as an (r, g, b)
+    tuple of floats in [0, 1], or None if it's "none" or "transparent"."""
+    color = str(color).strip().lower()
+    if color in ("none", "transparent"):
+        return None
+    color = COLOR_NAMES.get(color, color)
+    if not color.startswith("#") or len(color) not in (4, 7):
+        raise ValueError(f"can't parse color {color!r}")
+    digits = color[1:]
+    if len(digits) == 3:
+        digits = "".join(d * 2 for d in digits)
+    return tuple(int(digits[i:i+2], 16) / 255 for i in (0, 2, 4))
+
+
+cairo_renderers = {
+    Rectangle: cairo_rect,
+    Circle: cairo_circle,
+    Line: cairo_line,
+    Text: cairo_text,
+}
+
+# the style keys cairo_paint() and cairo_text() know what to do with
+CAIRO_STYLE_KEYS = frozenset(["fill", "stroke", "stroke_width", "opacity",
+                              "fill_opacity", "stroke_opacity", "font_family",
+                              "font_weight", "text_anchor"])
+
+
+def cairo_can_paint(style):
+    """Says whether the cairo renderers understand every key and color in
+    `style` (keys can be spelt with dashes or underscores; see cairo_keys())."""
+    for key, value in cairo_keys(style).items():
+        if key not in CAIRO_STYLE_KEYS:
+            return False
+        if key in ("fill", "stroke"):
+            try:
+                parse_color(value)
+            except ValueError:
+                return False
+        elif key == "text_anchor" and value not in ("start", "middle", "end"):
+            return False
+    return True
+
+
+def cairo_can_draw(display, bg_color=None):
+    """Says whether the cairo renderers can draw everything in `display` (a
+    DisplayList), and the background, as drawSvg would. They can't draw
+    anything without cairocffi, which is optional."""
+    if not available("cairocffi"):
+        return False
+    if bg_color is not None and not cairo_can_paint({"fill": bg_color}):
+        return False
+    styles = {id(style): style for style in display.styles}  # mostly shared
+    return (all(map(cairo_can_paint, styles.values()))
+            and all(cairo_can_paint(shape.style) for shape in display.shapes))
+
+
+def in_own_environment(method):
+    """Decorator for Canvas methods which build or solve terms. Runs them in
+    the environment the canvas was made in, whichever thread they're called
+    from, and holds that environment's lock meanwhile (see
+    obsidian.environments.using())."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with using(self.env):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 @dataclass
 class Canvas:
     group: Group
@@ -115,6 +338,15 @@ class Canvas:
 
     model = None
     rendered = None
+    rendered_css = False  # whether self.rendered has its styles as CSS classes
+    raster = None  # cairo ImageSurface, if the last render drew one
+    session = None
+    stats = None
+    display = None  # DisplayList for self.group, reused while it's current
+    env = None  # the pysmt environment the canvas was made in
+
+    def __post_init__(self):
+        self.env = get_env()
 
     def get_align_rules(self):
         bounds = self.group.bounds
@@ -157,59 +389,249 @@ class Canvas:
             return height
         return int(maybe_get_from_model(height, model))
 
-    def render(self, use_cached_model=False, var_cache=None, simplify=False):
+    @in_own_environment
+    def render(self, use_cached_model=False, var_cache=None, simplify=False,
+               engine=AUTO, presolve=True, split=True, executor=None,
+               incremental=False, cache=None, solver_name=None, logic=None,
+               timeout=None, portfolio=None, profile=False, hooks=None,
+               raster=False, stream=None, css=False, instances=False,
+               merge=False, precision=None):
         """
         If you want to cache variable lookups for performance reasons (eg when
         rendering an animation where shapes' styles may change between frames
         but their positions won't) then pass an empty dict to var_cache. To
         share a cache between multiple calls, pass them the same dict.
-        """
 
-        # figure out whether we're adding alignment constraints, and if so
-        # create a new Group encapsulating them + the existing Group
-        align_rules = self.get_align_rules()
-        if align_rules:
-            group = Group([self.group], align_rules)
-        else:
-            group = self.group
-
-        # get a model for our group, possibly by running it thru the solver
-        if use_cached_model and self.model is not None:
-            model = self.model
-        else:
-            model = self.model = group.solve(simplify=simplify)
-
-        # wrap the model with a caching abstraction if requested to do so
-        if var_cache is not None:
-            model = ModelCache(model, var_cache)
-
-        # get width and height as ints (even if they weren't specified as such)
-        width = self.get_width(model)
-        height = self.get_height(model)
-
-        # initialize the drawing
-        drawing = draw.Drawing(width, height)
-        if self.bg_color is not None:
-            bg = Rectangle(0, 0, width, height, {"fill": self.bg_color})
-            render_rect(bg, model, drawing)
+        `engine`, `presolve`, `split`, `executor` and `cache` are passed on
+        to Group.solve(). See obsidian.solve.solve_formula() for what they do.
+        So are `solver_name`, `logic`, `timeout` and `portfolio`, which pick
+        the SMT solver(s) to use; see obsidian.backends.Backend.
+
+        If `incremental` is true, the canvas keeps a live solver session
+        between renders, and each render only asserts (or retracts) the
+        constraints which changed since the last one. See obsidian.incremental.
+
+        If `profile` is true or any `hooks` are given, the render is profiled
+        and self.stats is set to an obsidian.stats.RenderStats. Otherwise
+        self.stats is None. save_svg() and save_png() add to the same stats.
+
+        If `raster` is true, the same pass that builds the SVG drawing also
+        draws straight onto a cairo ImageSurface, which is stored in
+        self.raster (for save_png() to write out). That's skipped (leaving
+        self.raster as None) if any shape's style has something the cairo
+        renderers can't draw; see cairo_can_draw().
+
+        If `stream` is given (a filename, or a file-like object such as
+        sock.makefile("wb")), no drawSvg Drawing is built. Instead, each shape
+        is written out as SVG as soon as it's rendered; see obsidian.stream.
+        self.rendered is left as None, and so is the return value.
+
+        If `css` is true, each distinct style in the SVG output is written
+        once, as a CSS class, and elements refer to their style by class
+        instead of carrying it as attributes. See obsidian.css.
+
+        If `instances` is true, shapes and groups which are copies of each
+        other (apart from their positions) are written once, as defs, and
+        placed with <use>. If `merge` is true, runs of lines (or filled
+        rects) in the same style are merged into single paths. If
+        `precision` is given, coordinates are rounded to that many decimal
+        places. These only work when streaming. See obsidian.stream.
+        """
+        if stream is None and (instances or merge or precision is not None):
+            raise ValueError("instances, merge and precision are only supported "
+                             "for streamed output")
+
+        stats = self.stats = RenderStats(hooks or ()) if profile or hooks else None
+        with recording(stats or NULL_STATS) as stats:
+            # figure out whether we're adding alignment constraints, and if so
+            # create a new Group encapsulating them + the existing Group
+            with stats.phase("align"):
+                align_rules = self.get_align_rules()
+                if align_rules:
+                    group = Group([self.group], align_rules)
+                else:
+                    group = self.group
+
+            # get a model for our group, possibly by running it thru the solver
+            if use_cached_model and self.model is not None:
+                model = self.model
+            else:
+                with stats.phase("constraints"):
+                    stats.count("constraints", len(group.constraints))
+                with stats.phase("solve"):
+                    if incremental:
+                        if self.session is None:
+                            self.session = SolverSession(solver_name, logic)
+                        model = group.solve(session=self.session)
+                    else:
+                        model = group.solve(simplify=simplify, engine=engine,
+                                            presolve=presolve, split=split,
+                                            executor=executor, cache=cache,
+                                            solver_name=solver_name,
+                                            logic=logic, timeout=timeout,
+                                            portfolio=portfolio)
+                self.model = model
+
+            # wrap the model with a caching abstraction if requested to do so
+            if var_cache is not None:
+                model = ModelCache(model, var_cache)
+
+            with stats.phase("render"):
+                # get width and height as ints (even if they weren't specified
+                # as such)
+                width = self.get_width(model)
+                height = self.get_height(model)
+
+                # the alignment group has no style, so self.group's display
+                # list will do
+                display = self.display
+                if (display is None or display.root is not self.group
+                        or not display.is_current()):
+                    with stats.phase("compile"):
+                        display = self.display = DisplayList(self.group)
+
+                # initialize the drawing (or the stream), and the raster
+                # image if requested and cairo can draw it all
+                drawing = writer = None
+                if stream is not None:
+                    writer = SvgWriter(stream, width, height, css=css,
+                                       instances=instances, merge=merge,
+                                       precision=precision)
+                    targets = [(svg_writers, writer)]
+                else:
+                    drawing = draw.Drawing(width, height)
+                    targets = [(renderers, drawing)]
+                surface = None
+                if raster and cairo_can_draw(display, self.bg_color):
+                    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+                    targets.append((cairo_renderers, cairo.Context(surface)))
+
+                try:
+                    if self.bg_color is not None:
+                        bg = Rectangle(0, 0, width, height, {"fill": self.bg_color})
+                        render_shapes(bg, model, targets)
+
+                    # draw the group and return the result
+                    if writer is not None:
+                        writer.add_groups(display.spans)
+                    display.render(model, targets)
+                finally:
+                    if writer is not None:
+                        writer.close()
+                if css and drawing is not None:
+                    StyleSheet().apply(drawing)
+            stats.record_shapes(group)
+            if writer is not None:
+                stats.count("output_bytes", writer.written)
 
-        # draw the group and return the result
-        render_shape(group, model, drawing)
         self.rendered = drawing
+        self.rendered_css = css and drawing is not None
+        self.raster = surface
         return drawing
 
-    def save_svg(self, fname):
-        if self.rendered is None:
-            self.render()
-        self.rendered.saveSvg(fname)
+    def save_svg(self, fname, stream=False, css=False, instances=False,
+                 merge=False, precision=None):
+        """Writes the canvas to `fname`. If `stream` is true, the SVG is
+        written out as it's rendered rather than built up in memory first.
+        If `css` is true, styles are written as CSS classes. `instances`,
+        `merge` and `precision` shrink the output further, and imply
+        `stream`; see render(). Any of these means rendering again, even if
+        the canvas was rendered already (though the model from the last
+        render is reused). So does switching between CSS and plain output."""
+        if stream or instances or merge or precision is not None:
+            self.render(use_cached_model=True, stream=fname, css=css,
+                        instances=instances, merge=merge, precision=precision)
+            print("Wrote", fname)
+            return
+        if self.rendered is None or self.rendered_css != css:
+            self.render(use_cached_model=True, css=css)
+        with self.output_phase(fname):
+            self.rendered.saveSvg(fname)
         print("Wrote", fname)
 
+    def can_save_png(self):
+        """Says whether the last render left save_png() everything it needs:
+        a raster image, or else an SVG drawing when cairo_renderers couldn't
+        have drawn a raster image anyway."""
+        if self.rendered is None or self.rendered_css:
+            return False
+        return self.raster is not None or not cairo_can_draw(self.display, self.bg_color)
+
     def save_png(self, fname):
-        if self.rendered is None:
-            self.render()
-        self.rendered.savePng(fname)
+        if not self.can_save_png():
+            # reuse the model if we have one; this only needs drawing
+            self.render(use_cached_model=True, raster=True)
+        with self.output_phase(fname):
+            if self.raster is not None:
+                self.raster.write_to_png(fname)
+            else:
+                # cairo_renderers can't draw something here, so let cairosvg
+                # rasterize the SVG instead
+                self.rendered.savePng(fname)
         print("Wrote", fname)
 
+    def save(self, svg=None, png=None):
+        """Writes the canvas to an SVG file, a PNG file, or both, rendering
+        (at most) once for all of them."""
+        if (self.rendered is None or self.rendered_css
+                or (png is not None and not self.can_save_png())):
+            self.render(use_cached_model=True, raster=png is not None)
+        if svg is not None:
+            self.save_svg(svg)
+        if png is not None:
+            self.save_png(png)
+
+    @contextmanager
+    def output_phase(self, fname):
+        """Times the code inside it as the "output" phase, and counts the
+        bytes written to `fname`, if this canvas' render was profiled."""
+        stats = self.stats
+        if stats is None:
+            yield
+            return
+        with stats.phase("output"):
+            yield
+        stats.count("output_bytes", os.path.getsize(fname))
+
+
+def render_many(canvases, executor=None, **kwargs):
+    """Renders each of `canvases` and returns their SVG output, as a list of
+    strings in the same order. Other keyword args are passed on to
+    Canvas.render().
+
+    Items can be Canvases, or functions which take no arguments and return
+    one. Functions are called, and their canvases rendered, in sessions of
+    their own (see obsidian.environments), so nothing they build outlives the
+    call.
+
+    Pass a concurrent.futures executor as `executor` to render in parallel.
+    In a ThreadPoolExecutor, canvases made in the same environment still take
+    turns (see Canvas.render()), so build them in separate sessions, or pass
+    functions. A ProcessPoolExecutor needs functions, since canvases can't be
+    pickled, and the functions themselves must be picklable (e.g. module-level
+    functions, or functools.partial objects wrapping them).
+    """
+    canvases = list(canvases)
+    if executor is None:
+        return [render_svg(canvas, kwargs) for canvas in canvases]
+    if isinstance(executor, ProcessPoolExecutor) and any(
+            isinstance(canvas, Canvas) for canvas in canvases):
+        raise TypeError("canvases can't be sent to other processes; pass "
+                        "functions which build them instead")
+    futures = [executor.submit(render_svg, canvas, kwargs) for canvas in canvases]
+    return [future.result() for future in futures]
+
+
+def render_svg(canvas, kwargs):
+    """render_many()'s unit of work. Renders `canvas` (or, if it's a function,
+    the canvas it builds) and returns the SVG."""
+    if not isinstance(canvas, Canvas):
+        with session():
+            return render_svg(canvas(), kwargs)
+    out = io.StringIO()
+    canvas.render(stream=out, **kwargs)
+    return out.getvalue()
+
 
 def render(group, *args, **kwargs):
     """Helper function. For simple renders, removes the need to instantiate a
@@ -0,0 +1,75 @@
+"""
+Splits constraint formulas into independent components.
+
+Large diagrams are often made of subgroups which share no variables with each
+other (at least once presolving has collapsed the alignment rules tying them
+together), and since solver cost grows superlinearly with formula size it pays
+to solve each of these components separately.
+
+Components can also be shipped off to other processes for solving. pysmt
+formulas can't be pickled, so they travel as SMT-LIB scripts instead.
+"""
+
+from io import StringIO
+
+from pysmt.shortcuts import And
+from pysmt.smtlib.parser import SmtLibParser
+
+from obsidian.presolve import UnionFind, conjuncts
+
+
+def split_components(formula):
+    """Partitions the conjuncts of `formula` by shared free variables. Returns
+    a list of formulas, one per connected component. Their conjunction is
+    equivalent to `formula`."""
+    sets = UnionFind()
+    atoms = []
+    ground = []  # conjuncts with no free variables at all
+    for atom in conjuncts(formula):
+        syms = atom.get_free_variables()
+        if not syms:
+            ground.append(atom)
+            continue
+        first, *rest = syms
+        for sym in rest:
+            sets.union(first, sym)
+        atoms.append((first, atom))
+
+    components = {}
+    for sym, atom in atoms:
+        components.setdefault(sets.find(sym), []).append(atom)
+
+    result = [And(atoms) for atoms in components.values()]
+    if ground:
+        result.append(And(ground))
+    return result
+
+
+def batch_components(components, n_batches):
+    """Merges `components` into at most `n_batches` formulas of similar size,
+    so that an executor isn't flooded with tiny jobs."""
+    batches = [[] for _ in range(min(n_batches, len(components)))]
+    sizes = [0] * len(batches)
+    by_size = sorted(components, key=n_conjuncts, reverse=True)
+    for component in by_size:
+        i = sizes.index(min(sizes))
+        batches[i].append(component)
+        sizes[i] += n_conjuncts(component)
+    return [And(batch) for batch in batches]
+
+
+def n_conjuncts(formula):
+    return len(formula.args()) if formula.is_and() else 1
+
+
+def serialize(formula):
+    """Returns an SMT-LIB script asserting `formula`."""
+    lines = [f"(declare-fun {sym.symbol_name()} {sym.symbol_type().as_smtlib()})"
+             for sym in formula.get_free_variables()]
+    lines.append(f"(assert {formula.to_smtlib()})")
+    return "\n".join(lines)
+
+
+def deserialize(script):
+    """Inverse of serialize()."""
+    return SmtLibParser().get_script(StringIO(script)).get_last_formula()
@@ -0,0 +1,118 @@
+"""
+CSS classes for shared styles. Normally every element in our SVG output
+carries its whole style as attributes, so a scene with thousands of lines in
+the same style repeats that style thousands of times. With
+Canvas.render(css=True), each distinct style is instead written once, as a
+class in a <style> block, and elements just name their class:
+
+    <style>
+    .s0 { stroke: #101010; stroke-width: 1px }
+    </style>
+    <path d="M34.0,-516.0 L516.0,-516.0" class="s0" />
+"""
+
+from xml.sax.saxutils import escape
+
+from obsidian.lazy import LazyModule
+
+
+draw = LazyModule("drawSvg")
+
+
+# SVG presentation attributes, which can be set from CSS as well. anything
+# else in a style (like the dy that text gets) stays on the element
+PROPERTIES = frozenset("""
+    alignment-baseline baseline-shift clip-path clip-rule color
+    color-interpolation color-interpolation-filters cursor direction display
+    dominant-baseline fill fill-opacity fill-rule filter flood-color
+    flood-opacity font-family font-size font-size-adjust font-stretch
+    font-style font-variant font-weight image-rendering letter-spacing
+    lighting-color marker-end marker-mid marker-start mask opacity overflow
+    paint-order pointer-events shape-rendering stop-color stop-opacity stroke
+    stroke-dasharray stroke-dashoffset stroke-linecap stroke-linejoin
+    stroke-miterlimit stroke-opacity stroke-width text-anchor text-decoration
+    text-rendering unicode-bidi vector-effect visibility word-spacing
+    writing-mode
+""".split())
+
+# properties which take lengths. as attributes these can be plain numbers,
+# but CSS wants units. px are the same as SVG user units
+LENGTHS = frozenset({"font-size", "letter-spacing", "stroke-dashoffset",
+                     "stroke-width", "word-spacing"})
+
+
+def css_value(name, value):
+    value = str(value)
+    if name in LENGTHS:
+        try:
+            float(value)
+        except ValueError:
+            pass
+        else:
+            value += "px"
+    return value
+
+
+class StyleSheet:
+    """Interns styles as CSS classes. Each distinct set of declarations gets
+    one class, named `prefix` plus a number, in order of first use."""
+
+    def __init__(self, prefix="s"):
+        self.prefix = prefix
+        self.classes = {}  # sorted declarations -> class name
+
+    def __len__(self):
+        return len(self.classes)
+
+    def split(self, attrs):
+        """Splits `attrs`, an iterable of (SVG attribute name, value) pairs,
+        into the name of a class covering the ones CSS can express, and a
+        list of the leftover pairs. The class name is None if there weren't
+        any for it to cover.
+
+        If `attrs` has a class of its own (e.g. for a stylesheet the user
+        adds), the name returned is that class followed by ours, since an
+        element can only have one class attribute."""
+        declarations, rest = [], []
+        for name, value in attrs:
+            if name in PROPERTIES and not hasattr(value, "writeSvgElement"):
+                declarations.append((name, css_value(name, value)))
+            else:
+                rest.append((name, value))
+        if not declarations:
+            return None, rest
+        key = tuple(sorted(declarations))
+        name = self.classes.get(key)
+        if name is None:
+            name = self.classes[key] = f"{self.prefix}{len(self.classes)}"
+        own = [value for attr, value in rest if attr == "class"]
+        if own:
+            rest = [(attr, value) for attr, value in rest if attr != "class"]
+            name = f"{own[-1]} {name}"
+        return name, rest
+
+    def css(self):
+        """Returns the stylesheet's rules, one class per line."""
+        return "".join(f".{name} {{ {'; '.join(f'{k}: {v}' for k, v in key)} }}\n"
+                       for key, name in self.classes.items())
+
+    def style_element(self):
+        """Returns the whole stylesheet as a <style> element, as a string."""
+        return f"<style>\n{escape(self.css())}</style>"
+
+    def apply(self, drawing):
+        """Moves the styles of the elements of a drawSvg Drawing into classes,
+        and adds the stylesheet to the start of the drawing."""
+        for element in drawing.elements:
+            args = element.args
+            name, rest = self.split((k, v) for k, v in args.items() if v is not None)
+            if name is None:
+                continue
+            args.clear()
+            args.update(rest)
+            args["class"] = name
+        if self.classes:
+            sheet = draw.Raw("\n" + escape(self.css()))
+            sheet.TAG_NAME = "style"  # Raw writes its content inside one of these
+            # (not with appendDef(): drawSvg writes those as <use>s of themselves)
+            drawing.elements.insert(0, sheet)
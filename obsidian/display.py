@@ -0,0 +1,104 @@
+"""
+Display lists. Rendering a group means walking its tree, working out which
+style applies to each shape along the way, and calling the right renderer for
+each one. None of that changes from one render to the next unless the tree
+does, so a DisplayList does the walk once and remembers the result: a flat
+list of the tree's leaf shapes, in drawing order, each with the style it
+inherits from the groups above it.
+
+The list can then be played back onto any number of targets (an SVG drawing,
+a stream, a cairo context...), as often as needed. Canvas keeps one around
+between renders, and only recompiles it when the group changes.
+"""
+
+from obsidian.fields import EMPTY_STYLE
+from obsidian.groups import Group
+
+
+END = object()  # marks the end of a group on DisplayList's stack
+
+
+def style_join(base, extra):
+    return dict(base, **extra)  # only works because we know all style dict keys will be str - we'll have to change this if they ever become something else (eg Enum elements)
+
+
+class DisplayList:
+    """The leaf shapes under `shape`, flattened, with their inherited styles
+    resolved. `style` is the style inherited from above `shape`, if any.
+
+    Each entry's style only includes the styles of the groups above it; the
+    shape's own style is joined on by its renderer, as usual. So shapes can
+    have their styles changed between renders (e.g. from one animation frame
+    to the next) without the list having to be rebuilt.
+
+    `spans` records where each group's shapes start and end in the list
+    (outer groups first), for outputs which care about the tree's structure
+    (see obsidian.stream).
+    """
+
+    def __init__(self, shape, style=None):
+        self.root = shape
+        self.shapes = shapes = []
+        self.styles = styles = []
+        self.groups = groups = []  # (group, its shapes, their version, copy of its style)
+        self.spans = spans = []  # [start, end) of each group's shapes in self.shapes
+        self.plans = {}
+
+        # depth first, using our own stack so that deep trees can't hit the
+        # recursion limit. a group's span is closed when the END entry pushed
+        # below its shapes comes off the stack
+        stack = [(shape, style or EMPTY_STYLE)]
+        while stack:
+            shape, style = stack.pop()
+            if shape is END:
+                style[1] = len(shapes)  # (style is the span here)
+            elif isinstance(shape, Group):  # isinstance check also catches Group subclasses
+                subshapes = shape.shapes
+                group_style = getattr(shape, "style", None)
+                groups.append((shape, subshapes, getattr(subshapes, "version", 0),
+                               None if group_style is None else dict(group_style)))
+                if group_style:  # otherwise keep sharing the parent's dict
+                    style = style_join(style, group_style)
+                span = [len(shapes), None]
+                spans.append(span)
+                stack.append((END, span))
+                stack.extend((subshape, style) for subshape in reversed(subshapes))
+            else:
+                shapes.append(shape)
+                styles.append(style)
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def is_current(self):
+        """Says whether the list still matches the tree it was built from.
+        Changes to any group's shapes (see obsidian.groups.ShapeList) or to
+        the styles of the groups in the tree make it stale. This is checked
+        group by group, so it's cheap next to a render unless the groups are
+        tiny."""
+        for group, shapes, version, style in self.groups:
+            if (group.shapes is not shapes
+                    or getattr(shapes, "version", 0) != version
+                    or getattr(group, "style", None) != style):
+                return False
+        return True
+
+    def plan(self, registry):
+        """Returns the list of renderers from `registry` to call for each
+        shape. These are cached, one list per registry."""
+        entry = self.plans.get(id(registry))
+        if entry is None:
+            lookup = {}
+            for cls in set(map(type, self.shapes)):
+                assert cls in registry  # make sure we know how to render this
+                lookup[cls] = registry[cls]
+            entry = self.plans[id(registry)] = (registry, [lookup[type(shape)] for shape in self.shapes])
+        return entry[1]
+
+    def render(self, model, targets):
+        """Renders every shape in the list onto each of `targets`, a list of
+        (registry, target) pairs (see obsidian.canvas.render_shapes())."""
+        shapes, styles = self.shapes, self.styles
+        for registry, target in targets:
+            for renderer, shape, style in zip(self.plan(registry), shapes, styles):
+                renderer(shape, model, target, style)
@@ -0,0 +1,219 @@
+"""
+Scoped pysmt environments, for long-running processes.
+
+pysmt hash-conses every term it builds, so every symbol, bound and constraint
+we make stays in its environment's tables for as long as the environment
+lives. For a script drawing one diagram that doesn't matter, but a process
+drawing thousands of them grows until something kills it. Diagrams built
+inside a session get a fresh environment of their own, which is thrown away
+(along with every term in it) when the session ends:
+
+>>> with obsidian.session() as s:
+...     canvas = Canvas(build_diagram())
+...     canvas.save_svg("diagram.svg")
+...     print(s.counters())  # {'fnodes': ..., 'symbols': ...}
+
+Shapes, groups, canvases and models from a session mustn't be used once it's
+over, since their terms belong to an environment that's gone. Sessions can be
+nested, as long as they're exited in the reverse order they were entered.
+
+counters() tells you how many terms the current environment is holding on
+to, so you can check that memory stays flat from one session to the next.
+
+Sessions are also what make it safe to draw diagrams concurrently. pysmt
+keeps one process-wide stack of environments; importing this module swaps it
+for one which gives every thread (and every asyncio task) a stack of its own,
+starting from the global environment. So a session entered in one thread is
+only current in that thread, and diagrams built in different sessions never
+touch each other's terms. A Canvas remembers the environment it was made in,
+and always renders in that environment, holding its lock (see using()), so
+canvases from different sessions render in parallel while ones from the same
+environment take turns. See also obsidian.canvas.render_many().
+
+Building diagrams in the global environment from several threads at once
+isn't safe, though: give each thread a session.
+
+The stack is swapped for the whole process, for as long as it runs, and
+pysmt code which uses the stack (get_env(), push_env(), etc) gets the
+current context's stack without noticing. The exception is pysmt's
+reset_env(), which throws away the current environment and pushes a new one
+in its place; inside a session, that would pull the session's environment
+out from under it. So importing this module also replaces reset_env() (in
+pysmt.environment and pysmt.shortcuts) with ours, which resets a session's
+environment in place instead, leaving the session intact. References to
+pysmt's reset_env() taken before obsidian was imported still call the
+original, though, and using it inside a session makes the session raise
+SessionOrderError on exit.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from weakref import WeakKeyDictionary, WeakSet
+
+import pysmt.environment
+import pysmt.shortcuts
+from pysmt.environment import Environment, push_env, pop_env, get_env
+
+
+# options which new environments copy from the current one. (importing
+# pysmt.shortcuts switches on infix notation for the global environment, and
+# we rely on it, e.g. for `shape.x + 1`)
+SETTINGS = ("enable_infix_notation", "enable_div_by_0", "allow_empty_var_names")
+
+
+# thrown when a session ends while a session started inside it is still open
+class SessionOrderError(Exception): pass
+
+
+class EnvironmentStack:
+    """Stands in for pysmt.environment.ENVIRONMENTS_STACK (pysmt only ever
+    calls append(), pop() and [-1] on it), keeping a separate stack for each
+    context, as in contextvars. Each stack is a tuple, so that contexts
+    copied from one another (e.g. by asyncio tasks) can't change each other's
+    stacks; and each starts out as `base`."""
+
+    def __init__(self, base):
+        self.base = tuple(base)
+        self.var = ContextVar("pysmt_environments", default=self.base)
+
+    def __getitem__(self, i):
+        return self.var.get()[i]
+
+    def __len__(self):
+        return len(self.var.get())
+
+    def __iter__(self):
+        return iter(self.var.get())
+
+    def append(self, env):
+        self.var.set(self.var.get() + (env,))
+
+    def pop(self):
+        stack = self.var.get()
+        self.var.set(stack[:-1])
+        return stack[-1]
+
+
+if not isinstance(pysmt.environment.ENVIRONMENTS_STACK, EnvironmentStack):
+    pysmt.environment.ENVIRONMENTS_STACK = EnvironmentStack(
+        pysmt.environment.ENVIRONMENTS_STACK)
+
+
+# the environments of sessions which haven't ended yet
+session_envs = WeakSet()
+
+
+def reset_env():
+    """Stands in for pysmt's reset_env() (see the module docstring). Outside
+    sessions, replaces the current environment with a new one, as pysmt's
+    does. Inside one, resets the session's environment in place instead, so
+    the session carries on. Returns the current environment."""
+    env = get_env()
+    if env in session_envs:
+        from obsidian.templates import templates  # avoids a circular import
+        templates.pop(env, None)  # their terms are about to go
+        settings = {setting: getattr(env, setting) for setting in SETTINGS}
+        release(env)
+        env.__init__()  # i.e. as good as new
+        for setting, value in settings.items():
+            setattr(env, setting, value)
+        return env
+    pop_env()
+    push_env(new_environment(env))
+    return get_env()
+
+
+pysmt.environment.reset_env = pysmt.shortcuts.reset_env = reset_env
+
+
+def new_environment(outer):
+    """Returns a fresh pysmt environment with the same SETTINGS as `outer`."""
+    env = Environment()
+    for setting in SETTINGS:
+        setattr(env, setting, getattr(outer, setting))
+    return env
+
+
+# pysmt environment -> RLock, for using()
+locks = WeakKeyDictionary()
+locks_lock = threading.Lock()
+
+
+def lock(env):
+    """Returns the lock held by using(env)."""
+    with locks_lock:
+        env_lock = locks.get(env)
+        if env_lock is None:
+            env_lock = locks[env] = threading.RLock()
+        return env_lock
+
+
+@contextmanager
+def using(env):
+    """Makes `env` the current environment (in this context only) inside the
+    with block, and holds its lock, so that no other thread builds terms in
+    it through using() meanwhile."""
+    with lock(env):
+        push_env(env)
+        try:
+            yield env
+        finally:
+            pop_env()
+
+
+def counters(env=None):
+    """Returns a dict holding the number of terms ("fnodes") and symbols
+    ("symbols") which `env` (by default, the current pysmt environment) is
+    keeping alive."""
+    manager = (env or get_env()).formula_manager
+    return {"fnodes": len(manager.formulae), "symbols": len(manager.symbols)}
+
+
+def release(env):
+    """Empties the tables in which `env` keeps every term it has built, so
+    that the terms can be freed straight away. (The environment itself is
+    full of reference cycles, so otherwise they'd only go whenever the
+    garbage collector gets round to it.)"""
+    manager = env.formula_manager
+    for table in (manager.formulae, manager.symbols, manager.int_constants,
+                  manager.real_constants, manager.string_constants):
+        table.clear()
+    for walker in vars(env).values():  # the type checker, simplifier, etc
+        memo = getattr(walker, "memoization", None)
+        if isinstance(memo, dict):
+            memo.clear()
+
+
+class Session:
+    """A context manager which makes a fresh pysmt environment current while
+    it's active, and frees it on exit. See session()."""
+
+    env = None
+
+    def __enter__(self):
+        self.env = env = new_environment(get_env())
+        session_envs.add(env)
+        push_env(env)
+        return self
+
+    def __exit__(self, *exc_info):
+        if get_env() is not self.env:
+            raise SessionOrderError("sessions must be exited in the reverse "
+                                    "order they were entered")
+        pop_env()
+        session_envs.discard(self.env)
+        release(self.env)
+        self.env = None
+
+    def counters(self):
+        """Like counters(), for this session's environment. Only works while
+        the session is active."""
+        if self.env is None:
+            raise RuntimeError("session isn't active")
+        return counters(self.env)
+
+
+def session():
+    """Returns a Session, for use in a `with` block."""
+    return Session()
@@ -5,8 +5,29 @@ from pysmt.shortcuts import FreshSymbol
 from pysmt.typing import REAL
 
 
-def SMTField(): return field(default_factory=lambda: FreshSymbol(REAL))  # yo dawg i heard you like factories...
+def fresh_real(): return FreshSymbol(REAL)
+def SMTField(): return field(default_factory=fresh_real)  # yo dawg i heard you like factories...
 def StyleField(): return field(default_factory=dict)
 
 
+class EmptyStyle(dict):
+    """The type of EMPTY_STYLE: an empty dict which can't be filled in, and
+    which copies and pickles as EMPTY_STYLE itself."""
+
+    def read_only(self, *args, **kwargs):
+        raise TypeError("EMPTY_STYLE is shared, and can't be changed")
+
+    __setitem__ = __delitem__ = __ior__ = read_only
+    update = setdefault = pop = popitem = clear = read_only
+
+    def __reduce__(self):
+        return "EMPTY_STYLE"  # i.e. the module-level name
+
+
+# stands in for missing or empty styles while rendering, so that caches keyed
+# on styles' ids (see obsidian.stream) see every unstyled shape as the same.
+# shapes and groups still get a dict of their own, which can be filled in
+EMPTY_STYLE = EmptyStyle()
+
+
 STYLE = Dict[str, Any]
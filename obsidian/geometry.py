@@ -4,16 +4,17 @@ from pysmt.shortcuts import Min, Max
 from pysmt.typing import REAL
 
 from obsidian.fields import StyleField, SMTField, STYLE
-from obsidian.shape import Bounds, Shape
+from obsidian.shape import Bounds, Shape, derived, slotted
 
 
+@slotted
 @dataclass
 class Point(Shape):
     x: REAL = SMTField()
     y: REAL = SMTField()
     style: STYLE = StyleField()
 
-    @property
+    @derived("x", "y")
     def bounds(self):
         x, y = self.x, self.y
         return Bounds(x, x, y, y)  # just a point!
@@ -54,6 +55,7 @@ class Point(Shape):
 def PointField(): return field(default_factory=Point)
 
 
+@slotted
 @dataclass
 class Rectangle(Shape):
     x: REAL = SMTField()
@@ -62,7 +64,7 @@ class Rectangle(Shape):
     height: REAL = SMTField()
     style: STYLE = StyleField()
 
-    @property
+    @derived("x", "y", "width", "height")
     def bounds(self):
         left_edge, right_edge = self.x, self.x + self.width
         top_edge, bottom_edge = self.y, self.y + self.height
@@ -80,6 +82,7 @@ class Rectangle(Shape):
         return cls(x, y, width, height, *args, **kwargs)
 
 
+@slotted
 @dataclass
 class Circle(Shape):
     x: REAL = SMTField()
@@ -87,23 +90,29 @@ class Circle(Shape):
     radius: REAL = SMTField()
     style: STYLE = StyleField()
 
-    @property
+    @derived("x", "y", "radius")
     def bounds(self):
         left_edge, right_edge = self.x - self.radius, self.x + self.radius
         top_edge, bottom_edge = self.y - self.radius, self.y + self.radius
         return Bounds(left_edge, right_edge, top_edge, bottom_edge)
 
 
+@slotted
 @dataclass
 class Line(Shape):
     pt1: Point = PointField()
     pt2: Point = PointField()
     style: STYLE = StyleField()
 
-    @property
+    @derived("pt1.x", "pt1.y", "pt2.x", "pt2.y")
     def bounds(self):
         xs = (self.pt1.x, self.pt2.x)
         ys = (self.pt1.y, self.pt2.y)
         left_edge, right_edge = Min(*xs), Max(*xs)
         top_edge, bottom_edge = Min(*ys), Max(*ys)
         return Bounds(left_edge, right_edge, top_edge, bottom_edge)
+
+    def edge_candidates(self):
+        xs = (self.pt1.x, self.pt2.x)
+        ys = (self.pt1.y, self.pt2.y)
+        return xs, xs, ys, ys
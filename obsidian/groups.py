@@ -1,21 +1,261 @@
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
+from enum import Enum
+from fractions import Fraction
+from functools import wraps
+from itertools import chain, count
+from numbers import Real as ABCReal
 from typing import Callable
 
 from obsidian.arrange import top_align, left_align
+from obsidian.backends import Backend
 from obsidian.fields import STYLE, StyleField
 from obsidian.shape import Shape, Bounds
+from obsidian.cache import close
 from obsidian.helpers import cached_property
+from obsidian.lazy import LazyModule, available
+from obsidian.linear import linear_term, NonLinearError
+from obsidian.solve import solve_formula, AUTO, Model, Solution, model_values
+from obsidian.stats import active
 
 from pysmt.fnode import FNode
-from pysmt.shortcuts import Equals, And, Min, Max, get_model
+from pysmt.shortcuts import Equals, And, Min, Max
 from pysmt.typing import REAL
 
 
+np = LazyModule("numpy")
+
+
 # thrown when a user tries to get a named shape from a Group
 # if the Group contains multiple shapes with the given name
 class AmbiguousNameError(Exception): pass
 
 
+# groups cache an index of the names in their subtree. rather than have every
+# group keep track of its parents, we just count changes to any group's shapes
+# or named_shapes, and throw out indexes built before the latest change. each
+# list or dict also counts its own changes, in `version`, for caches which can
+# afford to check every group they cover (see obsidian.display). new
+# generations are drawn from a counter, since next() on it is atomic and
+# `generation += 1` isn't (threads could lose each other's changes)
+generations = count(1)
+generation = 0
+
+
+def counting(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+def touching(method):
+    method = counting(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        global generation
+        generation = next(generations)
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ShapeList(list):
+    """A list which invalidates name indexes whenever it's changed."""
+    version = 0
+    append = touching(list.append)
+    extend = touching(list.extend)
+    insert = touching(list.insert)
+    remove = touching(list.remove)
+    pop = touching(list.pop)
+    clear = touching(list.clear)
+    sort = touching(list.sort)
+    reverse = touching(list.reverse)
+    __setitem__ = touching(list.__setitem__)
+    __delitem__ = touching(list.__delitem__)
+    __iadd__ = touching(list.__iadd__)
+    __imul__ = touching(list.__imul__)
+
+
+class NameDict(dict):
+    """A dict which invalidates name indexes whenever it's changed."""
+    version = 0
+    update = touching(dict.update)
+    setdefault = touching(dict.setdefault)
+    pop = touching(dict.pop)
+    popitem = touching(dict.popitem)
+    clear = touching(dict.clear)
+    __setitem__ = touching(dict.__setitem__)
+    __delitem__ = touching(dict.__delitem__)
+    if hasattr(dict, "__ior__"):  # python 3.9+
+        __ior__ = touching(dict.__ior__)
+
+
+class NameIndex:
+    """Maps the names in a group's subtree to (shape, owner) pairs, where
+    `owner` is the group whose named_shapes holds the name. Names used more
+    than once are listed in `duplicates`, and map to their first occurrence
+    (in the order items() would visit them)."""
+
+    def __init__(self, group):
+        self.generation = generation
+        self.names = names = {}
+        self.duplicates = duplicates = set()
+        for name, shape in group.named_shapes.items():
+            names[name] = (shape, group)
+        for child in group.child_groups():
+            child_index = child.name_index()
+            duplicates |= child_index.duplicates
+            for name, entry in child_index.names.items():
+                if name in names:
+                    duplicates.add(name)
+                else:
+                    names[name] = entry
+
+
+class ConstraintList(list):
+    """A group's own constraints: a list which counts its changes."""
+    version = 0
+    append = counting(list.append)
+    extend = counting(list.extend)
+    insert = counting(list.insert)
+    remove = counting(list.remove)
+    pop = counting(list.pop)
+    clear = counting(list.clear)
+    __setitem__ = counting(list.__setitem__)
+    __delitem__ = counting(list.__delitem__)
+    __iadd__ = counting(list.__iadd__)
+
+
+class Constraints(Sequence):
+    """The constraints of a group and all of its subgroups.
+
+    Each group only stores its own constraints (in `own`), and this just
+    reads the rest out of the subgroups when it's iterated over. So the
+    constraints of a deep tree aren't copied into every group above them,
+    and constraints added to a subgroup later on aren't missed.
+
+    The flattened list is built on first use, with duplicates dropped (pysmt
+    interns its terms, so equal constraints are the same object), and kept
+    until a group in the tree gets new shapes or constraints. Checking that
+    walks the tree's groups, but not their constraints.
+
+    Adding or removing constraints (with append(), extend(), +=, pop(),
+    etc.) changes the group's own list. Otherwise it acts like a list of the
+    whole tree's constraints: `constraints + [...]` and `[...] + constraints`
+    give lists, and it compares equal to lists with the same contents.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.own = ConstraintList()
+        self.flat = None  # tuple of the whole tree's constraints
+        self.stamps = None  # what self.flat was built from
+
+    def append(self, constraint):
+        self.own.append(constraint)
+
+    def extend(self, constraints):
+        self.own.extend(constraints)
+
+    def insert(self, i, constraint):
+        self.own.insert(i, constraint)
+
+    def remove(self, constraint):
+        self.own.remove(constraint)
+
+    def pop(self, i=-1):
+        return self.own.pop(i)
+
+    def clear(self):
+        self.own.clear()
+
+    def __iadd__(self, constraints):
+        self.own.extend(constraints)
+        return self
+
+    def __add__(self, other):
+        return list(self.flatten()) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self.flatten())
+
+    def __eq__(self, other):
+        # equal to lists (and tuples, and other Constraints) holding the same
+        # constraints, as when this was a plain list
+        if isinstance(other, Constraints):
+            other = other.flatten()
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return list(self.flatten()) == list(other)
+
+    __hash__ = None  # it's mutable
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def __getitem__(self, i):
+        return self.flatten()[i]
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __repr__(self):
+        return f"Constraints({list(self.flatten())!r})"
+
+    def flatten(self):
+        """Returns the tree's constraints as a tuple: each subgroup's (in
+        order), and then the group's own."""
+        stamps = self.stamps
+        if stamps is not None and all(
+                group.shapes is shapes and getattr(shapes, "version", 0) == version
+                and group.constraints.own is own and own.version == own_version
+                for group, shapes, version, own, own_version in stamps):
+            return self.flat
+
+        self.stamps = stamps = []
+        flat = {}  # used as an ordered set
+        # depth first with our own stack, as in obsidian.display. a group
+        # comes off the stack twice: first to push its subgroups, and then,
+        # once they're done, to add its own constraints
+        stack = [(self.group, False)]
+        while stack:
+            group, done = stack.pop()
+            own = group.constraints.own
+            if done:
+                flat.update(dict.fromkeys(own))
+                continue
+            shapes = group.shapes
+            stamps.append((group, shapes, getattr(shapes, "version", 0),
+                           own, own.version))
+            stack.append((group, True))
+            stack.extend((child, False) for child in reversed(list(group.child_groups())))
+        self.flat = tuple(flat)
+        return self.flat
+
+
+# MINMAX builds each edge of a group's bounds as a nested Min/Max term over its
+# members' edges. Solvers turn these into chains of if-then-else terms, which
+# get very slow as groups grow.
+#
+# AUX instead makes each edge a fresh symbol. If nothing in the formula being
+# solved refers to an edge, its value is simply computed from the model after
+# solving. Otherwise, the edge is pinned (by a plain linear equality) to
+# whichever member's edge came out extreme in the previous solve, and we
+# re-solve until every pinned edge really is extreme. For most layouts this
+# takes one extra solve, since the shapes' relative positions don't depend on
+# where the group's bounds end up. If it doesn't converge, we fall back to
+# MINMAX-style terms. (Encoding tightness directly, with inequalities and a
+# disjunction over the members, turns out to be even slower than Min/Max.)
+BoundsEncodings = Enum("BoundsEncodings", "MINMAX AUX")
+MINMAX, AUX = BoundsEncodings
+
+# how many times we'll re-solve while trying to settle AUX-encoded bounds
+AUX_ROUNDS = 4
+
+
 @dataclass
 class Group(Shape):
     """For representing a collection of at least one Shape and any number of
@@ -36,11 +276,18 @@ class Group(Shape):
     Named shapes should have globally unique names. Duplicate
     names won't throw an error on creation, but they will error if/when
     you try to resolve them.
+
+    `bounds_encoding` controls how the group's bounds are expressed to the
+    solver (see BoundsEncodings). It must be set before the bounds are first
+    used. Subclasses can also set it as a class attribute.
     """
 
     _bounds = None
+    _name_index = None
+    bounds_encoding = MINMAX
 
-    def __init__(self, shapes=None, constraints=None, style=None):
+    def __init__(self, shapes=None, constraints=None, style=None,
+                 bounds_encoding=None):
         if isinstance(shapes, list):
             self.shapes.extend(shapes)
         if isinstance(shapes, dict):
@@ -50,76 +297,190 @@ class Group(Shape):
 
         self.constraints.extend(constraints or [])
         self.style = style or {}
+        if bounds_encoding is not None:
+            self.bounds_encoding = bounds_encoding
         self.__post_init__()  # in case subclasses need this
 
+    @classmethod
+    def instance(cls, *args, **kwargs):
+        """Returns a copy of `cls(*args, **kwargs)` which is solved once (for
+        each distinct set of arguments) and then just moved into place, so
+        that none of its internal constraints reach the formula. The
+        arguments must be constants. See obsidian.templates."""
+        from obsidian.templates import instance  # avoids a circular import
+        return instance(cls, *args, **kwargs)
+
     def __getitem__(self, name: str):
         """Raises an exception if `name` is not found OR if more than one shape
         called `name` is found. """
-        # TODO this could probably be optimized - currently it
-        # scans subtrees more than once per loop (first during the `not in`
-        # check, then during name resolution)
-        item = self.named_shapes.get(name)
-        for group in self.subgroups():
-            if name not in group.named_shapes:
-                continue
-            if item is not None:
-                raise AmbiguousNameError(f"group contains multiple shapes named '{name}'")
-            item = group[name]  # this line may also raise AmbiguousNameError
-        if item is None:
-            raise KeyError(f"named shape '{name}' not found")
-        return item
+        return self.lookup(name)[0]
 
     def __contains__(self, name):
-        return name in self.named_shapes \
-               or any(name in group.named_shapes for group in self.subgroups())
+        return name in self.name_index().names
+
+    def name_index(self):
+        """Returns the NameIndex for this group's subtree, (re)building it if
+        anything has changed since it was last built."""
+        index = self._name_index
+        if index is None or index.generation != generation:
+            index = self._name_index = NameIndex(self)
+        return index
+
+    def lookup(self, name):
+        """Returns a 2-tuple (shape, owner) for the shape called `name`, where
+        `owner` is the group whose named_shapes holds it."""
+        index = self.name_index()
+        if name in index.duplicates:
+            raise AmbiguousNameError(f"group contains multiple shapes named '{name}'")
+        try:
+            return index.names[name]
+        except KeyError:
+            raise KeyError(f"named shape '{name}' not found") from None
 
     @property
     def bounds(self):
         """Default bounds method. This is guaranteed to work, and should be fast
         enough with small number of shapes. Subclasses with large numbers of
-        shapes may see performance benefits from overriding this method.
+        shapes may see performance benefits from overriding this method, or
+        from using the AUX bounds encoding.
         """
         if self._bounds is None:
-            left_edge   = Min(shape.bounds.left_edge   for shape in self.shapes)
-            right_edge  = Max(shape.bounds.right_edge  for shape in self.shapes)
-            top_edge    = Min(shape.bounds.top_edge    for shape in self.shapes)
-            bottom_edge = Max(shape.bounds.bottom_edge for shape in self.shapes)
-            self._bounds = Bounds(left_edge, right_edge, top_edge, bottom_edge)
+            if self.bounds_encoding is AUX:
+                self._bounds = Bounds()
+            else:
+                left_edge   = Min(shape.bounds.left_edge   for shape in self.shapes)
+                right_edge  = Max(shape.bounds.right_edge  for shape in self.shapes)
+                top_edge    = Min(shape.bounds.top_edge    for shape in self.shapes)
+                bottom_edge = Max(shape.bounds.bottom_edge for shape in self.shapes)
+                self._bounds = Bounds(left_edge, right_edge, top_edge, bottom_edge)
         return self._bounds
 
+    def aux_edges(self):
+        """Returns a list of 3-tuples (edge, candidates, pick), one per edge of
+        AUX-encoded bounds. `pick` is min or max."""
+        bounds = self.bounds
+        return list(zip((bounds.left_edge, bounds.right_edge,
+                         bounds.top_edge, bounds.bottom_edge),
+                        self.member_edge_candidates(),
+                        (min, max, min, max)))
+
+    def edge_candidates(self):
+        # a MINMAX group's edges are just the extremes of its members' edges,
+        # so we can pass those along instead of our own Min/Max terms
+        if self.bounds_encoding is MINMAX and type(self).bounds is Group.bounds:
+            return self.member_edge_candidates()
+        return super().edge_candidates()
+
+    def member_edge_candidates(self):
+        candidates = ([], [], [], [])
+        for shape in self.shapes:
+            for edge, terms in zip(candidates, shape.edge_candidates()):
+                edge.extend(terms)
+        return candidates
+
+    def aux_bounds_groups(self):
+        """Yields this group and its subgroups, if they have AUX-encoded
+        bounds which have been used, parents before children."""
+        for group in chain([self], self.subgroups()):
+            if group.bounds_encoding is AUX and group._bounds is not None:
+                yield group
+
     @cached_property
     def shapes(self):
         # can't set this in __init__ because we want it to be available to
         # dataclass subclasses
-        return []
+        return ShapeList()
 
     @cached_property
     def named_shapes(self):
         # defined here for same reason as with shapes()
-        return {}
+        return NameDict()
 
-    @cached_property
+    @property
     def constraints(self):
-        constraints = []
-        for shape in self.shapes:
-            try: constraints.extend(shape.constraints)
-            except AttributeError: pass
-        return constraints
-
-    def solve(self, simplify=False):
-        formula = And(self.constraints)
-        if simplify:
-            formula = formula.simplify()
-        model = get_model(formula)
+        # a property for the same reason as shapes(). see Constraints
+        try:
+            return self._constraints
+        except AttributeError:
+            self._constraints = Constraints(self)
+            return self._constraints
+
+    @constraints.setter
+    def constraints(self, constraints):
+        if constraints is not self.constraints:  # (as after +=)
+            self.constraints.own = ConstraintList(constraints)
+
+    def solve(self, simplify=False, engine=AUTO, presolve=True, split=True,
+              executor=None, session=None, cache=None, solver_name=None,
+              logic=None, timeout=None, portfolio=None):
+        """Returns an obsidian.solve.Solution satisfying the group's
+        constraints. See obsidian.solve.solve_formula() for what the arguments
+        do. `solver_name`, `logic`, `timeout` and `portfolio` pick the SMT
+        backend; see obsidian.backends.Backend. The timeout covers the whole
+        solve.
+
+        If an obsidian.incremental.SolverSession is passed as `session`, the
+        constraints are solved incrementally in that session instead (and the
+        other arguments are ignored)."""
+        backend = Backend(solver_name, logic, timeout, portfolio)
+        stats = active()
+
+        def solve_constraints(constraints):
+            formula = And(constraints)
+            stats.record_formula(formula)
+            if session is not None:
+                stats.count("solver_calls")
+                with stats.phase("smt"):
+                    return formula, session.solve(constraints)
+            if simplify:
+                with stats.phase("simplify"):
+                    formula = formula.simplify()
+            return formula, solve_formula(formula, engine, presolve, split,
+                                          executor, cache, backend)
+
+        groups = list(self.aux_bounds_groups())
+        if not groups:
+            formula, model = solve_constraints(self.constraints)
+            assert model is not None  # check for unsatisfiability
+            return Solution.from_model(model, formula.get_free_variables())
+
+        # a parent's edge candidates include its AUX children's edges, so
+        # those children need settling too, even if nothing has used their
+        # bounds yet
+        for group in chain([self], self.subgroups()):
+            if group.bounds_encoding is AUX:
+                group.bounds
+        groups = list(self.aux_bounds_groups())
+
+        witnesses = {}
+        for _ in range(AUX_ROUNDS):
+            formula, model = solve_constraints(self.constraints + [
+                Equals(edge, term) for edge, term in witnesses.items()])
+            if model is None:
+                break  # bad witnesses, maybe; the fallback will tell
+            model = as_model(model, formula)
+            with stats.phase("aux_bounds"):
+                settled = settle_aux_bounds(groups, formula, model, witnesses)
+            if settled:
+                return Solution.from_model(model, ())
+
+        formula, model = solve_constraints(self.constraints + [
+            Equals(edge, Min(terms) if pick is min else Max(terms))
+            for group in groups for edge, terms, pick in group.aux_edges()])
         assert model is not None  # check for unsatisfiability
-        return model
+        return Solution.from_model(model, formula.get_free_variables())
 
-    def subgroups(self):
-        """Yields groups contained within this group or its subgroups."""
+    def child_groups(self):
+        """Yields groups contained directly within this group."""
         for s in self.shapes:
             if isinstance(s, Group):
                 yield s
-                yield from s.subgroups()
+
+    def subgroups(self):
+        """Yields groups contained within this group or its subgroups."""
+        for group in self.child_groups():
+            yield group
+            yield from group.subgroups()
 
     def items(self, ignore_duplicates=False):
         """Iterates over named shapes in this group and its subgroups.
@@ -136,16 +497,100 @@ class Group(Shape):
         if ignore_duplicates:
             yield from inner_iter()
         else:
-            seen_names = set()
-            for t in inner_iter():
-                if t[0] in seen_names:
-                    raise AmbiguousNameError(f"duplicate name detected: {t[0]} (pass ignore_duplicates=True to suppress this error)")
-                seen_names.add(t[0])
-                yield t
+            index = self.name_index()
+            if index.duplicates:
+                name = next(iter(index.duplicates))
+                raise AmbiguousNameError(f"duplicate name detected: {name} (pass ignore_duplicates=True to suppress this error)")
+            for name, (shape, _) in index.names.items():
+                yield name, shape
 
     def rename(self, shape_name, new_name):
-        """Renames a named shape from `shape_name` to `new_name`."""
-        raise NotImplementedError()  # TODO
+        """Renames a named shape from `shape_name` to `new_name`.
+
+        Raises a KeyError if `shape_name` isn't found, and an
+        AmbiguousNameError if it's ambiguous or if `new_name` is already
+        taken."""
+        shape, owner = self.lookup(shape_name)
+        if new_name == shape_name:
+            return
+        if new_name in self:
+            raise AmbiguousNameError(f"group already contains a shape named '{new_name}'")
+
+        # rebuild the owner's dict so the renamed shape keeps its place in it
+        named_shapes = owner.named_shapes
+        renamed = [(new_name if name == shape_name else name, s)
+                   for name, s in named_shapes.items()]
+        named_shapes.clear()
+        named_shapes.update(renamed)
+
+
+def as_model(model, formula):
+    """Returns `model` as an obsidian.solve.Model, so that values can be added
+    to it."""
+    if isinstance(model, Model):
+        return model
+    return Model(model_values(model, formula.get_free_variables()))
+
+
+def settle_aux_bounds(groups, formula, model, witnesses):
+    """Checks the AUX-encoded bounds of `groups` against `model`.
+
+    Edges which `formula` refers to should equal their extreme member's edge.
+    Where they don't, this picks a new witness for the edge (i.e. the member
+    that actually is extreme) and returns False, so that the caller can
+    re-solve. Edges `formula` doesn't refer to are computed and added to
+    `model`. Returns True if every edge checked out.
+
+    `groups` must list parents before children, as aux_bounds_groups() does.
+    They're settled in reverse, so that children's edges are in `model`
+    before they're used as candidates for their parents' edges (otherwise
+    they'd read as 0).
+    """
+    used = set(formula.get_free_variables())
+    settled = True
+    for group in reversed(groups):  # children first
+        for edge, terms, pick in group.aux_edges():
+            values = [model[term].constant_value() for term in terms]
+            best = pick(range(len(terms)), key=values.__getitem__)
+            if edge not in used:
+                model.update([(edge, values[best])])
+            elif not close(model[edge].constant_value(), values[best]):
+                witnesses[edge] = terms[best]
+                used.update(terms[best].get_free_variables())
+                settled = False
+    return settled
+
+
+class GridCells(Sequence):
+    """The shapes of a compact ShapeGrid, in row-major order.
+
+    Cells are built on first access, by moving a copy of the grid's first cell
+    into place, and are kept from then on so that changes made to them (e.g.
+    to their style) stick."""
+
+    def __init__(self, grid, origin):
+        self.grid = grid
+        self.origin = origin
+        self.cells = {0: origin}
+
+    def __len__(self):
+        return self.grid.w * self.grid.h
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("grid cell index out of range")
+        cell = self.cells.get(i)
+        if cell is None:
+            row, col = divmod(i, self.grid.w)
+            pitch_x, pitch_y = self.grid.pitch
+            cell = self.cells[i] = self.origin.translated(col * pitch_x,
+                                                          row * pitch_y)
+        return cell
 
 
 @dataclass
@@ -163,20 +608,39 @@ class ShapeGrid(Group):
     This example builds a 5x5 grid of squares with 10px sides and 2px margins:
     >>> grid = ShapeGrid(w=5, h=5, spacing=2,
             factory=Rectangle.factory(width=10, height=10))
+
+    With `compact=True`, `factory` is only called once. Every other cell is a
+    copy of that first cell, placed directly in terms of its position (so no
+    new symbols or constraints are needed), and only built when it's first
+    accessed. See GridCells. This needs cells that Shape.translated() knows
+    how to move, so it doesn't work for grids of Groups.
     """
 
     w: REAL
     h: REAL
     spacing: REAL  # TODO does this one have to be explicitly defined?
     factory: Callable
+    compact: bool = False
 
     def __post_init__(self):
+        if self.compact:
+            origin = self.factory()
+            if isinstance(origin, Group):
+                raise TypeError("compact ShapeGrids can't hold Groups")
+            self.shapes = GridCells(self, origin)
+            return
+
         w, h = self.w, self.h
         spacing = self.spacing
         factory = self.factory
         constraints = self.constraints
 
-        grid = [[factory() for _ in range(w)] for _ in range(h)]
+        many = getattr(factory, "many", None)  # see Shape.factory()
+        if many is not None:
+            cells = many(w * h)
+            grid = [cells[row * w:(row + 1) * w] for row in range(h)]
+        else:
+            grid = [[factory() for _ in range(w)] for _ in range(h)]
 
         # align rows and columns
         for row in grid:
@@ -200,6 +664,29 @@ class ShapeGrid(Group):
         # flatten the grid and store it
         self.shapes.extend(shape for row in grid for shape in row)
 
+    @property
+    def shapes(self):
+        try:
+            return self._shapes
+        except AttributeError:
+            self._shapes = ShapeList()
+            return self._shapes
+
+    @shapes.setter
+    def shapes(self, shapes):
+        global generation
+        generation = next(generations)  # the old shapes might have been indexed
+        self._shapes = shapes
+
+    @cached_property
+    def pitch(self):
+        """A 2-tuple holding the distances between the left edges of adjacent
+        columns and the top edges of adjacent rows. These are plain numbers
+        if the cells' size is fixed, or pysmt terms otherwise."""
+        bounds = self.shapes[0].bounds
+        return (constant_or_term(bounds.width + self.spacing),
+                constant_or_term(bounds.height + self.spacing))
+
     @cached_property
     def bounds(self):
         ul_bounds = self.shapes[0].bounds
@@ -207,9 +694,47 @@ class ShapeGrid(Group):
         return Bounds(ul_bounds.left_edge, br_bounds.right_edge,
                       ul_bounds.top_edge, br_bounds.bottom_edge)
 
+    def child_groups(self):
+        if self.compact:
+            return iter(())  # cells are never groups; don't build them all
+        return super().child_groups()
+
+    def cell_positions(self, solution):
+        """Returns a 2-tuple of float64 arrays (array.array("d")s if numpy
+        isn't installed) holding the left and top edges of every cell (in the
+        same order as self.shapes), as placed by `solution`. For compact grids
+        these are computed without building any cells."""
+        if not self.compact:
+            return (solution.field(self.shapes, "bounds.left_edge"),
+                    solution.field(self.shapes, "bounds.top_edge"))
+        bounds = self.shapes[0].bounds
+        pitch_x, pitch_y = (pitch if isinstance(pitch, ABCReal)
+                            else solution.value(pitch) for pitch in self.pitch)
+        left, top = solution.value(bounds.left_edge), solution.value(bounds.top_edge)
+        if not available("numpy"):
+            return (array("d", [left + col * pitch_x
+                                for _ in range(self.h) for col in range(self.w)]),
+                    array("d", [top + row * pitch_y
+                                for row in range(self.h) for _ in range(self.w)]))
+        cols = np.tile(np.arange(self.w), self.h)
+        rows = np.repeat(np.arange(self.h), self.w)
+        return left + cols * pitch_x, top + rows * pitch_y
+
     def by_rows(self):
         yield from self.shapes
 
     def by_cols(self):
         for col in range(self.w):
             yield from self.shapes[col::self.w]
+
+
+def constant_or_term(term):
+    """Returns `term` as a number if it's linear with no symbols in it (once
+    like terms cancel out), or otherwise returns it as is."""
+    try:
+        coeffs, const = linear_term(term, {}, Fraction)
+    except NonLinearError:
+        return term
+    if any(coeffs.values()):
+        return term
+    return float(const)
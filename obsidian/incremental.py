@@ -0,0 +1,95 @@
+"""
+Incremental solving. A SolverSession keeps a live pysmt Solver around between
+solves, so that adding or removing a handful of constraints (e.g. placing one
+more stone on a go board) costs a quick re-check instead of a full re-solve.
+
+Example:
+>>> canvas = Canvas(board.get_group())
+>>> canvas.render(incremental=True)  # full solve
+>>> stone = board.make_black_stone()
+>>> canvas.group.shapes.append(stone)
+>>> canvas.group.constraints.append(stone.center |EQ| board.get_intersection(3, 3))
+>>> canvas.render(incremental=True)  # only the new constraint gets asserted
+
+Changes have to be made to the group the canvas is drawing. (GoBoard's
+get_group() builds a new Group each time, so e.g. board.add_stone() after
+the canvas was made would never reach it.)
+"""
+
+from pysmt.shortcuts import Solver
+
+from obsidian.backends import solver_lock
+
+
+class SolverSession:
+    """Wraps a live solver, and keeps track of which constraints have been
+    asserted in it.
+
+    Constraints present on the first solve are asserted permanently. Any added
+    after that are asserted inside push()ed frames, so that they can be
+    retracted again with pop() if they go away. Retracting one of the original
+    constraints forces a full reset.
+
+    Constraints are compared by identity. Since pysmt hash-conses its formulas,
+    rebuilding a constraint from the same parts yields the same FNode, so it
+    won't be asserted twice.
+    """
+
+    def __init__(self, solver_name=None, logic=None):
+        self.solver_name = solver_name
+        self.logic = logic
+        self.solver = None
+        self.reset()
+
+    def reset(self):
+        """Discards the live solver and everything asserted in it."""
+        with solver_lock:
+            if self.solver is not None:
+                self.solver.exit()
+            self.solver = Solver(name=self.solver_name, logic=self.logic)
+        self.base = None  # set of permanently asserted constraints
+        self.frames = []  # one set of constraints per push()
+
+    def solve(self, constraints):
+        """Returns a model for the conjunction of `constraints`, or None if
+        they're unsatisfiable."""
+        with solver_lock:
+            self.sync(constraints)
+            if not self.solver.solve():
+                return None
+            return self.solver.get_model()
+
+    def sync(self, constraints):
+        """Brings the solver's assertions in line with `constraints`."""
+        current = set(constraints)
+        if self.base is not None and not self.base <= current:
+            self.reset()
+
+        solver = self.solver
+        frames = self.frames
+        if self.base is None:
+            self.base = self.assert_new(constraints, set())
+            return
+
+        # pop back to the first frame holding a constraint that's gone
+        for i, frame in enumerate(frames):
+            if not frame <= current:
+                solver.pop(len(frames) - i)
+                del frames[i:]
+                break
+
+        asserted = self.base.union(*frames)
+        if not current <= asserted:
+            solver.push()
+            frames.append(self.assert_new(constraints, asserted))
+
+    def assert_new(self, constraints, asserted):
+        """Asserts those of `constraints` which aren't in `asserted`, in order.
+        Returns the set of constraints it asserted."""
+        new = set()
+        for constraint in constraints:
+            if constraint in asserted or constraint in new:
+                continue
+            self.solver.add_assertion(constraint)
+            new.add(constraint)
+        return new
@@ -15,6 +15,40 @@ from obsidian.helpers import wrap_real
 from obsidian.geometry import Point
 
 
+# here we patch a bug in pysmt so we can use our infix operators
+
+# in brief: pysmt FNode instances override __or__, but when they get an
+# unrecognized `other` argument they raise an exception instead of returning
+# NotImplemented. Returning NotImplemented would cause Python to attempt to
+# delegate to the right-hand argument's __ror__ method, and would raise a
+# ValueError only if that is also unsuccessful. This is the expected behavior.
+
+# to fix this, we wrap FNode.__or__ with a handler that catches the exception
+# and returns NotImpelemented so that Python's usual semantics are restored.
+
+# this lives here rather than in __init__.py so that it's only applied once
+# the infix operators it's needed for are imported.
+
+
+from pysmt.fnode import FNode
+from pysmt.exceptions import PysmtTypeError
+
+
+def make_wrapper(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        try:
+            return f(*args, **kwargs)
+        except PysmtTypeError:
+            return NotImplemented
+    wrapper.obsidian_patched = True
+    return wrapper
+
+
+if not getattr(FNode.__or__, "obsidian_patched", False):
+    FNode.__or__ = make_wrapper(FNode.__or__)
+
+
 class Infix:
     """
     Cute little hack for defining custom infix operators.
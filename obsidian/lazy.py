@@ -0,0 +1,40 @@
+"""
+Lazy imports. Some of our dependencies (numpy, scipy, drawSvg and the Cairo
+stack behind it) take a good fraction of a second to import, and plenty of
+uses of obsidian never touch them, so we put off importing them until they're
+actually needed.
+"""
+
+from functools import lru_cache
+from importlib import import_module
+from importlib.util import find_spec
+
+
+class LazyModule:
+    """Stands in for a module, importing it on first attribute access:
+
+    >>> np = LazyModule("numpy")  # doesn't import numpy yet
+    >>> np.arange(3)              # now it does
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        module = self._module
+        if module is None:
+            module = self._module = import_module(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+@lru_cache(maxsize=None)
+def available(name):
+    """Says whether module `name` is installed, without importing it. numpy,
+    scipy and cairocffi are optional (see setup.py's extras), and the code that uses
+    them checks this first, and does without them if need be."""
+    return find_spec(name) is not None
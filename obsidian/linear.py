@@ -0,0 +1,191 @@
+"""
+A fast path for constraint systems which are plain conjunctions of linear
+equalities over reals. Almost every constraint we generate (EQ, ABOVE_BY,
+left_align, evenly_spaced, ShapeGrid's spacing rules, ...) has this form, and
+for these systems a sparse linear solve is orders of magnitude cheaper than a
+trip through the SMT solver.
+
+Anything we don't know how to handle (Min/Max, which pysmt expresses as Ite
+terms; NotEquals; disjunctions; nonlinear products) makes linearize() give up
+and return None, so that the caller can fall back to SMT.
+"""
+
+import warnings
+
+from obsidian.lazy import LazyModule, available
+
+
+np = LazyModule("numpy")
+
+
+# solutions whose residuals exceed this (relative to the size of the
+# constants involved) are rejected, and the caller falls back to SMT
+TOLERANCE = 1e-9
+
+# solutions are rounded to this many decimal places where that's harmless
+DECIMALS = 9
+
+
+class NonLinearError(Exception): pass
+
+
+def linearize(formula):
+    """Compiles `formula` into a list of rows, one per equality. Each row is a
+    2-tuple (coeffs, const) representing the equation sum(coeffs) + const = 0,
+    where coeffs maps symbols to floats.
+
+    Returns None if `formula` is not a conjunction of linear equalities.
+    """
+    memo = {}
+    rows = []
+    stack = [formula]
+    try:
+        while stack:
+            node = stack.pop()
+            if node.is_and():
+                stack.extend(node.args())
+            elif node.is_true():
+                continue
+            elif node.is_equals():
+                lhs, rhs = node.args()
+                lhs_coeffs, lhs_const = linear_term(lhs, memo)
+                rhs_coeffs, rhs_const = linear_term(rhs, memo)
+                coeffs = dict(lhs_coeffs)
+                for sym, k in rhs_coeffs.items():
+                    coeffs[sym] = coeffs.get(sym, 0.0) - k
+                rows.append((coeffs, lhs_const - rhs_const))
+            else:
+                return None
+    except (NonLinearError, RecursionError):
+        return None
+    return rows
+
+
+def linear_term(node, memo, number=float):
+    """Returns a 2-tuple (coeffs, const) equal to the real-valued term `node`,
+    or raises NonLinearError. Results are memoized in `memo`, since pysmt terms
+    are DAGs and the same subterm (e.g. a shape's bounds) tends to recur.
+
+    Coefficients and constants are converted with `number`. Pass
+    number=Fraction for exact arithmetic (and don't share `memo` between calls
+    that use different number types)."""
+    try:
+        return memo[node]
+    except KeyError:
+        pass
+
+    if node.is_symbol():
+        if not node.symbol_type().is_real_type():
+            raise NonLinearError(node)
+        result = {node: number(1)}, number(0)
+    elif node.is_real_constant():
+        result = {}, number(node.constant_value())
+    elif node.is_plus():
+        coeffs, const = {}, number(0)
+        for arg in node.args():
+            arg_coeffs, arg_const = linear_term(arg, memo, number)
+            for sym, k in arg_coeffs.items():
+                coeffs[sym] = coeffs.get(sym, 0) + k
+            const += arg_const
+        result = coeffs, const
+    elif node.is_minus():
+        lhs, rhs = node.args()
+        coeffs, const = linear_term(lhs, memo, number)
+        coeffs = dict(coeffs)
+        rhs_coeffs, rhs_const = linear_term(rhs, memo, number)
+        for sym, k in rhs_coeffs.items():
+            coeffs[sym] = coeffs.get(sym, 0) - k
+        result = coeffs, const - rhs_const
+    elif node.is_times():
+        # a product is linear so long as at most one factor is non-constant
+        scale, term = number(1), None
+        for arg in node.args():
+            arg_coeffs, arg_const = linear_term(arg, memo, number)
+            if not arg_coeffs:
+                scale *= arg_const
+            elif term is None:
+                term = arg_coeffs, arg_const
+            else:
+                raise NonLinearError(node)
+        if term is None:
+            result = {}, scale
+        else:
+            coeffs, const = term
+            result = {sym: k * scale for sym, k in coeffs.items()}, const * scale
+    elif node.is_div():
+        lhs, rhs = node.args()
+        rhs_coeffs, rhs_const = linear_term(rhs, memo, number)
+        if rhs_coeffs or rhs_const == 0:
+            raise NonLinearError(node)
+        coeffs, const = linear_term(lhs, memo, number)
+        result = {sym: k / rhs_const for sym, k in coeffs.items()}, const / rhs_const
+    else:
+        raise NonLinearError(node)
+
+    memo[node] = result
+    return result
+
+
+def solve_linear(formula):
+    """Attempts to solve `formula` as a sparse linear system.
+
+    Returns a dict mapping each of the formula's symbols to a float, or None if
+    the formula isn't a conjunction of linear equalities or if no solution
+    could be found (in which case the system may be inconsistent, and it's up
+    to the SMT solver to say so).
+
+    Underdetermined systems are fine: we return their minimum-norm solution,
+    which is as good a choice as any other for the free variables.
+    """
+    if not available("scipy"):
+        return None  # it's optional, and SMT can handle anything we can
+    rows = linearize(formula)
+    if rows is None:
+        return None
+
+    # scipy is slow to import, so we wait until we know we'll need it
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.linalg import spsolve, lsmr, MatrixRankWarning
+
+    index = {}
+    data, row_ids, col_ids = [], [], []
+    b = np.empty(len(rows))
+    for i, (coeffs, const) in enumerate(rows):
+        for sym, k in coeffs.items():
+            if k == 0:
+                continue
+            data.append(k)
+            row_ids.append(i)
+            col_ids.append(index.setdefault(sym, len(index)))
+        b[i] = -const
+
+    if not index:
+        # every row is constant; the system's either trivially true or false
+        return {} if np.allclose(b, 0) else None
+
+    A = csr_matrix((data, (row_ids, col_ids)), shape=(len(rows), len(index)))
+    x = None
+    if A.shape[0] == A.shape[1]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", MatrixRankWarning)
+            x = spsolve(A.tocsc(), b)
+        if not np.all(np.isfinite(x)) or not residual_ok(A, x, b):
+            x = None
+    if x is None:
+        x = lsmr(A, b, atol=1e-14, btol=1e-14, maxiter=10 * max(A.shape))[0]
+        if not residual_ok(A, x, b):
+            return None
+
+    # iterative solvers leave noise in the last few bits (58.00000000000001
+    # and so on); clean it up if we can do so without breaking anything
+    snapped = np.round(x, DECIMALS)
+    if residual_ok(A, snapped, b):
+        x = snapped
+
+    return {sym: float(x[i]) for sym, i in index.items()}
+
+
+def residual_ok(A, x, b):
+    residual = np.abs(A @ x - b)
+    scale = 1 + np.abs(b).max()
+    return residual.max() <= TOLERANCE * scale
@@ -1,4 +1,8 @@
-import drawSvg as draw
+from obsidian.lazy import LazyModule
+
+
+draw = LazyModule("drawSvg")
+
 
 def arrow(scale, color):
     marker = draw.Marker(-0.1, -0.5, 0.9, 0.5, scale=scale, orient='auto')
@@ -0,0 +1,231 @@
+"""
+Presolving: shrinks a constraint formula before it's handed to a solver
+engine.
+
+Most of the constraints in a typical scene either alias one symbol to another
+(top_align, left_align, point_equals, ...) or pin a symbol to a constant. We
+merge aliased symbols with union-find, substitute known constants, and drop
+constraints which become trivially true, repeating until nothing changes. The
+engine only sees what's left over, and Presolved.expand() recovers values for
+every one of the original formula's symbols afterwards.
+"""
+
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from fractions import Fraction
+
+from pysmt.shortcuts import And, Real
+
+from obsidian.linear import linear_term, NonLinearError
+
+
+@dataclass
+class PresolveStats:
+    symbols_removed: int
+    constraints_removed: int
+
+
+class UnionFind:
+    """Disjoint sets of symbols. Each set may be pinned to a constant value."""
+
+    def __init__(self):
+        self.parent = {}
+        self.values = {}  # root -> Fraction
+
+    def find(self, sym):
+        parent = self.parent
+        root = sym
+        while root in parent:
+            root = parent[root]
+        while sym is not root:  # path compression
+            parent[sym], sym = root, parent[sym]
+        return root
+
+    def union(self, a, b):
+        """Merges the sets containing `a` and `b`, and returns the merged
+        set's root."""
+        a, b = self.find(a), self.find(b)
+        if a is not b:
+            self.parent[b] = a
+            if b in self.values:
+                self.values[a] = self.values.pop(b)
+        return a
+
+    def pin(self, sym, value):
+        """Pins the set containing `sym` to `value`. Returns False (and does
+        nothing) if the set is already pinned to a different value."""
+        root = self.find(sym)
+        old_value = self.values.setdefault(root, value)
+        return old_value == value
+
+    def resolve(self, sym):
+        """Returns the term `sym` should be replaced with, or None if `sym`
+        is a free root."""
+        root = self.find(sym)
+        if root in self.values:
+            return Real(self.values[root])
+        return None if root is sym else root
+
+
+class Presolved:
+    """The result of presolving a formula. `formula` holds the residual
+    formula, which is what should actually be passed to a solver."""
+
+    def __init__(self, formula, original, sets, stats):
+        self.formula = formula
+        self.original = original
+        self.sets = sets
+        self.stats = stats
+
+    def expand(self, values):
+        """Takes a {symbol: value} dict solving the residual formula, and
+        returns a dict mapping each of the original formula's symbols to its
+        value. Symbols the residual formula doesn't mention come out as 0."""
+        sets = self.sets
+        expanded = {}
+        for sym in self.original.get_free_variables():
+            root = sets.find(sym)
+            if root in sets.values:
+                expanded[sym] = sets.values[root]
+            else:
+                expanded[sym] = values.get(root, 0)
+        return expanded
+
+
+def presolve_formula(formula):
+    """Presolves `formula`, returning a Presolved instance."""
+    sets = UnionFind()
+    n_constraints = len(conjuncts(formula))
+    n_symbols = len(formula.get_free_variables())
+
+    residual = formula
+    while True:
+        kept, eliminated = propagate(conjuncts(residual), sets)
+        if not eliminated:
+            break
+
+        # substitute everything we've learned into what's left. this can turn
+        # some of the remaining constraints (e.g. ones involving Min/Max) into
+        # ones we can eliminate, so we go around again
+        subs = {}
+        for atom in kept:
+            for sym in atom.get_free_variables():
+                term = sets.resolve(sym)
+                if term is not None:
+                    subs[sym] = term
+        residual = And(kept).substitute(subs).simplify()
+        if residual.is_false():
+            break
+
+    stats = PresolveStats(
+        symbols_removed=n_symbols - len(residual.get_free_variables()),
+        constraints_removed=n_constraints - len(conjuncts(residual)),
+    )
+    return Presolved(residual, formula, sets, stats)
+
+
+def conjuncts(formula):
+    """Flattens a conjunction into a list of its (non-And) conjuncts."""
+    atoms = []
+    stack = [formula]
+    while stack:
+        node = stack.pop()
+        if node.is_and():
+            stack.extend(node.args())
+        elif not node.is_true():
+            atoms.append(node)
+    return atoms
+
+
+def propagate(atoms, sets):
+    """Absorbs as many of `atoms` into `sets` as possible, either as aliases
+    (x = y) or as constants (k*x + c = 0). Returns a 2-tuple: the list of atoms
+    which couldn't be absorbed, and the number of atoms which were.
+
+    Absorbing one atom can make others absorbable (think of a chain of
+    ABOVE_BY constraints with one end pinned), so each set keeps a list of the
+    atoms that mention it, and those get revisited whenever the set changes.
+    """
+    memo = {}
+    forms = {}
+    kept = []
+    watchers = defaultdict(list)  # root -> indices of atoms mentioning it
+    for i, atom in enumerate(atoms):
+        form = linear_form(atom, memo) if atom.is_equals() else None
+        if form is None:
+            kept.append(atom)
+            continue
+        forms[i] = form
+        for sym in form[0]:
+            watchers[sets.find(sym)].append(i)
+
+    queue = deque(forms)
+    queued = set(forms)
+    eliminated = 0
+    while queue:
+        i = queue.popleft()
+        queued.discard(i)
+        result = absorb(forms[i], sets, watchers)
+        if result is None:  # not absorbable (yet)
+            continue
+
+        del forms[i]
+        if result is False:  # contradiction; leave it for the engine
+            kept.append(atoms[i])
+            continue
+
+        eliminated += 1
+        for root in result:
+            for j in watchers[root]:
+                if j in forms and j not in queued:
+                    queue.append(j)
+                    queued.add(j)
+
+    kept.extend(atoms[i] for i in forms)
+    return kept, eliminated
+
+
+def linear_form(atom, memo):
+    """Returns the equality `atom` as a 2-tuple (coeffs, const) representing
+    sum(coeffs) + const = 0, using exact arithmetic, or returns None if `atom`
+    isn't linear."""
+    lhs, rhs = atom.args()
+    try:
+        lhs_coeffs, lhs_const = linear_term(lhs, memo, Fraction)
+        rhs_coeffs, rhs_const = linear_term(rhs, memo, Fraction)
+    except (NonLinearError, RecursionError):
+        return None
+
+    coeffs = dict(lhs_coeffs)
+    for sym, k in rhs_coeffs.items():
+        coeffs[sym] = coeffs.get(sym, 0) - k
+    return coeffs, lhs_const - rhs_const
+
+
+def absorb(form, sets, watchers):
+    """Rewrites `form` in terms of the current sets and tries to absorb it.
+    Returns None if it can't be absorbed, False if it contradicts what we
+    already know, or otherwise a list of the roots it changed."""
+    coeffs, const = form
+    reduced = {}
+    for sym, k in coeffs.items():
+        root = sets.find(sym)
+        if root in sets.values:
+            const += k * sets.values[root]
+        else:
+            reduced[root] = reduced.get(root, 0) + k
+    reduced = [(root, k) for root, k in reduced.items() if k != 0]
+
+    if not reduced:
+        return [] if const == 0 else False
+    if len(reduced) == 1:
+        (root, k), = reduced
+        return [root] if sets.pin(root, -const / k) else False
+    if len(reduced) == 2 and const == 0:
+        (a, k_a), (b, k_b) = reduced
+        if k_a == -k_b:
+            root = sets.union(a, b)
+            other = b if root is a else a
+            watchers[root].extend(watchers.pop(other, ()))
+            return [root]
+    return None
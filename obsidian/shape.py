@@ -1,12 +1,162 @@
-from dataclasses import dataclass, fields
+from dataclasses import dataclass, fields, replace, MISSING
+from functools import wraps
 from numbers import Real as ABCReal
+from operator import attrgetter, is_
 
-from obsidian.fields import SMTField
+from obsidian.fields import SMTField, fresh_real
 
-from pysmt.shortcuts import Real
+from pysmt.fnode import FNode
+from pysmt.shortcuts import Real, get_env
 from pysmt.typing import REAL
 
 
+def derived(*inputs):
+    """Decorator for properties computed from some of an object's attributes
+    (named in `inputs`; dotted names like "pt1.x" work too), e.g. a shape's
+    bounds. The value is cached on the object, and only recomputed once one
+    of the inputs has been reassigned. Inputs are compared by identity, which
+    is cheap, and is what we want for pysmt terms: they're interned, and ==
+    on them builds an Equals term rather than comparing anything."""
+    get_inputs = attrgetter(*inputs)
+    single = len(inputs) == 1
+
+    def decorator(f):
+        name = f.__name__
+
+        @wraps(f)
+        def get(self):
+            key = get_inputs(self)
+            if single:
+                key = (key,)
+            try:
+                memo = self._memo
+            except AttributeError:  # unset slot (see slotted())
+                memo = None
+            if memo is None:
+                memo = self._memo = {}
+            entry = memo.get(name)
+            if entry is not None and all(map(is_, entry[0], key)):
+                return entry[1]
+            value = f(self)
+            memo[name] = (key, value)
+            return value
+
+        return property(get)
+    return decorator
+
+
+# shape classes decorated with slotted()
+SLOTTED = set()
+
+
+def slotted(cls):
+    """Class decorator (for above @dataclass) which rebuilds a dataclass with
+    __slots__ for its fields, so that its instances don't each carry a
+    __dict__. This is what dataclass(slots=True) does in Python 3.10+.
+
+    Slotted shapes can't be given attributes other than their fields, and
+    their subclasses get a __dict__ again unless they're slotted too."""
+    names = tuple(field.name for field in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    for name in names + ("_memo",):
+        cls_dict.pop(name, None)  # class-level defaults would clash with the slots
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    cls_dict["__slots__"] = names + ("_memo",)
+    new_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    new_cls.__qualname__ = cls.__qualname__
+    SLOTTED.add(new_cls)
+    return new_cls
+
+
+class Plan:
+    """What Shape.__post_init__() and Factory.many() need to know about a
+    shape class, worked out once per class (see plan())."""
+
+    def __init__(self, cls):
+        self.fields = fields(cls)
+        self.reals = tuple(field.name for field in self.fields if field.type is REAL)
+        # whether Factory.many() can fill in instances' fields itself rather
+        # than calling __init__. we only know this is safe for our own classes
+        self.direct = cls in SLOTTED and cls.__post_init__ is Shape.__post_init__
+
+
+# shape class -> Plan
+plans = {}
+
+
+def plan(cls):
+    entry = plans.get(cls)
+    if entry is None:
+        entry = plans[cls] = Plan(cls)
+    return entry
+
+
+def as_real(val):
+    """Converts plain numbers to pysmt Reals, and leaves anything else be."""
+    if not isinstance(val, FNode) and isinstance(val, ABCReal):
+        return Real(val)
+    return val
+
+
+class Factory:
+    """A shape factory, as returned by Shape.factory(). Calling it makes one
+    shape; many() makes lots at once."""
+
+    def __init__(self, cls, kwargs):
+        self.cls = cls
+        self.kwargs = kwargs
+
+    def __call__(self, *args, **kwargs):
+        return self.cls(*args, **{**self.kwargs, **kwargs})
+
+    def many(self, n, **kwargs):
+        """Returns a list of `n` new shapes, built with this factory's keyword
+        args plus `kwargs` (which take precedence). Every shape gets the same
+        values for those, and fresh ones for everything else, as usual.
+
+        This is quicker than calling the factory `n` times: numbers in the
+        args are converted to Reals once, not once per shape, and for our own
+        (slotted) shape classes the fields are filled in directly instead of
+        going through __init__."""
+        cls = self.cls
+        kwargs = {**self.kwargs, **kwargs}
+        cls_plan = plan(cls)
+        for name in cls_plan.reals:
+            if name in kwargs:
+                kwargs[name] = as_real(kwargs[name])
+        if not cls_plan.direct:
+            return [cls(**kwargs) for _ in range(n)]
+
+        values, factories = [], []
+        new_symbol = get_env().formula_manager.FreshSymbol
+        for field in cls_plan.fields:
+            if field.name in kwargs:
+                values.append((field.name, kwargs.pop(field.name)))
+            elif field.default is not MISSING:
+                values.append((field.name, field.default))
+            elif field.default_factory is fresh_real:
+                factories.append((field.name, lambda: new_symbol(REAL)))
+            elif field.default_factory is not MISSING:
+                factories.append((field.name, field.default_factory))
+            else:
+                raise TypeError(f"{cls.__name__}.factory() is missing a value for '{field.name}'")
+        if kwargs:
+            raise TypeError(f"{cls.__name__} has no field '{next(iter(kwargs))}'")
+
+        shapes = []
+        new = object.__new__
+        for _ in range(n):
+            shape = new(cls)
+            for name, val in values:
+                setattr(shape, name, val)
+            for name, factory in factories:
+                setattr(shape, name, factory())
+            shapes.append(shape)
+        return shapes
+
+
+@slotted
 @dataclass
 class Bounds:
     left_edge: REAL = SMTField()
@@ -14,9 +164,16 @@ class Bounds:
     top_edge: REAL = SMTField()
     bottom_edge: REAL = SMTField()
 
-    def __post_init__(self):
-        self.width = self.right_edge - self.left_edge
-        self.height = self.bottom_edge - self.top_edge
+    _memo = None  # see derived()
+
+    # these are only built if somebody asks for them
+    @derived("left_edge", "right_edge")
+    def width(self):
+        return self.right_edge - self.left_edge
+
+    @derived("top_edge", "bottom_edge")
+    def height(self):
+        return self.bottom_edge - self.top_edge
 
     # i go back and forth on whether i prefer "top/bottom" or "upper/lower", so
     # here are some aliases that let us have it both ways :)
@@ -41,15 +198,20 @@ class Shape:
     Provides a __post_init__ method which replaces any real-annotated fields'
     values with their pysmt.Real equivalents, so that native Python numbers can
     be passed into shape dataclasses without issue.
+
+    Subclasses can cache their bounds (and anything else computed from their
+    fields) with @derived, so that the terms in them aren't rebuilt on every
+    access. Shape.center is cached this way too.
     """
 
+    __slots__ = ()  # so that slotted() subclasses don't get a __dict__
+    _memo = None  # see derived()
+
     def __post_init__(self):
-        for field in fields(self):
-            if field.type is not REAL:
-                continue
-            attr = getattr(self, field.name)
-            if isinstance(attr, ABCReal):
-                setattr(self, field.name, Real(attr))
+        for name in plan(type(self)).reals:
+            attr = getattr(self, name)
+            if not isinstance(attr, FNode) and isinstance(attr, ABCReal):
+                setattr(self, name, Real(attr))
 
     @classmethod
     def factory(cls, **kwargs):
@@ -63,14 +225,43 @@ class Shape:
         factories for use with e.g. obsidian.shapes.ShapeGrid in a readable way
         (i.e. without having to expose the reader to uninteresting details like
         lambdas or ** notation).
+
+        The factory's many() method builds lots of shapes at once; see
+        Factory.many().
         """
-        return lambda *args, **kw: cls(*args, **kwargs, **kw)
+        return Factory(cls, kwargs)
 
     @property
     def bounds(self):
         raise NotImplementedError
 
-    @property
+    def translated(self, dx, dy):
+        """Returns a copy of the shape moved by (dx, dy). This works for shapes
+        positioned by `x` and `y` fields, or by fields holding other shapes
+        (e.g. a Line's endpoints). Everything else, style included, is shared
+        with the original."""
+        offsets = {"x": dx, "y": dy}
+        changes = {}
+        for field in fields(self):
+            val = getattr(self, field.name)
+            if isinstance(val, Shape):
+                changes[field.name] = val.translated(dx, dy)
+            elif field.name in offsets:
+                offset = offsets[field.name]
+                if not (isinstance(offset, ABCReal) and offset == 0):
+                    changes[field.name] = val + offset
+        return replace(self, **changes)
+
+    def edge_candidates(self):
+        """Returns a 4-tuple of tuples (lefts, rights, tops, bottoms) holding
+        terms whose minimum (for lefts and tops) or maximum (for rights and
+        bottoms) give the shape's edges. Groups using the AUX bounds encoding
+        use these directly, rather than wrapping them in Min/Max terms."""
+        bounds = self.bounds
+        return ((bounds.left_edge,), (bounds.right_edge,),
+                (bounds.top_edge,), (bounds.bottom_edge,))
+
+    @derived("bounds")
     def center(self):
         from obsidian.geometry import Point
         bounds = self.bounds
@@ -0,0 +1,333 @@
+"""
+Solver engines. Group.solve() hands its formula to solve_formula(), which
+decides how it actually gets solved.
+
+The AUTO engine tries the sparse linear solver first and falls back to SMT for
+anything the linear solver can't handle. SMT and LINEAR force one or the other.
+
+Unless told otherwise, formulas are presolved first (see obsidian.presolve) so
+that the engine only has to deal with the residual formula, and the residual
+formula is split into independent components (see obsidian.components) which
+get solved one at a time, or in parallel if an executor is provided. Solved
+models can also be cached (see obsidian.cache). Whatever needs an SMT solver
+goes to the solver(s) picked by a Backend (see obsidian.backends).
+"""
+
+import os
+from array import array
+from enum import Enum
+from operator import attrgetter
+
+from pysmt.shortcuts import Real, Symbol
+from pysmt.solvers.eager import EagerModel
+from pysmt.typing import REAL
+
+from obsidian.backends import Backend
+from obsidian.cache import Canonical, evaluate_formula
+from obsidian.components import (split_components, batch_components,
+                                 serialize, deserialize)
+from obsidian.environments import session
+from obsidian.lazy import LazyModule, available
+from obsidian.linear import solve_linear
+from obsidian.presolve import presolve_formula
+from obsidian.stats import active
+
+
+np = LazyModule("numpy")
+
+
+Engines = Enum("Engines", "AUTO SMT LINEAR")
+AUTO, SMT, LINEAR = Engines
+
+
+# thrown when the LINEAR engine is requested for a formula it can't solve
+class EngineError(Exception): pass
+
+
+class Model(EagerModel):
+    """A pysmt model built from a plain {symbol: value} assignment, for engines
+    that don't go through a pysmt solver. Supports the same model[expr] lookups
+    as the models pysmt hands back, but skips pysmt's substitute-and-simplify
+    step for bare symbols and constants, since that's what the renderers ask
+    for. Compound terms only get their own free variables substituted (pysmt
+    would pass it the whole assignment, which is slow for big models).
+
+    The values themselves are kept as plain numbers in `values`, and only get
+    wrapped in pysmt constants when they're looked up.
+
+    If the formula was presolved, `presolve_stats` reports how much presolving
+    removed."""
+
+    presolve_stats = None
+
+    def __init__(self, values, environment=None):
+        super().__init__({}, environment)
+        self.values = dict(values)
+
+    def update(self, values):
+        """Adds the given (symbol, value) pairs to the model."""
+        for sym, val in dict(values).items():
+            self.values[sym] = val
+            self.assignment.pop(sym, None)
+            self.completed_assignment.pop(sym, None)
+
+    def get_value(self, formula, model_completion=True):
+        try:
+            return self.assignment[formula]
+        except KeyError:
+            pass
+        if formula in self.values:
+            val = self.assignment[formula] = Real(self.values[formula])
+            self.completed_assignment[formula] = val
+            return val
+        if formula.is_constant():
+            return formula
+        if formula.is_symbol():
+            return super().get_value(formula, model_completion)
+        syms = formula.get_free_variables()
+        subs = {s: self.get_value(s, model_completion) for s in syms}
+        return formula.substitute(subs).simplify()
+
+    def __iter__(self):
+        return ((sym, self.get_value(sym)) for sym in self.values)
+
+    def __contains__(self, x):
+        return x in self.values
+
+
+def model_values(model, symbols):
+    """Returns a dict mapping each of `symbols` to its value in `model`, as a
+    plain number."""
+    if isinstance(model, Model):
+        values = model.values
+        return {sym: values[sym] if sym in values
+                     else model[sym].constant_value()
+                for sym in symbols}
+    return {sym: model[sym].constant_value() for sym in symbols}
+
+
+class Solution:
+    """Solved values for a group's symbols, as returned by Group.solve().
+
+    The values are extracted from the solver's model in one go, and stored as
+    a float64 array (`values`), alongside a {symbol: index} dict (`index`).
+    Looking up a symbol is then just an array read, and whole collections of
+    terms can be read at once:
+
+    >>> solution = grid.solve()
+    >>> xs = solution.field(grid.shapes, "x")  # numpy array of x coordinates
+
+    numpy is optional (see setup.py's extras). Without it, the arrays are
+    array.array("d")s instead.
+
+    solution[expr] returns a pysmt constant, like a pysmt model would, so that
+    code written against models keeps working. solution.value(expr) skips the
+    pysmt constant and returns a float.
+
+    Solutions can be pickled. Symbols are pickled by name, which makes this
+    cheap, and the unpickled solution uses the symbols of that name in the
+    receiving process' pysmt environment.
+    """
+
+    presolve_stats = None
+
+    def __init__(self, values, presolve_stats=None):
+        """`values` is a {symbol: number} dict."""
+        self.symbols = list(values)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.values = float_array((float(val) for val in values.values()),
+                                  len(values))
+        self.presolve_stats = presolve_stats
+
+    @classmethod
+    def from_model(cls, model, symbols):
+        """Builds a Solution from a pysmt model (or obsidian Model), taking the
+        values of `symbols` - plus everything else an obsidian Model knows."""
+        with active().phase("extract"):
+            values = model_values(model, symbols)
+            if not isinstance(model, Model):
+                return cls(values)
+            return cls({**model.values, **values}, model.presolve_stats)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __contains__(self, sym):
+        return sym in self.index
+
+    def __getitem__(self, expr):
+        return Real(self.value(expr))
+
+    def get_value(self, expr):
+        return self[expr]
+
+    def value(self, expr):
+        """Returns the value of `expr` (a symbol, constant or term) as a
+        float. Symbols we don't know about are 0, like in a completed pysmt
+        model."""
+        i = self.index.get(expr)
+        if i is not None:
+            return float(self.values[i])
+        if expr.is_constant():
+            return float(expr.constant_value())
+        if expr.is_symbol():
+            return 0.0
+        values = {sym: self.value(sym) for sym in expr.get_free_variables()}
+        try:
+            return float(evaluate_formula(expr, values))
+        except KeyError:  # something the float evaluator doesn't handle
+            subs = {sym: Real(val) for sym, val in values.items()}
+            return float(expr.substitute(subs).simplify().constant_value())
+
+    def values_of(self, exprs):
+        """Returns a float64 array holding the values of `exprs`."""
+        exprs = list(exprs)
+        index = self.index
+        try:
+            if not available("numpy"):
+                values = self.values
+                return array("d", [values[index[expr]] for expr in exprs])
+            indices = np.fromiter((index[expr] for expr in exprs),
+                                  dtype=np.intp, count=len(exprs))
+        except KeyError:  # not all bare symbols, so take the slow path
+            return float_array((self.value(expr) for expr in exprs), len(exprs))
+        return self.values[indices]
+
+    def field(self, shapes, name):
+        """Returns a float64 array holding each of `shapes`' values for the
+        field or attribute `name` (which may be dotted, e.g. "pt1.x")."""
+        return self.values_of(map(attrgetter(name), shapes))
+
+    def __getstate__(self):
+        return {"names": [sym.symbol_name() for sym in self.symbols],
+                "values": self.values,
+                "presolve_stats": self.presolve_stats}
+
+    def __setstate__(self, state):
+        self.symbols = [Symbol(name, REAL) for name in state["names"]]
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.values = state["values"]
+        self.presolve_stats = state["presolve_stats"]
+
+
+def float_array(values, count):
+    """Returns the floats in `values` as a float64 numpy array, or as an
+    array.array("d") if numpy isn't installed."""
+    if available("numpy"):
+        return np.fromiter(values, dtype=np.float64, count=count)
+    return array("d", values)
+
+
+def solve_formula(formula, engine=AUTO, presolve=True, split=True,
+                  executor=None, cache=None, backend=None):
+    """Returns a model for `formula`, or None if `formula` is unsatisfiable.
+
+    If `split` is true, the formula's independent components are solved
+    separately. Pass a concurrent.futures executor (e.g. a ProcessPoolExecutor)
+    as `executor` to solve them in parallel.
+
+    Pass an obsidian.cache.SolveCache as `cache` to look the formula up there
+    before solving it (and to store the result there afterwards).
+
+    Pass an obsidian.backends.Backend as `backend` to choose which SMT
+    solver(s) to use and set a time limit.
+    """
+    if backend is None:
+        backend = Backend()
+
+    if cache is not None:
+        canonical = Canonical(formula)
+        values = cache.get(canonical)
+        if values is not None:
+            return Model(values)
+        model = solve_formula(formula, engine, presolve, split, executor,
+                              backend=backend)
+        if model is not None:
+            cache.put(canonical, model_values(model, canonical.symbols))
+        return model
+
+    stats = active()
+    if presolve:
+        with stats.phase("presolve"):
+            presolved = presolve_formula(formula)
+        model = solve_formula(presolved.formula, engine, presolve=False,
+                              split=split, executor=executor, backend=backend)
+        if model is None:
+            return None
+        model = Model(presolved.expand(model_values(
+            model, presolved.formula.get_free_variables())))
+        model.presolve_stats = presolved.stats
+        return model
+
+    if split:
+        with stats.phase("split"):
+            components = split_components(formula)
+        if len(components) > 1:
+            values = solve_components(components, engine, executor, backend)
+            return None if values is None else Model(values)
+
+    return solve_single(formula, engine, backend)
+
+
+def solve_single(formula, engine, backend):
+    stats = active()
+    if engine is not SMT:
+        stats.count("solver_calls")
+        with stats.phase("linear"):
+            values = solve_linear(formula)
+        if values is not None:
+            return Model(values)
+        if engine is LINEAR:
+            if not available("scipy"):
+                raise EngineError("the LINEAR engine needs scipy (pip install obsidian[fast])")
+            raise EngineError("formula is not a solvable linear system")
+    stats.count("solver_calls")
+    with stats.phase("smt"):
+        values = backend.solve(formula)
+    return None if values is None else Model(values)
+
+
+def solve_components(components, engine, executor=None, backend=None):
+    """Solves each of `components` and merges the results. Returns a dict
+    mapping symbols to values, or None if any component is unsatisfiable."""
+    values = {}
+    if executor is None:
+        for component in components:
+            component_values = solve_values(component, engine, backend)
+            if component_values is None:
+                return None
+            values.update(component_values)
+        return values
+
+    batches = batch_components(components, os.cpu_count() or 1)
+    symbols = {sym.symbol_name(): sym
+               for batch in batches for sym in batch.get_free_variables()}
+    futures = [executor.submit(solve_script, serialize(batch), engine, backend)
+               for batch in batches]
+    for future in futures:
+        batch_values = future.result()
+        if batch_values is None:
+            return None
+        values.update((symbols[name], val) for name, val in batch_values.items())
+    return values
+
+
+def solve_values(formula, engine, backend=None):
+    """Like solve_single(), but returns a dict mapping the formula's symbols to
+    their values (or None if the formula is unsatisfiable)."""
+    model = solve_single(formula, engine, backend or Backend())
+    if model is None:
+        return None
+    return model_values(model, formula.get_free_variables())
+
+
+def solve_script(script, engine, backend=None):
+    """Executor entry point. Takes a formula serialized as an SMT-LIB script,
+    and returns the solved values keyed by symbol name (or None). This works
+    in a session of its own, so that thread pools can run it too."""
+    with session():
+        formula = deserialize(script)
+        values = solve_values(formula, engine, backend)
+        if values is None:
+            return None
+        return {sym.symbol_name(): val for sym, val in values.items()}
@@ -0,0 +1,143 @@
+"""
+Profiling for renders. Pass profile=True (or some hooks) to Canvas.render(),
+and afterwards canvas.stats holds a RenderStats object saying where the time
+went and how big everything was:
+
+>>> canvas.render(profile=True)
+>>> print(canvas.stats.report())
+
+Hooks are called with (phase, seconds, stats) as each phase finishes, which
+is handy for logging or for feeding a metrics system:
+
+>>> canvas.render(hooks=[lambda phase, t, stats: print(phase, t)])
+
+The solver machinery finds the RenderStats for the current render through
+active(), so it doesn't have to be passed around. When profiling is off,
+active() returns a stand-in whose methods do nothing.
+"""
+
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+
+class RenderStats:
+    """Wall times (in seconds) and counters for a render.
+
+    `times` maps phase names to the total time spent in them. Phases nest:
+    e.g. "smt" and "presolve" happen inside "solve". A phase which runs more
+    than once (say, across several AUX bounds rounds) accumulates.
+
+    `counters` holds things like "symbols", "constraints", "dag_size",
+    "solver_calls" and "output_bytes". `shapes` counts rendered shapes by type
+    name.
+    """
+
+    enabled = True
+
+    def __init__(self, hooks=()):
+        self.times = defaultdict(float)
+        self.counters = Counter()
+        self.shapes = Counter()
+        self.hooks = list(hooks)
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager which times the code inside it as phase `name`."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            self.times[name] += elapsed
+            for hook in self.hooks:
+                hook(name, elapsed, self)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def record_formula(self, formula):
+        """Records the size of a formula that's about to be solved."""
+        counters = self.counters
+        counters["symbols"] = max(counters["symbols"],
+                                  len(formula.get_free_variables()))
+        counters["dag_size"] = max(counters["dag_size"], dag_size(formula))
+
+    def record_shapes(self, group):
+        """Counts the shapes in `group` (and its subgroups) by type."""
+        from obsidian.groups import Group  # avoids a circular import
+        stack = [group]
+        while stack:
+            shape = stack.pop()
+            if isinstance(shape, Group):
+                stack.extend(shape.shapes)
+            else:
+                self.shapes[type(shape).__name__] += 1
+
+    def as_dict(self):
+        return {"times": dict(self.times),
+                "counters": dict(self.counters),
+                "shapes": dict(self.shapes)}
+
+    def report(self):
+        """Returns a human-readable summary, as a string."""
+        lines = ["phase            seconds"]
+        lines.extend(f"{name:<16} {t:>8.4f}" for name, t in self.times.items())
+        lines.append("")
+        lines.extend(f"{name:<16} {n:>8}" for name, n in self.counters.items())
+        lines.extend(f"{name + 's':<16} {n:>8}" for name, n in self.shapes.items())
+        return "\n".join(lines)
+
+    __str__ = report
+
+
+class NullStats:
+    """Stands in for RenderStats when profiling is off."""
+
+    enabled = False
+    _phase = nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def record_formula(self, formula):
+        pass
+
+    def record_shapes(self, group):
+        pass
+
+
+NULL_STATS = NullStats()
+current = ContextVar("render_stats", default=NULL_STATS)
+
+
+def active():
+    """Returns the RenderStats for the render in progress, or a NullStats if
+    there isn't one being profiled."""
+    return current.get()
+
+
+@contextmanager
+def recording(stats):
+    """Makes `stats` the active stats object inside the with block."""
+    token = current.set(stats)
+    try:
+        yield stats
+    finally:
+        current.reset(token)
+
+
+def dag_size(formula):
+    """Returns the number of distinct nodes in `formula`."""
+    seen = {formula}
+    stack = [formula]
+    while stack:
+        for arg in stack.pop().args():
+            if arg not in seen:
+                seen.add(arg)
+                stack.append(arg)
+    return len(seen)
@@ -0,0 +1,453 @@
+"""
+Streaming SVG output. Canvas.render() normally builds a drawSvg Drawing, with
+an element object for every shape, and keeps the whole thing in memory until
+it's saved. For really big scenes that adds up, so instead an SvgWriter can
+be handed to the render walk: each shape's element is formatted as soon as
+the walk reaches it, and written out through a buffer.
+
+>>> canvas.save_svg("huge.svg", stream=True)
+>>> canvas.render(stream=sock.makefile("wb"))
+
+The output is the same document drawSvg would produce (same coordinates,
+same attribute order), except that defs referenced from styles (like the
+markers from obsidian.markers) are written just before their first use
+rather than all together at the top.
+
+With instances=True, shapes and groups which are exact copies of each other,
+apart from where they are, are written once into <defs> and placed with
+<use>. So a schematic with a few hundred identical symbols holds one copy of
+the symbol, plus a few hundred one-line references to it:
+
+    <defs>
+    <g id="d0">
+    <circle cx="0.0" cy="0.0" r="10.0" stroke="black" />
+    <path d="M-10.0,0.0 L10.0,0.0" stroke="black" />
+    </g>
+    </defs>
+    <use xlink:href="#d0" x="40.0" y="-120.0" />
+    <use xlink:href="#d0" x="80.0" y="-120.0" />
+
+With merge=True, runs of consecutive lines in the same style are written as
+one <path> with a subpath for each line (and the same for filled rects, when
+that can't change how they look). With precision=n, coordinates are rounded
+to n decimal places, and trailing zeros dropped.
+"""
+
+import copy
+import io
+import os
+from collections import Counter, defaultdict
+from xml.sax.saxutils import escape
+
+from obsidian.css import StyleSheet
+from obsidian.fields import EMPTY_STYLE
+
+
+# after this many distinct style combinations, the attributes() cache starts
+# over (so that scenes where every shape has its own style dict don't make
+# the cache grow with the scene)
+STYLE_CACHE_SIZE = 1024
+
+# shapes count as copies of each other if their positions relative to their
+# first point agree to this many decimal places
+PLACES = 6
+
+# attributes placing each type of element, other than paths
+POSITIONS = {
+    "rect": ' x="{}" y="{}"',
+    "circle": ' cx="{}" cy="{}"',
+    "text": ' x="{}" y="{}"',
+}
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"
+     width="{0}" height="{1}" viewBox="0 -{1} {0} {1}">
+<defs>
+</defs>
+"""
+
+
+def attribute_name(key):
+    # same mangling drawSvg does on keyword args: stroke_width -> stroke-width,
+    # xlink__href -> xlink:href, class_ -> class
+    key = key.replace("__", ":").replace("_", "-")
+    return key[:-1] if key.endswith("-") else key
+
+
+def element(tag, points, extra, attrs, content=None, element_id=None, num=str):
+    """Formats an element, as described in SvgWriter.shape(). `num` formats
+    the coordinates."""
+    if tag == "path":
+        coords = f' d="{subpath(tag, points, num)}"'
+    else:
+        x, y = points[0]
+        coords = POSITIONS[tag].format(num(x), num(y))
+    start = f'<{tag} id="{element_id}"' if element_id else f"<{tag}"
+    if content is None:
+        return f"{start}{coords}{extra}{attrs} />\n"
+    return f"{start}{coords}{extra}{attrs}>{escape(content)}</{tag}>\n"
+
+
+def subpath(tag, points, num=str):
+    """Returns path data drawing a path or a rect."""
+    if tag == "rect":
+        (x0, y0), (x1, y1) = points
+        x0, y0, x1, y1 = num(x0), num(y0), num(x1), num(y1)
+        return f"M{x0},{y0} H{x1} V{y1} H{x0} Z"
+    return "M" + " L".join(f"{num(x)},{num(y)}" for x, y in points)
+
+
+def rounder(places):
+    """Returns a function which formats numbers to `places` decimal places,
+    without trailing zeros."""
+    def num(x):
+        x = f"{x:.{places}f}"
+        if "." in x:
+            x = x.rstrip("0").rstrip(".")
+        return "0" if x == "-0" else x
+    return num
+
+
+def mergeable(attrs):
+    """Returns the tags of the elements which can be merged into one path
+    when they share the style `attrs` (a list of (name, value) pairs).
+
+    Lines can be, unless they have markers (which would only go on the ends
+    of the whole path) or any transparency (overlaps would no longer be drawn
+    twice), or ids. Rects can be too, unless they have strokes (which would no
+    longer be covered by the fills of any rects drawn over them), rounded
+    corners, or an evenodd fill rule (overlaps would become holes).
+    """
+    names = dict(attrs)
+    if any(name.startswith("marker") or name.endswith("opacity") or name == "id"
+           for name in names):
+        return frozenset()
+    if (names.get("stroke", "none") != "none" or "rx" in names or "ry" in names
+            or names.get("fill-rule") == "evenodd"):
+        return frozenset({"path"})
+    return frozenset({"path", "rect"})
+
+
+def moved(record, dx, dy):
+    """Returns a shape record (see SvgWriter.shape()) moved by (dx, dy)."""
+    tag, points, extra, attrs, content = record
+    return tag, [(x + dx, y + dy) for x, y in points], extra, attrs, content
+
+
+def shape_key(record):
+    """Returns a key which is the same for records of shapes that differ only
+    in where they are."""
+    tag, points, extra, attrs, content = record
+    x0, y0 = points[0]
+    return (tag, tuple((round(x - x0, PLACES), round(y - y0, PLACES)) for x, y in points),
+            extra, attrs, content)
+
+
+class SvgWriter:
+    """Writes an SVG document to `target`, one element at a time.
+
+    `target` is a filename, or any file-like object with a write() method
+    (text or binary, e.g. from socket.makefile()). Filenames are opened and
+    closed by the writer; file objects are flushed but left open.
+
+    Writes are collected into chunks of roughly `buffer_size` characters
+    before being passed on, so the cost of a write() call to the underlying
+    file is paid per chunk rather than per element. Apart from the current
+    chunk, the writer only holds onto the formatted style attributes it's
+    seen (see attributes()), so its memory use doesn't grow with the number
+    of shapes.
+
+    With `css=True`, styles are written as classes (see obsidian.css). The
+    <style> block goes at the end of the document, once every style has been
+    seen; stylesheets apply to the whole document wherever they are.
+
+    With `instances=True`, repeated shapes and groups are written once and
+    placed with <use> (see above). Finding them means seeing the whole scene
+    first, so in this mode shapes are held onto until close(), and memory
+    use does grow with the scene. Pass the writer each group's span of
+    shapes with add_groups(), or only single shapes can be instanced.
+
+    `merge` and `precision` are as described above. Merging keeps only the
+    path being built in memory, writing its subpaths out as they arrive.
+
+    Use it as a context manager, or call close() when done.
+    """
+
+    def __init__(self, target, width, height, buffer_size=1 << 16, css=False,
+                 instances=False, merge=False, precision=None):
+        self.width = width
+        self.height = height
+        self.owns_file = isinstance(target, (str, os.PathLike))
+        self.file = open(target, "w", encoding="utf-8") if self.owns_file else target
+        self.binary = isinstance(self.file, (io.RawIOBase, io.BufferedIOBase))
+        self.buffer_size = buffer_size
+        self.chunk = []
+        self.chunk_len = 0
+        self.written = 0  # chars (or bytes, for binary files) written so far
+        self.styles = {}
+        self.defs = {}  # id() -> drawSvg element, for those we've written
+        self.defined = {}  # id() -> (element, its def's id), for define()
+        self.def_ids = {}  # content -> id, for everything we've written in <defs>
+        self.ids = 0
+        self.records = [] if instances else None
+        self.spans = []
+        self.sheet = StyleSheet() if css else None
+        self.num = str if precision is None else rounder(precision)
+        self.merge = merge
+        self.merge_tags = {}  # attrs -> tags which can be merged in that style
+        self.run = None  # (tag, attrs) of the shapes being merged, if any
+        self.run_first = None  # the first of them, until a second one comes
+        self.closed = False
+        self.write(HEADER.format(width, height))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, s):
+        self.chunk.append(s)
+        self.chunk_len += len(s)
+        if self.chunk_len >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        data = "".join(self.chunk)
+        self.chunk.clear()
+        self.chunk_len = 0
+        if self.binary:
+            data = data.encode("utf-8")
+        self.written += len(data)
+        self.file.write(data)
+
+    def close(self):
+        """Finishes the document and flushes it out."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.records is not None:
+            self.write_instanced()
+        self.end_run()
+        if self.sheet:
+            self.write(self.sheet.style_element() + "\n")
+        self.write("</svg>")
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+        elif hasattr(self.file, "flush"):
+            self.file.flush()
+
+    def shape(self, tag, points, extra, attrs, content=None):
+        """Writes an element for a shape. `points` is a list of the (x, y)
+        points that place it, in SVG coordinates: the corner of a rect, the
+        center of a circle, the ends of a path. `extra` is the preformatted
+        part of its geometry which doesn't depend on where it is (like a
+        circle's radius), `attrs` its style (from attributes()), and
+        `content` the text inside it, if any."""
+        if self.records is not None:
+            self.records.append((tag, points, extra, attrs, content))
+        else:
+            self.emit((tag, points, extra, attrs, content))
+
+    def emit(self, record):
+        """Writes a shape record out, merging it into a path with those
+        before it if possible."""
+        tag, points, extra, attrs, content = record
+        if self.merge and tag in self.merge_tags.get(attrs, ()) and (
+                tag == "path" or (points[1][0] > points[0][0] and points[1][1] > points[0][1])):
+            if self.run == (tag, attrs):
+                if self.run_first is not None:
+                    first = self.run_first
+                    self.write(f'<path d="{subpath(first[0], first[1], self.num)}')
+                    self.run_first = None
+                self.write(f" {subpath(tag, points, self.num)}")
+                return
+            self.end_run()
+            self.run, self.run_first = (tag, attrs), record
+            return
+        self.end_run()
+        self.write(element(*record, num=self.num))
+
+    def end_run(self):
+        """Finishes off the path being merged, if there is one."""
+        if self.run is None:
+            return
+        if self.run_first is not None:  # nothing to merge it with after all
+            self.write(element(*self.run_first, num=self.num))
+        else:
+            self.write(f'"{self.run[1]} />\n')
+        self.run = self.run_first = None
+
+    def add_groups(self, spans):
+        """Tells the writer which runs of the shapes it's about to be given
+        make up groups, for instancing. `spans` is a list of (start, end)
+        pairs, outer groups first, like DisplayList.spans."""
+        if self.records is not None:
+            offset = len(self.records)
+            self.spans.extend((start + offset, end + offset) for start, end in spans)
+
+    def write_instanced(self):
+        """Writes out the shapes held for instancing, using <use> for any
+        shape or group that has copies."""
+        records = self.records
+        keys = [shape_key(record) for record in records]
+        counts = Counter(keys)
+
+        # groups are keyed by their shapes' keys, and where each shape is
+        # relative to the group's first point
+        groups = defaultdict(list)  # start -> [(end, key)], outermost first
+        for start, end in self.spans:
+            if end - start < 2:
+                continue  # empty, or the same as its one shape
+            x0, y0 = records[start][1][0]
+            key = tuple((keys[i],
+                         round(records[i][1][0][0] - x0, PLACES),
+                         round(records[i][1][0][1] - y0, PLACES))
+                        for i in range(start, end))
+            counts[key] += 1
+            groups[start].append((end, key))
+
+        i = 0
+        while i < len(records):
+            for end, key in groups.get(i, ()):
+                if counts[key] > 1:
+                    self.end_run()
+                    self.use(key, records[i:end])
+                    i = end
+                    break
+            else:
+                if counts[keys[i]] > 1:
+                    self.end_run()
+                    self.use(keys[i], records[i:i+1])
+                else:
+                    self.emit(records[i])
+                i += 1
+        self.records = []
+
+    def use(self, key, records):
+        """Writes a <use> placing the shapes in `records`, and their def the
+        first time they're seen."""
+        x0, y0 = records[0][1][0]
+        num = self.num
+        def_id = self.def_ids.get(key)
+        if def_id is None:
+            def_id = self.def_ids[key] = self.new_id()
+            self.write("<defs>\n")
+            if len(records) == 1:
+                self.write(element(*moved(records[0], -x0, -y0), element_id=def_id,
+                                   num=num))
+            else:
+                self.write(f'<g id="{def_id}">\n')
+                for record in records:
+                    self.write(element(*moved(record, -x0, -y0), num=num))
+                self.write("</g>\n")
+            self.write("</defs>\n")
+        self.write(f'<use xlink:href="#{def_id}" x="{num(x0)}" y="{num(y0)}" />\n')
+
+    def attributes(self, style, shape_style, defaults=None):
+        """Returns `style` joined with `shape_style` (like style_join()), plus
+        any `defaults` the two don't set, formatted as SVG attributes.
+
+        This is where the style joining for each shape happens. Shapes usually
+        share a handful of style dicts, so the result is cached by the
+        identities of the dicts, and each combination is only joined and
+        formatted once. The dicts are kept alive in the cache, so that their
+        ids can't be reused during the walk.
+        """
+        style = style or EMPTY_STYLE
+        shape_style = shape_style or EMPTY_STYLE
+        key = (id(style), id(shape_style), id(defaults))
+        cached = self.styles.get(key)
+        if cached is None:
+            if len(self.styles) >= STYLE_CACHE_SIZE:
+                self.styles.clear()
+                self.merge_tags.clear()
+            joined = dict(style, **shape_style)
+            assert len(joined) > 0
+            for k, v in (defaults or {}).items():
+                if joined.get(k) is None:
+                    joined[k] = v
+            attrs = [(attribute_name(k), v) for k, v in joined.items() if v is not None]
+            merge_tags = mergeable(attrs)
+            if self.sheet is not None:
+                name, attrs = self.sheet.split(attrs)
+                if name is not None:
+                    attrs.append(("class", name))
+            parts = []
+            for name, v in attrs:
+                if hasattr(v, "writeSvgElement"):  # a drawSvg element, eg a marker
+                    v = self.define(v)
+                    v = f"#{v}" if name == "xlink:href" else f"url(#{v})"
+                else:
+                    v = escape(str(v), {'"': "&quot;"})
+                parts.append(f' {name}="{v}"')
+            cached = self.styles[key] = ("".join(parts), style, shape_style, defaults)
+            self.merge_tags[cached[0]] = merge_tags
+        return cached[0]
+
+    def define(self, element):
+        """Writes a drawSvg element (like a marker) into a <defs> block, the
+        first time it's used, and returns its id. Elements with the same
+        content share a def, so e.g. a fresh markers.arrow() for every line
+        only gets written once.
+
+        The element itself isn't changed: the def is written from a copy
+        which carries the id, and only the writer remembers it. (So the id
+        doesn't follow the element into other documents.)"""
+        entry = self.defined.get(id(element))
+        if entry is None:
+            self.end_run()  # can't write defs in the middle of a path
+            key = ("def", serialize(with_id(element, None)))
+            def_id = self.def_ids.get(key)
+            if def_id is None:
+                def_id = self.def_ids[key] = self.new_id()
+                named = with_id(element, def_id)
+                self.defs[id(named)] = named  # so drawSvg won't write it twice
+                self.write("<defs>\n")
+                named.writeSvgDefs(self.new_id, self.is_defined, self, False)
+                named.writeSvgElement(self.new_id, self.is_defined, self, False,
+                                      forceDup=True)
+                self.write("\n</defs>\n")
+            # (holding on to the element, so that its id() can't be reused)
+            entry = self.defined[id(element)] = (element, def_id)
+        return entry[1]
+
+    def new_id(self, base=""):
+        self.ids += 1
+        return f"d{base}{self.ids - 1}"
+
+    def is_defined(self, element):
+        # for drawSvg: says whether a nested def has been written already
+        if id(element) in self.defs:
+            return True
+        self.defs[id(element)] = element
+        return False
+
+
+def with_id(element, element_id):
+    """Returns a shallow copy of a drawSvg element with its id set to
+    `element_id` (or with no id, if that's None)."""
+    element = copy.copy(element)
+    element.args = dict(element.args)
+    element.args.pop("id", None)
+    if element_id is not None:
+        element.args["id"] = element_id
+    return element
+
+
+def serialize(element):
+    """Returns the SVG for a drawSvg element (and any defs it has), without
+    writing ids for any of it."""
+    out = io.StringIO()
+    seen = set()
+
+    def is_duplicate(obj):
+        dup = id(obj) in seen
+        seen.add(id(obj))
+        return dup
+
+    element.writeSvgDefs(lambda base="": None, is_duplicate, out, False)
+    element.writeSvgElement(lambda base="": None, is_duplicate, out, False,
+                            forceDup=True)
+    return out.getvalue()
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 
 from numbers import Real as ABCReal
 
-from obsidian.shape import Bounds, Shape
+from obsidian.shape import Bounds, Shape, derived, slotted
 from obsidian.groups import Group
 from obsidian.geometry import Point, Circle, Line, PointField
 from obsidian.fields import SMTField, StyleField, STYLE
@@ -11,6 +11,7 @@ from obsidian.infix import EQ
 from pysmt.typing import REAL
 
 
+@slotted
 @dataclass
 class Text(Shape):
     text: str
@@ -18,7 +19,7 @@ class Text(Shape):
     anchor_point: Point = PointField()
     style: STYLE = StyleField()
 
-    @property
+    @derived("anchor_point.x", "anchor_point.y")
     def bounds(self):
         # FIXME: this class does not know how to compute its bounds!
         # Maybe some clever font nerd can figure those out, but not me.
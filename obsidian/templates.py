@@ -0,0 +1,148 @@
+"""
+Template instancing for groups. A group like XorSymbol carries its own
+internal constraints, and every copy of it in a scene adds all of them to the
+formula being solved, even though every copy comes out the same shape. For
+groups whose insides don't depend on anything outside them, we can do
+better: solve one copy (the prototype) on its own, once, and then place each
+copy by translation. A placed copy is an Instance, and all the solver ever
+sees of it is an offset (two symbols) and the bounds around it.
+
+>>> symbols = [XorSymbol.instance(diameter=20, style=STYLE) for _ in range(100)]
+
+Prototypes are cached by class and arguments, so the above solves one
+XorSymbol, not a hundred.
+
+Every REAL field of the group (like XorSymbol's diameter) has to be given a
+value. Only use this for groups whose constraints fix their shape but not
+their position. A prototype which pins itself somewhere (e.g. `rect.x |EQ| 0`) is
+solved there, and its instances are then moved away from that spot anyway.
+"""
+
+from dataclasses import fields, replace
+from numbers import Real as ABCReal
+from types import MappingProxyType
+from weakref import WeakKeyDictionary
+
+from pysmt.fnode import FNode
+from pysmt.shortcuts import FreshSymbol, Real, get_env
+from pysmt.typing import REAL
+
+from obsidian.groups import Group
+from obsidian.shape import Shape, Bounds
+
+
+# pysmt environment -> {(class, frozen args, frozen kwargs) -> Template}. a
+# template's terms belong to the environment it was solved in, so each
+# environment (see obsidian.environments) gets its own, which goes with it
+templates = WeakKeyDictionary()
+
+
+def instance(cls, *args, **kwargs):
+    """Returns an Instance of `cls(*args, **kwargs)`. See Group.instance()."""
+    key = (cls, freeze(args), freeze(kwargs))
+    cache = templates.setdefault(get_env(), {})
+    template = cache.get(key)
+    if template is None:
+        template = cache[key] = Template(cls(*args, **kwargs))
+    return Instance(template)
+
+
+def freeze(value):
+    """Returns a hashable stand-in for `value`, for use in a cache key. Raises
+    ValueError if `value` has symbols in it (so it isn't known yet)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return ("dict", tuple(sorted((k, freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(freeze(v) for v in value))
+    if isinstance(value, FNode) and value.get_free_variables():
+        raise ValueError("template arguments must be constants, not terms "
+                         f"with symbols in them (got {value})")
+    hash(value)  # TypeError if it isn't usable
+    return value
+
+
+class Template:
+    """A group (the prototype), solved on its own.
+
+    `root` is a copy of the prototype's tree in which every leaf shape has
+    its solved values filled in as constants. `bounds` holds the prototype's
+    solved edges, as a 4-tuple of floats (left, right, top, bottom).
+    """
+
+    def __init__(self, prototype):
+        for field in fields(prototype):
+            val = getattr(prototype, field.name)
+            if (field.type is REAL and isinstance(val, FNode)
+                    and val.get_free_variables()):
+                # otherwise it'd be solved as whatever suits the solver (0)
+                raise ValueError(f"{type(prototype).__name__}.{field.name} must "
+                                 "be given a value to make a template of it")
+        self.prototype = prototype
+        solution = prototype.solve()
+        bounds = prototype.bounds
+        self.bounds = tuple(solution.value(edge) for edge in (
+            bounds.left_edge, bounds.right_edge, bounds.top_edge, bounds.bottom_edge))
+        self.root = fill_in(prototype, solution)
+
+
+def fill_in(shape, solution):
+    """Returns a copy of `shape` with its REAL fields (and those of any shapes
+    in its fields) replaced by their values in `solution`. Groups are copied
+    as plain Groups holding filled-in copies of their shapes."""
+    if isinstance(shape, Group):
+        return copy_group(shape, lambda s: fill_in(s, solution))
+    changes = {}
+    for field in fields(shape):
+        val = getattr(shape, field.name)
+        if isinstance(val, Shape):
+            changes[field.name] = fill_in(val, solution)
+        elif field.type is REAL and not isinstance(val, ABCReal):
+            changes[field.name] = Real(solution.value(val))
+    return replace(shape, **changes)
+
+
+def copy_group(group, copy, into=None):
+    """Returns a Group (or fills in `into`) holding copy(s) for each of the
+    shapes in `group`, with the same style and names."""
+    copies = {}
+    shapes = []
+    for shape in group.shapes:
+        shapes.append(copies.setdefault(id(shape), copy(shape)))
+    if into is None:
+        into = Group(style=getattr(group, "style", None))
+    into.shapes.extend(shapes)
+    into.named_shapes.update((name, copies[id(shape)])
+                             for name, shape in group.named_shapes.items())
+    return into
+
+
+class Instance(Group):
+    """A copy of a Template's prototype, moved by (x, y) from where the
+    prototype was solved. `x` and `y` are fresh symbols, and the only ones
+    the instance adds to the formula; it has no constraints of its own.
+
+    Its shapes are copies of the prototype's, with their positions given in
+    terms of `x` and `y`, so constraints can still refer to them (e.g. to
+    connect a line to one of them). Named shapes keep their names.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.x = x = FreshSymbol(REAL)
+        self.y = y = FreshSymbol(REAL)
+        super().__init__(style=getattr(template.prototype, "style", None))
+        copy_group(template.root, lambda s: place(s, x, y), into=self)
+        left, right, top, bottom = template.bounds
+        self._bounds = Bounds(Real(left) + x, Real(right) + x,
+                              Real(top) + y, Real(bottom) + y)
+
+    @property
+    def bounds(self):
+        return self._bounds
+
+
+def place(shape, x, y):
+    """Returns a copy of a filled-in shape, moved by (x, y)."""
+    if isinstance(shape, Group):
+        return copy_group(shape, lambda s: place(s, x, y))
+    return shape.translated(x, y)
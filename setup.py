@@ -6,4 +6,8 @@ setup(
     description='Constraint-based visual design',
     packages=['obsidian'],
     install_requires=['pysmt', 'drawSvg', 'notebook', 'ipywidgets'],
+    extras_require={
+        'fast': ['numpy', 'scipy'],  # the sparse linear solver (obsidian.linear)
+        'png': ['cairocffi'],  # drawing PNGs directly, not via SVG (Canvas.save_png)
+    },
 )
@@ -0,0 +1,70 @@
+"""
+The AUX bounds encoding should place everything exactly where MINMAX does,
+including when AUX groups are nested inside each other.
+"""
+
+import warnings
+
+import pytest
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Rectangle
+from obsidian.groups import AUX, MINMAX
+from obsidian.helpers import N
+from obsidian.infix import LEFT_BY
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+FILL = {"fill": "red"}
+
+
+def edges(bounds, model):
+    return [N(model[edge]) for edge in (bounds.left_edge, bounds.right_edge,
+                                        bounds.top_edge, bounds.bottom_edge)]
+
+
+def nested_scene(encoding):
+    """Three levels of groups, all using `encoding`. Returns the rendered
+    canvas along with its groups and shapes."""
+    a = Rectangle(width=10, height=5, style=FILL)
+    b = Rectangle(width=20, height=14, style=FILL)
+    c = Rectangle(width=30, height=8, style=FILL)
+    inner = Group([a, b], [a |LEFT_BY(2)| b, a.y |EQ| b.y], bounds_encoding=encoding)
+    middle = Group([inner, c], [inner |LEFT_BY(4)| c, c.y |EQ| a.y], bounds_encoding=encoding)
+    outer = Group([middle], bounds_encoding=encoding)
+    canvas = Canvas(outer, margin=4)
+    canvas.render()
+    return canvas, [outer, middle, inner], [a, b, c]
+
+
+def test_nested_aux_matches_minmax():
+    results = {}
+    for encoding in (MINMAX, AUX):
+        canvas, groups, shapes = nested_scene(encoding)
+        model = canvas.model
+        results[encoding] = (canvas.get_width(model), canvas.get_height(model),
+                             [edges(group.bounds, model) for group in groups],
+                             [edges(shape.bounds, model) for shape in shapes])
+    assert results[AUX] == results[MINMAX]
+    width, height, group_edges, _ = results[AUX]
+    assert (width, height) == (70, 18)
+    assert group_edges[0] == [2, 68, 2, 16]
+
+
+def test_nested_aux_children_are_settled():
+    # only the outer group's bounds are used before solving; the inner
+    # group's are first built while settling the outer one's
+    a = Rectangle(width=10, height=5)
+    b = Rectangle(width=10, height=5)
+    inner = Group([a, b], [a |LEFT_BY(3)| b], bounds_encoding=AUX)
+    outer = Group([inner], bounds_encoding=AUX)
+    outer.constraints += [a.x |EQ| -6.5, outer.bounds.right_edge |EQ| 100]
+    with pytest.raises(AssertionError):  # b's right edge is really at 16.5
+        outer.solve()
+
+    outer.constraints.pop()
+    outer.constraints.append(outer.bounds.right_edge |EQ| 16.5)
+    solution = outer.solve()
+    assert [solution.value(edge) for edge in (outer.bounds.left_edge, outer.bounds.right_edge)] == [-6.5, 16.5]
+    assert [solution.value(edge) for edge in (inner.bounds.left_edge, inner.bounds.right_edge)] == [-6.5, 16.5]
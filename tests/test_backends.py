@@ -0,0 +1,93 @@
+"""
+Backends should pick solvers, race portfolios of them, and give up on time.
+"""
+
+import pickle
+import time
+import warnings
+
+import pytest
+from pysmt.shortcuts import And, Equals, Real, Symbol
+from pysmt.typing import REAL
+
+from obsidian import Canvas, Group, EQ
+from obsidian.backends import Backend, BackendError, SolverTimeout
+from obsidian.geometry import Rectangle
+from obsidian.infix import LEFT_BY
+from obsidian.solve import SMT
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def formula():
+    a, b = Symbol("back_a", REAL), Symbol("back_b", REAL)
+    return And(Equals(b, a + Real(2)), a > Real(1), a < Real(2))
+
+
+def check_values(values):
+    a, b = Symbol("back_a", REAL), Symbol("back_b", REAL)
+    assert 1 < values[a] < 2
+    assert values[b] == values[a] + 2
+
+
+@pytest.mark.parametrize("backend", [
+    Backend(), Backend(solver_name="z3"), Backend(timeout=60),
+    Backend(portfolio=["z3"]), Backend(portfolio=True, logic="QF_LRA"),
+])
+def test_solves(backend):
+    check_values(backend.solve(formula()))
+    a = Symbol("back_a", REAL)
+    assert backend.solve(And(formula(), a > Real(3))) is None
+
+
+def test_pickling():
+    backend = pickle.loads(pickle.dumps(Backend(timeout=60, portfolio=["z3"])))
+    assert backend.portfolio == ["z3"]
+    assert backend.remaining() > 50
+    check_values(backend.solve(formula()))
+
+
+def test_deadline_covers_every_solve():
+    backend = Backend(timeout=0.01)
+    time.sleep(0.02)
+    with pytest.raises(SolverTimeout):
+        backend.solve(formula())
+
+
+def test_bad_portfolios():
+    with pytest.raises(BackendError):
+        Backend(portfolio=["nosuch"]).solve(formula())
+    with pytest.raises(BackendError):
+        Backend(portfolio=[]).solve(formula())
+    # one bad solver doesn't spoil the race
+    check_values(Backend(portfolio=["nosuch", "z3"]).solve(formula()))
+
+
+def slow_group():
+    rects = [Rectangle(width=3 + i % 7, height=4 + i % 5, style={"fill": "red"})
+             for i in range(1500)]
+    pairs = list(zip(rects, rects[1:]))
+    constraints = [a |LEFT_BY(1)| b for a, b in pairs]
+    constraints += [a.bounds.top_edge |EQ| b.bounds.top_edge + i % 3
+                    for i, (a, b) in enumerate(pairs)]
+    return Group(rects, constraints)
+
+
+@pytest.mark.parametrize("portfolio", [None, True])
+def test_timeouts(portfolio):
+    start = time.time()
+    with pytest.raises(SolverTimeout):
+        Canvas(slow_group(), 2000, 100).render(
+            engine=SMT, presolve=False, split=False, timeout=0.3,
+            portfolio=portfolio)
+    assert time.time() - start < 5
+
+
+def test_same_output_with_any_backend():
+    a = Rectangle(width=10, height=5, style={"fill": "red"})
+    b = Rectangle(width=3, height=4, style={"fill": "blue"})
+    group = Group([a, b], [a |LEFT_BY(2)| b, a.y |EQ| b.y])
+    svgs = [Canvas(group).render(engine=SMT, **kwargs).asSvg() for kwargs in
+            (dict(), dict(solver_name="z3", timeout=60), dict(portfolio=["z3"]))]
+    assert svgs[0] == svgs[1] == svgs[2]
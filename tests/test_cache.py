@@ -0,0 +1,105 @@
+"""
+The solve cache should hit whenever the same formula comes round again (up to
+symbol names), and never hand back values which don't satisfy it.
+"""
+
+import os
+import sys
+import warnings
+
+from pysmt.shortcuts import And, Equals, FreshSymbol, Real
+from pysmt.typing import REAL
+
+from obsidian import Canvas
+from obsidian.cache import Canonical, SolveCache
+from obsidian.solve import solve_formula
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+def formula(offset=1):
+    """Returns b = a + offset, a > 0 for fresh symbols a and b. Note that b is
+    the first symbol in canonical order."""
+    a, b = FreshSymbol(REAL), FreshSymbol(REAL)
+    return And(Equals(b, a + Real(offset)), a > Real(0))
+
+
+def test_canonical_keys():
+    first, second = Canonical(formula()), Canonical(formula())
+    assert first.symbols != second.symbols
+    assert first.key == second.key
+    assert Canonical(formula(2)).key != first.key
+
+
+def test_hits_and_misses():
+    cache = SolveCache()
+    first = formula()
+    model = solve_formula(first, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    again = formula()
+    cached = solve_formula(again, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for sym, cached_sym in zip(Canonical(first).symbols, Canonical(again).symbols):
+        assert cached.get_py_value(cached_sym) == model.get_py_value(sym)
+
+
+def test_stale_entries_are_rejected(tmp_path):
+    cache = SolveCache(path=tmp_path)
+    canonical = Canonical(formula())
+    b, a = canonical.symbols
+    cache.put(canonical, {a: 1, b: 5})  # doesn't satisfy the formula
+    assert cache.get(canonical) is None
+    assert cache.misses == 1
+
+    cache.put(canonical, {a: 1, b: 2})
+    assert cache.get(canonical) == {a: 1, b: 2}
+    assert cache.hits == 1
+
+    # a fresh cache only has what's on disk, which we now corrupt
+    fname, = os.listdir(tmp_path)
+    with open(tmp_path / fname, "w") as f:
+        f.write("[1, ")
+    assert SolveCache(path=tmp_path).get(canonical) is None
+
+
+def test_disk_store_is_shared(tmp_path):
+    solve_formula(formula(), cache=SolveCache(path=tmp_path))
+    cache = SolveCache(path=tmp_path)
+    assert solve_formula(formula(), cache=cache) is not None
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_memory_is_lru():
+    cache = SolveCache(maxsize=2)
+    canonicals = [Canonical(formula(i)) for i in range(3)]
+    for i, canonical in enumerate(canonicals):
+        b, a = canonical.symbols
+        cache.put(canonical, {a: 1, b: 1 + i})
+    assert cache.get(canonicals[0]) is None
+    assert cache.get(canonicals[2]) is not None
+
+
+def test_disk_store_is_evicted(tmp_path):
+    cache = SolveCache(path=tmp_path, max_bytes=200)
+    for i in range(20):
+        solve_formula(formula(i), cache=cache)
+    size = sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
+    assert 0 < size <= 200
+    cache.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_same_output_from_the_cache():
+    cache = SolveCache()
+    svgs = []
+    for _ in range(2):
+        FreshSymbol(REAL)  # shift the symbol names
+        board = GoBoard(300, 300, 20, rows=9, cols=9)
+        board.add_stone("B", 3, 4)
+        svgs.append(Canvas(board.get_group()).render(cache=cache).asSvg())
+    assert svgs[0] == svgs[1]
+    assert cache.hits == 1
@@ -0,0 +1,99 @@
+"""
+Independent components should be solved separately - serially or on an
+executor - with the same results as solving the whole formula at once.
+"""
+
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from pysmt.shortcuts import And, Equals, FALSE, Real, Symbol
+from pysmt.typing import REAL
+
+from obsidian import Canvas
+from obsidian.components import (batch_components, deserialize, serialize,
+                                 split_components)
+from obsidian.presolve import conjuncts
+from obsidian.solve import solve_formula
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+def symbols():
+    # made per test, since other tests may replace the global environment
+    return [Symbol(f"comp_{name}", REAL) for name in "abcdef"]
+
+
+def chains():
+    a, b, c, d, e, f = symbols()
+    return And(a < b, Equals(c, a + Real(1)), d < e, Equals(e, Real(2)),
+               f > Real(0))
+
+
+def test_split_by_shared_symbols():
+    a, b, c, d, e, f = symbols()
+    components = split_components(chains())
+    assert sorted(map(len, (comp.get_free_variables() for comp in components))) == [1, 2, 3]
+    by_symbols = {frozenset(comp.get_free_variables()): comp for comp in components}
+    assert set(conjuncts(by_symbols[frozenset((a, b, c))])) == {a < b, Equals(c, a + Real(1))}
+
+
+def test_ground_atoms_get_their_own_component():
+    a = symbols()[0]
+    components = split_components(And(a > Real(0), FALSE()))
+    assert len(components) == 2
+    assert solve_formula(And(a > Real(0), FALSE()), presolve=False) is None
+
+
+def test_batches_cover_every_component():
+    components = split_components(chains())
+    batches = batch_components(components, 2)
+    assert len(batches) == 2
+    atoms = [atom for batch in batches for atom in conjuncts(batch)]
+    assert sorted(map(str, atoms)) == sorted(map(str, conjuncts(chains())))
+    assert len(batch_components(components, 10)) == 3
+
+
+def test_serialize_round_trip():
+    formula = chains()
+    assert deserialize(serialize(formula)) == formula
+
+
+def check_model(model):
+    a, b, c, d, e, f = symbols()
+    value = model.get_py_value
+    assert value(a) < value(b)
+    assert value(c) == value(a) + 1
+    assert value(d) < value(e) == 2
+    assert value(f) > 0
+
+
+def test_split_solves():
+    for split in (False, True):
+        check_model(solve_formula(chains(), presolve=False, split=split))
+
+
+def test_executor_solves():
+    for executor_type in (ThreadPoolExecutor, ProcessPoolExecutor):
+        with executor_type(2) as executor:
+            check_model(solve_formula(chains(), presolve=False,
+                                      executor=executor))
+            unsat = And(chains(), symbols()[5] < Real(0))
+            assert solve_formula(unsat, presolve=False, executor=executor) is None
+
+
+def test_same_output_split_and_merged():
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    for i in range(4):
+        board.add_stone("BW"[i % 2], i, 3 * i % 9)
+    with ThreadPoolExecutor(2) as executor:
+        renders = [dict(split=False), dict(split=True),
+                   dict(split=True, executor=executor)]
+        svgs = [Canvas(board.get_group()).render(**kwargs).asSvg()
+                for kwargs in renders]
+    assert svgs[0] == svgs[1] == svgs[2]
@@ -0,0 +1,60 @@
+"""
+group.constraints holds the whole subtree's constraints, read out of the
+subgroups on demand rather than copied up into every group above them.
+"""
+
+import warnings
+
+from obsidian import Group, EQ
+from obsidian.geometry import Rectangle
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def tree():
+    a, b, c = (Rectangle(width=1, height=1) for _ in range(3))
+    inner = Group([a, b], [a.x |EQ| b.x])
+    outer = Group([inner, c], [c.x |EQ| a.x])
+    return outer, inner, a, b, c
+
+
+def test_subgroup_constraints_come_first():
+    outer, inner, a, b, c = tree()
+    own = list(inner.constraints)
+    assert len(own) == 1
+    assert list(outer.constraints) == own + [c.x |EQ| a.x]
+    assert list(outer.constraints.own) == [c.x |EQ| a.x]
+
+
+def test_late_changes_are_seen():
+    outer, inner, a, b, c = tree()
+    before = list(outer.constraints)
+    late = a.y |EQ| 5
+    inner.constraints.append(late)  # after outer was built (and flattened)
+    assert list(outer.constraints) == before[:1] + [late] + before[1:]
+
+    inner.shapes.append(Group([c], [c.y |EQ| 1]))
+    assert (c.y |EQ| 1) in outer.constraints
+    inner.constraints.remove(late)
+    assert late not in outer.constraints
+    outer.constraints = [c.x |EQ| 3]  # replaces outer's own, not inner's
+    assert list(outer.constraints)[-1] == (c.x |EQ| 3)
+    assert len(inner.constraints) == 2
+
+
+def test_duplicates_are_dropped():
+    outer, inner, a, b, c = tree()
+    outer.constraints += [a.x |EQ| b.x, a.x |EQ| b.x]  # pysmt interns these
+    assert len(outer.constraints) == 2
+
+
+def test_acts_like_a_list():
+    outer, inner, a, b, c = tree()
+    extra = [a.y |EQ| 0]
+    flat = list(outer.constraints)
+    assert outer.constraints + extra == flat + extra
+    assert extra + outer.constraints == extra + flat
+    assert outer.constraints == flat and outer.constraints != extra
+    assert inner.constraints == tuple(inner.constraints)
+    assert outer.solve() is not None  # (solve() adds lists to them too)
@@ -0,0 +1,68 @@
+"""
+Canvas.render(css=True) moves shared styles into CSS classes, in both the
+drawSvg and the streamed output.
+"""
+
+import io
+import warnings
+from xml.dom import minidom
+
+from obsidian import Canvas, Group
+from obsidian.geometry import Rectangle, Circle
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+STYLE = {"fill": "red", "stroke": "black"}
+
+
+def scene():
+    a = Rectangle(width=10, height=5, style=STYLE)
+    b = Rectangle(width=10, height=5, style=STYLE)
+    member = Circle(radius=3, style=dict(STYLE, **{"class": "addr_row_member"}))
+    return Canvas(Group([a, b, member]), 40, 20)
+
+
+def classes(svg):
+    doc = minidom.parseString(svg)  # also checks the output is valid XML
+    return [element.getAttribute("class")
+            for tag in ("rect", "circle")
+            for element in doc.getElementsByTagName(tag)]
+
+
+def test_drawsvg_css_keeps_own_class():
+    svg = scene().render(css=True).asSvg()
+    assert classes(svg) == ["s0", "s0", "addr_row_member s0"]
+    assert ".s0 { fill: red; stroke: black }" in svg
+    assert 'fill="red"' not in svg
+
+
+def test_streamed_css_keeps_own_class():
+    out = io.BytesIO()
+    scene().render(stream=out, css=True)
+    svg = out.getvalue().decode()
+    assert classes(svg) == ["s0", "s0", "addr_row_member s0"]
+    assert 'fill="red"' not in svg
+
+
+def test_css_output_isnt_reused_for_plain(tmp_path):
+    canvas = scene()
+    canvas.save_svg(str(tmp_path / "css.svg"), css=True)
+    canvas.save_svg(str(tmp_path / "plain.svg"))
+    canvas.save(svg=str(tmp_path / "saved.svg"))
+    css, plain, saved = (open(tmp_path / name).read()
+                         for name in ("css.svg", "plain.svg", "saved.svg"))
+    assert 'class="s0"' in css and "<style>" in css
+    assert "<style>" not in plain and 'fill="red"' in plain
+    assert saved == plain
+
+
+def test_unstyled_shapes_can_be_styled_in_place():
+    rect = Rectangle(width=10, height=5)
+    other = Rectangle(width=10, height=5)
+    group = Group([rect, other])
+    rect.style["fill"] = "blue"
+    group.style["stroke"] = "black"
+    assert other.style == {}  # nothing shared
+    svg = Canvas(group, 30, 20).render().asSvg()
+    assert 'fill="blue"' in svg and svg.count('stroke="black"') == 2
@@ -0,0 +1,75 @@
+"""
+Bounds and centers are cached per shape, and rebuilt once any of the fields
+they're computed from is reassigned.
+"""
+
+import warnings
+
+from pysmt.shortcuts import Real, Symbol
+from pysmt.typing import REAL
+
+from obsidian.geometry import Circle, Line, Point, Rectangle
+from obsidian.shape import Bounds
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def test_cached_until_an_input_changes():
+    rect = Rectangle(1, 2, 10, 5)
+    bounds, center = rect.bounds, rect.center
+    assert rect.bounds is bounds and rect.center is center
+    assert bounds.right_edge.simplify() == Real(11)
+
+    rect.style = {"fill": "red"}  # not an input
+    assert rect.bounds is bounds
+
+    rect.x = Real(3)
+    assert rect.bounds is not bounds
+    assert rect.bounds.right_edge.simplify() == Real(13)
+    assert rect.center is not center
+    assert rect.center.x.simplify() == Real(8)
+
+
+def test_symbolic_inputs():
+    circle = Circle(radius=2)
+    bounds = circle.bounds
+    x = Symbol("derived_x", REAL)
+    circle.x = x
+    assert circle.bounds is not bounds
+    assert circle.bounds.left_edge == x - Real(2)
+    assert circle.bounds is circle.bounds
+
+
+def test_dotted_inputs():
+    line = Line(Point(0, 0), Point(4, 2))
+    bounds = line.bounds
+    assert line.bounds is bounds
+    line.pt2.x = Real(6)  # reassigned inside one of the line's fields
+    assert line.bounds is not bounds
+    assert line.bounds.right_edge.simplify() == Real(6)
+
+    bounds = line.bounds
+    line.pt1 = Point(1, 1)  # or the field itself replaced
+    assert line.bounds is not bounds
+    assert line.bounds.left_edge.simplify() == Real(1)
+
+
+def test_width_and_height_are_lazy():
+    bounds = Bounds(Real(1), Real(4), Real(2), Real(7))
+    assert getattr(bounds, "_memo", None) is None  # nothing built yet
+    width = bounds.width
+    assert width.simplify() == Real(3)
+    assert bounds.width is width
+    assert set(bounds._memo) == {"width"}
+    assert bounds.height.simplify() == Real(5)
+
+    bounds.right_edge = Real(9)
+    assert bounds.width.simplify() == Real(8)
+
+
+def test_edge_aliases():
+    bounds = Rectangle(0, 0, 1, 1).bounds
+    bounds.upper_edge = Real(5)
+    assert bounds.top_edge is Real(5)
+    assert bounds.lower_edge is bounds.bottom_edge
@@ -0,0 +1,79 @@
+"""
+Display lists should flatten a group's tree once, and notice when the tree
+changes under them.
+"""
+
+import warnings
+
+from obsidian import Canvas, Group
+from obsidian.display import DisplayList
+from obsidian.geometry import Circle, Rectangle
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def tree():
+    a = Rectangle(0, 0, 10, 10, style={"fill": "red"})
+    b = Circle(20, 5, 5, style={"fill": "blue"})
+    c = Rectangle(30, 0, 5, 5, style={"fill": "green"})
+    inner = Group([b, c], style={"stroke": "black"})
+    return Group([a, inner], style={"opacity": 0.5}), inner, (a, b, c)
+
+
+def test_flattens_with_inherited_styles():
+    root, inner, shapes = tree()
+    display = DisplayList(root)
+    assert display.shapes == list(shapes)
+    assert display.styles[0] == {"opacity": 0.5}
+    assert display.styles[1] == display.styles[2] == {"opacity": 0.5, "stroke": "black"}
+    assert display.spans == [[0, 3], [1, 3]]
+
+
+def test_deep_trees():
+    root = leaf = Rectangle(0, 0, 1, 1, style={"fill": "red"})
+    for _ in range(5000):
+        root = Group([root])
+    display = DisplayList(root)
+    assert display.shapes == [leaf]
+    assert len(display.spans) == 5000
+
+
+def test_tree_changes_make_it_stale():
+    changes = [
+        lambda root, inner: inner.shapes.append(Circle(0, 0, 1, style={"fill": "red"})),
+        lambda root, inner: root.shapes.pop(),
+        lambda root, inner: inner.shapes.reverse(),
+        lambda root, inner: root.shapes.__setitem__(0, Circle(0, 0, 1, style={"fill": "red"})),
+        lambda root, inner: inner.style.update(stroke="red"),
+        lambda root, inner: setattr(root, "style", {}),
+    ]
+    for change in changes:
+        root, inner, _ = tree()
+        display = DisplayList(root)
+        assert display.is_current()
+        change(root, inner)
+        assert not display.is_current()
+
+
+def test_leaf_styles_can_change():
+    root, inner, (a, b, c) = tree()
+    canvas = Canvas(root, 40, 10, alignment=None)
+    canvas.render()
+    display = canvas.display
+    b.style = {"fill": "yellow"}
+    svg = canvas.render(use_cached_model=True).asSvg()
+    assert canvas.display is display and display.is_current()
+    assert "yellow" in svg
+
+
+def test_canvas_recompiles_when_stale():
+    root, inner, _ = tree()
+    canvas = Canvas(root, 40, 10, alignment=None)
+    canvas.render()
+    display = canvas.display
+    inner.shapes.append(Circle(35, 5, 2, style={"fill": "purple"}))
+    svg = canvas.render().asSvg()
+    assert canvas.display is not display
+    assert "purple" in svg
+    assert svg == Canvas(root, 40, 10, alignment=None).render().asSvg()
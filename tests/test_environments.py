@@ -0,0 +1,117 @@
+"""
+Sessions give the diagrams built inside them a pysmt environment of their
+own, which is freed when the session ends.
+"""
+
+import gc
+import threading
+import warnings
+import weakref
+
+import pysmt.environment
+import pysmt.shortcuts
+import pytest
+from pysmt.shortcuts import get_env
+
+import obsidian
+from obsidian import Canvas, Group, EQ
+from obsidian.environments import EnvironmentStack, SessionOrderError, counters
+from obsidian.geometry import Rectangle
+from obsidian.symbols import XorSymbol
+from obsidian.templates import templates
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def draw():
+    a = Rectangle(width=10, height=5, style={"fill": "red"})
+    b = Rectangle(width=4, height=4, style={"fill": "blue"})
+    canvas = Canvas(Group([a, b], [a.x + 12 |EQ| b.x, a.y |EQ| b.y]), margin=2)
+    return canvas.render().asSvg()
+
+
+def test_sessions_are_isolated_and_freed():
+    expected = draw()
+    outside = counters()
+    with obsidian.session() as s:
+        empty = s.counters()
+        assert empty["symbols"] == 0
+        assert draw() == expected
+        used = s.counters()
+        assert used["fnodes"] > 0 and used["symbols"] > 0
+        with obsidian.session() as inner:
+            draw()
+            assert s.counters() == used  # the inner session's terms are its own
+            assert inner.counters()["fnodes"] > 0
+    assert counters() == outside
+    with pytest.raises(RuntimeError):
+        s.counters()
+
+
+def test_memory_stays_flat():
+    draw()
+    outside = counters()
+    n_templates = len(templates)
+    sizes = []
+    for _ in range(10):
+        with obsidian.session() as s:
+            draw()
+            XorSymbol.instance(diameter=10)
+            sizes.append(s.counters())
+            env = weakref.ref(get_env())
+    assert counters() == outside
+    assert all(size == sizes[0] for size in sizes)
+    gc.collect()
+    assert env() is None
+    assert len(templates) == n_templates  # the sessions' templates went too
+
+
+def test_sessions_are_per_thread():
+    main_env = get_env()
+    envs = {}
+    barrier = threading.Barrier(2)
+
+    def work(name):
+        with obsidian.session():
+            barrier.wait()  # both sessions are open at once
+            envs[name] = get_env()
+            envs[name + " svg"] = draw()
+            barrier.wait()
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert get_env() is main_env
+    assert envs["a"] is not envs["b"] and main_env not in (envs["a"], envs["b"])
+    assert envs["a svg"] == envs["b svg"] == draw()
+
+
+def test_sessions_must_end_in_order():
+    outer, inner = obsidian.session(), obsidian.session()
+    outer.__enter__()
+    inner.__enter__()
+    with pytest.raises(SessionOrderError):
+        outer.__exit__(None, None, None)
+    inner.__exit__(None, None, None)
+    outer.__exit__(None, None, None)
+
+
+def test_reset_env_keeps_sessions_intact():
+    expected = draw()
+    with obsidian.session() as s:
+        env = get_env()
+        empty = s.counters()
+        draw()
+        pysmt.shortcuts.reset_env()
+        assert get_env() is env
+        assert s.counters() == empty
+        assert draw() == expected
+    assert get_env() is not env  # and the session ended without complaint
+
+    assert isinstance(pysmt.environment.ENVIRONMENTS_STACK, EnvironmentStack)
+    glob = get_env()
+    assert pysmt.environment.reset_env() is not glob
+    assert draw() == expected  # infix notation etc carried over
@@ -0,0 +1,92 @@
+"""
+Slotted shape classes, and Factory.many(), which builds shapes in bulk.
+"""
+
+import warnings
+from dataclasses import dataclass, fields
+
+import pytest
+from pysmt.fnode import FNode
+from pysmt.shortcuts import Real
+from pysmt.typing import REAL
+
+from obsidian.fields import SMTField
+from obsidian.geometry import Circle, Line, Point, Rectangle
+from obsidian.shape import Bounds, Shape
+from obsidian.symbols import Text
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def test_many_matches_the_factory():
+    factory = Rectangle.factory(width=10, height=5)
+    one, = factory.many(1)
+    other = factory()
+    for field in fields(Rectangle):
+        assert type(getattr(one, field.name)) is type(getattr(other, field.name))
+    assert one.width is Real(10) and one.height is Real(5)
+    assert one.x.is_symbol() and one.x is not other.x
+
+
+def test_fresh_values_per_shape():
+    circles = Circle.factory(radius=3).many(3, y=1)
+    assert len({circle.x for circle in circles}) == 3
+    assert all(circle.y is Real(1) and circle.radius is Real(3) for circle in circles)
+    circles[0].style["fill"] = "red"
+    assert circles[1].style == {}  # default styles aren't shared
+
+    lines = Line.factory().many(2)
+    assert lines[0].pt1 is not lines[1].pt1
+    assert lines[0].pt1.x is not lines[1].pt1.x
+
+
+def test_kwargs_take_precedence():
+    style = {"fill": "red"}
+    rects = Rectangle.factory(width=1, height=1, style=style).many(2, width=4)
+    assert all(rect.width is Real(4) and rect.style is style for rect in rects)
+    assert rects[0].bounds.right_edge == rects[0].x + Real(4)
+
+
+def test_bad_args():
+    with pytest.raises(TypeError):
+        Rectangle.factory(depth=1).many(2)
+    with pytest.raises(TypeError):
+        Text.factory().many(2)  # no text
+    texts = Text.factory(text="hi").many(2)
+    assert texts[0].text == "hi" and texts[0].font_size == 16
+
+
+@dataclass
+class Ring(Shape):
+    """Not slotted, and with a __post_init__ of its own."""
+    x: REAL = SMTField()
+    y: REAL = SMTField()
+    r: REAL = SMTField()
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.inner = self.r / 2
+
+    @property
+    def bounds(self):
+        return Bounds(self.x - self.r, self.x + self.r, self.y - self.r, self.y + self.r)
+
+
+def test_other_classes_go_through_init():
+    rings = Ring.factory(r=4).many(2)
+    assert rings[0].inner.simplify() == Real(2)
+    assert rings[0].x is not rings[1].x
+
+
+def test_slots():
+    point = Point(1, 2)
+    assert not hasattr(point, "__dict__")
+    with pytest.raises(AttributeError):
+        point.z = 3
+    assert isinstance(point.x, FNode)
+
+    @dataclass
+    class Labelled(Point):
+        label: str = ""
+    assert hasattr(Labelled(1, 2), "__dict__")  # not slotted itself
@@ -0,0 +1,66 @@
+"""
+Compact ShapeGrids should render exactly like regular ones, while only
+building the cells something actually asks for.
+"""
+
+import warnings
+
+import pytest
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Circle, Rectangle
+from obsidian.groups import ShapeGrid
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+FACTORIES = [
+    Rectangle.factory(width=10, height=6, style={"fill": "red"}),
+    Circle.factory(radius=4, style={"fill": "blue"}),
+]
+
+
+@pytest.mark.parametrize("factory", FACTORIES)
+def test_same_output_as_regular_grids(factory):
+    svgs = []
+    for compact in (False, True):
+        grid = ShapeGrid(w=5, h=4, spacing=3, factory=factory, compact=compact)
+        grid.shapes[7].style = {"fill": "green"}
+        svgs.append(Canvas(grid).render().asSvg())
+    assert svgs[0] == svgs[1]
+
+
+@pytest.mark.parametrize("factory", FACTORIES)
+def test_same_positions_as_regular_grids(factory):
+    grids = [ShapeGrid(w=4, h=3, spacing=2, factory=factory, compact=compact)
+             for compact in (False, True)]
+    for grid in grids:
+        bounds = grid.shapes[0].bounds
+        grid.constraints += [bounds.left_edge |EQ| 5, bounds.top_edge |EQ| 0]
+    positions = [grid.cell_positions(grid.solve()) for grid in grids]
+    assert list(positions[0][0]) == list(positions[1][0])
+    assert list(positions[0][1]) == list(positions[1][1])
+
+
+def test_cells_are_built_lazily():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Rectangle(width=2, height=2, style={"fill": "red"})
+
+    grid = ShapeGrid(w=100, h=100, spacing=1, factory=factory, compact=True)
+    assert len(grid.shapes) == 10000
+    grid.cell_positions(grid.solve())
+    assert len(calls) == 1
+    assert len(grid.shapes.cells) == 1
+    assert grid.shapes[-1] is grid.shapes[9999]
+    assert len(grid.shapes.cells) == 2
+    with pytest.raises(IndexError):
+        grid.shapes[10000]
+
+
+def test_no_compact_grids_of_groups():
+    with pytest.raises(TypeError):
+        ShapeGrid(w=2, h=2, spacing=1, compact=True,
+                  factory=lambda: Group([Rectangle(width=1, height=1)]))
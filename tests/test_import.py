@@ -0,0 +1,54 @@
+"""
+Importing obsidian mustn't load its heavy dependencies (numpy, scipy, drawSvg,
+Cairo, or for a bare `import obsidian`, pysmt and its solvers) up front. This
+runs benchmarks/import_time.py's checks, with the time budgets loosened, since
+test machines vary more than benchmark ones.
+"""
+
+import importlib.util
+import os
+import warnings
+from array import array
+
+import pytest
+
+import obsidian.groups
+import obsidian.solve
+from obsidian.geometry import Rectangle
+from obsidian.groups import ShapeGrid
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+SCALE = 3  # times each budget
+
+path = os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks", "import_time.py")
+spec = importlib.util.spec_from_file_location("import_time", path)
+import_time = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(import_time)
+
+
+@pytest.mark.parametrize("stmt", list(import_time.BUDGETS))
+def test_import_is_lazy(stmt):
+    elapsed, loaded = import_time.measure(stmt, runs=3)
+    assert loaded == []
+    assert elapsed <= import_time.BUDGETS[stmt] * SCALE
+
+
+def test_works_without_numpy(monkeypatch):
+    grids = [ShapeGrid(w=3, h=2, spacing=2, compact=compact,
+                       factory=Rectangle.factory(width=10, height=5))
+             for compact in (False, True)]
+    expected = [grid.cell_positions(grid.solve()) for grid in grids]
+
+    def available(name):
+        return name != "numpy"
+    monkeypatch.setattr(obsidian.solve, "available", available)
+    monkeypatch.setattr(obsidian.groups, "available", available)
+    for grid, positions in zip(grids, expected):
+        solution = grid.solve()
+        assert isinstance(solution.values, array)
+        lefts, tops = grid.cell_positions(solution)
+        assert isinstance(lefts, array)
+        assert list(lefts) == list(positions[0])
+        assert list(tops) == list(positions[1])
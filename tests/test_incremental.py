@@ -0,0 +1,38 @@
+"""
+The flow from obsidian.incremental's docstring: render a go board
+incrementally, add a stone to the canvas' group, and render again.
+"""
+
+import os
+import sys
+import warnings
+
+from obsidian import Canvas, EQ
+from obsidian.helpers import N
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+def test_incremental_go_board():
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    canvas = Canvas(board.get_group())
+    canvas.render(incremental=True)  # full solve
+    session = canvas.session
+    assert session.frames == []
+
+    stone = board.make_black_stone()
+    canvas.group.shapes.append(stone)
+    intersection = board.get_intersection(3, 3)
+    canvas.group.constraints.append(stone.center |EQ| intersection)
+    drawing = canvas.render(incremental=True)
+    assert canvas.session is session
+    assert [len(frame) for frame in session.frames] == [1]  # just the new constraint
+
+    model = canvas.model
+    assert N(model[stone.x]) == N(model[intersection.x])
+    assert N(model[stone.y]) == N(model[intersection.y])
+    assert drawing.asSvg() == canvas.render().asSvg()  # same as a full solve
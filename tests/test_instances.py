@@ -0,0 +1,59 @@
+"""
+Streamed output with instances=True writes repeated shapes and groups once,
+as defs, and places them with <use>. Defs referenced from styles (markers)
+are written once too.
+"""
+
+import io
+import warnings
+import xml.etree.ElementTree as ET
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Line, Point
+from obsidian.markers import arrow
+from obsidian.symbols import XorSymbol
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+SVG = "{http://www.w3.org/2000/svg}"
+XLINK = "{http://www.w3.org/1999/xlink}"
+STYLE = {"stroke": "black", "fill": "none"}
+
+
+def streamed(canvas, **kwargs):
+    out = io.StringIO()
+    canvas.render(use_cached_model=True, stream=out, **kwargs)
+    return out.getvalue()
+
+
+def test_repeated_groups_become_uses():
+    symbols = [XorSymbol(diameter=10, style=STYLE) for _ in range(5)]
+    placement = [symbol.center |EQ| Point(10 + 20 * i, 10) for i, symbol in enumerate(symbols)]
+    canvas = Canvas(Group(symbols, placement), 100, 20, alignment=None)
+    canvas.render()
+    plain = ET.fromstring(streamed(canvas))
+    instanced = ET.fromstring(streamed(canvas, instances=True))
+
+    assert len(plain.findall(f"{SVG}circle")) == 5
+    defs = instanced.findall(f"{SVG}defs/{SVG}g")
+    assert len(defs) == 1 and len(defs[0].findall(f"{SVG}circle")) == 1
+    uses = instanced.findall(f"{SVG}use")
+    assert len(uses) == 5
+    assert {use.get(f"{XLINK}href") for use in uses} == {"#" + defs[0].get("id")}
+    assert len({use.get("x") for use in uses}) == 5  # each in its own place
+
+
+def test_markers_are_defined_once_and_left_alone():
+    markers = [arrow(4, "red") for _ in range(3)]  # same content each time
+    lines = [Line(Point(0, i), Point(50, i + 5), {"stroke": "black", "marker_end": marker})
+             for i, marker in zip(range(0, 30, 10), markers)]
+    canvas = Canvas(Group(lines), 60, 60, alignment=None)
+    canvas.render()
+    first = streamed(canvas)
+    assert first.count("<marker") == 1
+    assert first.count('marker-end="url(#d0)"') == 3
+    # the writer's ids stay in the writer, so they can't leak into other
+    # documents (nor clash with ones written by other writers)
+    assert all(marker.id is None and "id" not in marker.args for marker in markers)
+    assert streamed(canvas) == first
@@ -0,0 +1,82 @@
+"""
+The sparse linear engine should solve linear equality systems exactly as the
+SMT solver would, and hand anything else back to it.
+"""
+
+import os
+import sys
+import warnings
+
+import pytest
+from pysmt.shortcuts import And, Equals, Max, Real, Symbol, Times
+from pysmt.typing import REAL
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Rectangle
+from obsidian.infix import LEFT_BY
+from obsidian.linear import linearize, solve_linear
+from obsidian.solve import AUTO, LINEAR, SMT, EngineError
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+def symbols():
+    # made per test, since other tests may replace the global environment
+    return Symbol("lin_x", REAL), Symbol("lin_y", REAL)
+
+
+def test_solves_linear_systems():
+    x, y = symbols()
+    formula = And(Equals(x + Real(2) * y, Real(4)), Equals(x - y, Real(1)))
+    assert len(linearize(formula)) == 2
+    assert solve_linear(formula) == {x: 2, y: 1}
+
+
+def test_underdetermined_systems_get_minimum_norm():
+    x, y = symbols()
+    assert solve_linear(Equals(x + y, Real(2))) == {x: 1, y: 1}
+
+
+def test_inconsistent_systems_are_left_to_smt():
+    x, y = symbols()
+    assert solve_linear(And(Equals(x, Real(1)), Equals(x, Real(2)))) is None
+
+
+def test_non_linear_formulas_are_refused():
+    x, y = symbols()
+    assert linearize(Equals(Times(x, y), Real(2))) is None
+    assert linearize(Equals(Max(x, y), Real(2))) is None
+    assert linearize(x < y) is None
+    group = Group([Rectangle(width=1, height=1)], [Equals(Max(x, y), Real(2))])
+    with pytest.raises(EngineError):
+        group.solve(engine=LINEAR)
+    assert group.solve(engine=AUTO) is not None  # falls back to SMT
+
+
+def test_same_output_as_smt():
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    for i in range(3):
+        board.add_stone("BW"[i % 2], i, 2 * i)
+    # the board has inequalities, so AUTO mixes both engines across components
+    canvases = [Canvas(board.get_group()) for engine in (SMT, AUTO)]
+    svgs = [canvas.render(engine=engine, profile=True).asSvg()
+            for canvas, engine in zip(canvases, (SMT, AUTO))]
+    assert svgs[0] == svgs[1]
+    assert "linear" not in canvases[0].stats.times
+    assert "linear" in canvases[1].stats.times
+
+
+def test_same_solution_as_smt():
+    a, b = Rectangle(width=10, height=5), Rectangle(width=3, height=4)
+    group = Group([a, b], [a |LEFT_BY(2)| b, a.x |EQ| 1, a.y |EQ| b.y + 0.5,
+                          b.y |EQ| 2])
+    smt = group.solve(engine=SMT, presolve=False, split=False)
+    linear = group.solve(engine=LINEAR, presolve=False, split=False)
+    for term in (a.x, a.y, b.x, b.y):
+        assert linear.value(term) == pytest.approx(smt.value(term))
+    assert linear.value(b.x) == 13
+    assert linear.value(a.y) == 2.5
@@ -0,0 +1,117 @@
+"""
+merge=True should fold runs of same-styled lines (and plain filled rects)
+into single paths, and precision=n should round coordinates, without changing
+what's drawn.
+"""
+
+import io
+import warnings
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from obsidian import Canvas, Group
+from obsidian.geometry import Circle, Line, Point, Rectangle
+from obsidian.markers import arrow
+from obsidian.stream import rounder
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+SVG = "{http://www.w3.org/2000/svg}"
+LINE = {"stroke": "black"}
+
+
+def elements(root):
+    return [el for el in root if el.tag != f"{SVG}defs"]
+
+
+def streamed(shapes, **kwargs):
+    """Returns the elements drawn for `shapes`, leaving out the defs."""
+    canvas = Canvas(Group(shapes), 100, 100, alignment=None)
+    out = io.StringIO()
+    canvas.render(stream=out, **kwargs)
+    return elements(ET.fromstring(out.getvalue()))
+
+
+def lines(n, style=LINE):
+    return [Line(Point(0, 2 * i), Point(50, 2 * i + 1), style=style)
+            for i in range(n)]
+
+
+def rects(n, style):
+    return [Rectangle(3 * i, 0, 2, 2, style=style) for i in range(n)]
+
+
+def test_lines_are_merged():
+    shapes = lines(5)
+    plain = streamed(shapes)
+    merged = streamed(shapes, merge=True)
+    assert len(plain) == 5
+    path, = merged
+    assert path.get("d") == " ".join(el.get("d") for el in plain)
+    assert path.get("stroke") == "black"
+
+
+def test_filled_rects_are_merged():
+    merged = streamed(rects(4, {"fill": "red"}), merge=True)
+    path, = merged
+    assert path.tag == f"{SVG}path"
+    assert path.get("d").count("Z") == 4
+    assert path.get("d").startswith("M0.0,")
+
+
+@pytest.mark.parametrize("style", [
+    {"fill": "red", "stroke": "black"},
+    {"fill": "red", "fill_opacity": 0.5},
+    {"fill": "red", "rx": 1},
+])
+def test_some_rects_are_left_alone(style):
+    merged = streamed(rects(3, style), merge=True)
+    assert [el.tag for el in merged] == [f"{SVG}rect"] * 3
+
+
+def test_lines_with_markers_are_left_alone():
+    style = {"stroke": "black", "marker_end": arrow(4, "black")}
+    merged = streamed(lines(3, style), merge=True)
+    assert [el.tag for el in merged] == [f"{SVG}path"] * 3
+
+
+def test_runs_end_at_style_changes():
+    shapes = lines(2) + lines(2, {"stroke": "red"}) + [Circle(5, 5, 1, style=LINE)] + lines(1)
+    merged = streamed(shapes, merge=True)
+    assert [el.tag[len(SVG):] for el in merged] == ["path", "path", "circle", "path"]
+    assert [el.get("d").count("M") for el in merged if el.tag == f"{SVG}path"] == [2, 2, 1]
+    assert merged[-1].attrib == streamed(shapes)[-1].attrib  # written as is
+
+
+def test_rounder():
+    num = rounder(2)
+    assert num(1.23456) == "1.23"
+    assert num(2.0) == "2"
+    assert num(10.5) == "10.5"
+    assert num(-0.001) == "0"
+    assert rounder(0)(2.6) == "3"
+
+
+def test_precision():
+    shapes = [Rectangle(1 / 3, 2 / 3, 10, 10, style={"fill": "red"}),
+              Circle(50 / 3, 5, 1, style={"fill": "blue"}),
+              Line(Point(0.123456, 1), Point(2, 3), style=LINE)]
+    plain = streamed(shapes)
+    rounded = streamed(shapes, precision=2)
+    rect, circle, path = rounded
+    assert (rect.get("x"), rect.get("y")) == ("0.33", "-99.33")
+    assert circle.get("cx") == "16.67"
+    assert path.get("d").startswith("M0.12,")
+    for a, b in zip(plain, rounded):
+        for name in ("x", "y", "cx", "cy"):
+            if a.get(name) is not None:
+                assert float(b.get(name)) == pytest.approx(float(a.get(name)), abs=0.005)
+
+
+def test_save_svg(tmp_path):
+    canvas = Canvas(Group(lines(3)), 100, 100, alignment=None)
+    canvas.save_svg(tmp_path / "out.svg", merge=True, precision=1)
+    path, = elements(ET.parse(tmp_path / "out.svg").getroot())
+    assert path.get("d") == "M0,-100 L50,-99 M0,-98 L50,-97 M0,-96 L50,-95"
@@ -0,0 +1,77 @@
+"""
+Named shape lookups go through a per-group NameIndex, which is thrown away
+whenever any group's shapes or names change.
+"""
+
+import warnings
+
+import pytest
+
+from obsidian import Group
+from obsidian.geometry import Rectangle
+from obsidian.groups import AmbiguousNameError, NameDict
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def tree():
+    a, b, c = (Rectangle(width=1, height=1) for _ in range(3))
+    inner = Group({"b": b, "c": c})
+    outer = Group({"a": a, None: [inner]})
+    return outer, inner, a, b, c
+
+
+def test_lookup():
+    outer, inner, a, b, c = tree()
+    assert outer["a"] is a and outer["c"] is c
+    assert outer.lookup("b") == (b, inner)
+    assert "b" in outer and "a" not in inner
+    with pytest.raises(KeyError):
+        outer["nope"]
+
+
+def test_ambiguous_names():
+    outer, inner, a, b, c = tree()
+    inner.named_shapes["a"] = c
+    with pytest.raises(AmbiguousNameError):
+        outer["a"]
+    assert inner["a"] is c  # only ambiguous from further up
+    with pytest.raises(AmbiguousNameError):
+        list(outer.items())
+    assert len(list(outer.items(ignore_duplicates=True))) == 5  # both "a"s
+
+
+def test_index_invalidated_by_changes():
+    outer, inner, a, b, c = tree()
+    index = outer.name_index()
+    assert outer.name_index() is index  # nothing changed, so it's reused
+
+    d = Rectangle(width=1, height=1)
+    inner.named_shapes["d"] = d  # deep down, without telling outer
+    assert outer["d"] is d
+    assert outer.name_index() is not index
+
+    inner.named_shapes.pop("d")
+    assert "d" not in outer
+    inner.shapes.append(Group({"e": d}))
+    assert outer["e"] is d
+
+
+def test_rename():
+    outer, inner, a, b, c = tree()
+    outer.rename("b", "bee")
+    assert outer["bee"] is b and "b" not in outer
+    assert list(inner.named_shapes) == ["bee", "c"]  # keeps its place
+    with pytest.raises(AmbiguousNameError):
+        outer.rename("bee", "a")
+    with pytest.raises(KeyError):
+        outer.rename("b", "x")
+
+
+def test_name_dict_counts_changes():
+    names = NameDict()
+    names["x"] = 1
+    names.update(y=2)
+    names.setdefault("z", 3)
+    assert names.version == 3
@@ -0,0 +1,105 @@
+"""
+save_png() draws straight onto cairo when it can, and goes via SVG (as drawSvg
+would) when a style has something the cairo renderers can't draw.
+"""
+
+import warnings
+
+import obsidian.canvas
+from obsidian import Canvas, Group
+from obsidian.canvas import cairo_can_draw, cairo_can_paint, parse_color
+from obsidian.display import DisplayList
+from obsidian.geometry import Point, Rectangle, Line
+from obsidian.markers import arrow
+from obsidian.symbols import Text
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def test_parse_color():
+    assert parse_color("red") == (1, 0, 0)
+    assert parse_color("#fff") == (1, 1, 1)
+    assert parse_color(" None ") is None
+
+
+def test_cairo_can_paint():
+    assert cairo_can_paint({"fill": "#123456", "stroke": "black", "stroke-width": 2})
+    assert cairo_can_paint({"text_anchor": "start", "font_weight": "bold"})
+    for style in ({"fill": "darkgray"}, {"stroke": "rgb(1, 2, 3)"},
+                  {"stroke_dasharray": "3 2"}, {"stroke-linecap": "round"},
+                  {"marker_end": arrow(4, "black")}, {"text_anchor": "inherit"}):
+        assert not cairo_can_paint(style)
+
+
+def test_cairo_can_draw():
+    rect = Rectangle(width=10, height=5, style={"fill": "red"})
+    line = Line(style={"stroke": "black"})
+    group = Group([rect, line], style={"stroke_width": 2})
+    assert cairo_can_draw(DisplayList(group))
+    assert not cairo_can_draw(DisplayList(group), bg_color="hsl(0, 0%, 50%)")
+
+    group.style["stroke_dasharray"] = "3 2"  # inherited by both shapes
+    assert not cairo_can_draw(DisplayList(group))
+    del group.style["stroke_dasharray"]
+    line.style["marker_end"] = arrow(4, "black")
+    assert not cairo_can_draw(DisplayList(group))
+
+
+def test_raster_skipped_for_unsupported_styles():
+    # nothing here reaches cairo, so this runs without libcairo too
+    rect = Rectangle(width=10, height=5, style={"fill": "darkgray"})
+    canvas = Canvas(Group([rect]), margin=4)
+    canvas.render(raster=True)
+    assert canvas.rendered is not None and canvas.raster is None
+    assert canvas.can_save_png()  # via the SVG drawing, without rendering again
+
+
+class RecordingContext:
+    """Stands in for a cairo.Context (libcairo may not be installed), and
+    records the calls made to it."""
+
+    def __init__(self, surface):
+        surface.context = self
+        self.calls = []
+
+    def text_extents(self, text):
+        return (0, 0, 0, 0, 8.0 * len(text), 0)
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+
+class RecordingSurface:
+    context = None
+
+    def __init__(self, fmt, width, height):
+        self.size = (width, height)
+
+    def write_to_png(self, fname):
+        with open(fname, "wb") as f:
+            f.write(b"PNG")
+
+
+class RecordingCairo:
+    FORMAT_ARGB32 = FONT_SLANT_NORMAL = FONT_WEIGHT_NORMAL = 0
+    FONT_WEIGHT_BOLD = 1
+    ImageSurface = RecordingSurface
+    Context = RecordingContext
+
+
+def test_dashed_keys_reach_cairo(monkeypatch, tmp_path):
+    monkeypatch.setattr(obsidian.canvas, "cairo", RecordingCairo)
+    line = Line(Point(0, 0), Point(10, 0), style={"stroke": "black", "stroke-width": 3,
+                                                  "stroke-opacity": 0.5})
+    text = Text("hi", 10, Point(5, 5), {"font-family": "serif", "font-weight": "bold",
+                                        "text-anchor": "start"})
+    canvas = Canvas(Group([line, text]), 40, 20, alignment=None)
+    canvas.save_png(str(tmp_path / "out.png"))
+    assert canvas.raster is not None  # drawn by cairo, not via SVG
+    calls = canvas.raster.context.calls
+    assert ("set_line_width", (3.0,)) in calls
+    assert ("set_source_rgba", (0.0, 0.0, 0.0, 0.5)) in calls
+    assert ("select_font_face", ("serif", 0, 1)) in calls
+    text_x = [args[0] for name, args in calls if name == "move_to"][-1]
+    assert text_x == 5  # anchored at the start, not the middle
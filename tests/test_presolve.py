@@ -0,0 +1,77 @@
+"""
+Presolving should shrink formulas without changing their solutions.
+"""
+
+import os
+import sys
+import warnings
+
+from pysmt.shortcuts import And, Equals, Max, Real, Symbol, TRUE
+from pysmt.typing import REAL
+
+from obsidian import Canvas
+from obsidian.presolve import presolve_formula
+from obsidian.solve import solve_formula
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+def symbols():
+    # made per test, since other tests may replace the global environment
+    return [Symbol(f"pre_{name}", REAL) for name in "abcd"]
+
+
+def test_aliases_and_constants_are_eliminated():
+    a, b, c, d = symbols()
+    formula = And(Equals(a, b), Equals(b + Real(1), c), Equals(c, Real(3)),
+                  Equals(Real(2) * d, a))
+    presolved = presolve_formula(formula)
+    assert presolved.formula == TRUE()
+    assert presolved.stats.symbols_removed == 4
+    assert presolved.stats.constraints_removed == 4
+    assert presolved.expand({}) == {a: 2, b: 2, c: 3, d: 1}
+
+
+def test_substitution_exposes_more_constants():
+    a, b, c, d = symbols()
+    # the Max only becomes linear once a and b are known
+    formula = And(Equals(c, Max(a, b)), Equals(a, Real(1)), Equals(b, Real(4)))
+    presolved = presolve_formula(formula)
+    assert presolved.formula == TRUE()
+    assert presolved.expand({})[c] == 4
+
+
+def test_residual_formula():
+    a, b, c, d = symbols()
+    formula = And(Equals(a, b), a < c, Equals(d, Real(5)))
+    presolved = presolve_formula(formula)
+    assert presolved.formula.get_free_variables() <= {a, b, c}
+    assert len(presolved.formula.get_free_variables()) == 2
+    assert presolved.stats.symbols_removed == 2
+    assert presolved.stats.constraints_removed == 2
+
+    model = solve_formula(formula, presolve=True)
+    assert model.get_py_value(a) == model.get_py_value(b)
+    assert model.get_py_value(a) < model.get_py_value(c)
+    assert model.get_py_value(d) == 5
+    assert model.presolve_stats == presolved.stats
+
+
+def test_contradictions_are_left_to_the_engine():
+    a, b, c, d = symbols()
+    formula = And(Equals(a, Real(1)), Equals(b, a), Equals(b, Real(2)))
+    assert not presolve_formula(formula).formula.is_true()
+    assert solve_formula(formula, presolve=True) is None
+
+
+def test_same_output_with_and_without_presolve():
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    for i in range(4):
+        board.add_stone("BW"[i % 2], 2 * i, i)
+    svgs = [Canvas(board.get_group()).render(presolve=presolve).asSvg()
+            for presolve in (False, True)]
+    assert svgs[0] == svgs[1]
@@ -0,0 +1,97 @@
+"""
+render_many() should give the same SVG whether it renders serially, on a
+thread pool or on a process pool, and rendering from several threads (or
+asyncio tasks) at once should be safe.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import pytest
+from pysmt.shortcuts import get_env
+
+import obsidian
+from obsidian import Canvas, render_many
+from obsidian.environments import counters
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+
+# builders are module-level, so that they can be sent to other processes
+def board(stones=3):
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    for i in range(stones):
+        board.add_stone("BW"[i % 2], i, (2 * i) % 9)
+    return Canvas(board.get_group())
+
+
+def svg(canvas, **kwargs):
+    out = io.StringIO()
+    canvas.render(stream=out, **kwargs)
+    return out.getvalue()
+
+
+JOBS = [board, partial(board, 5), partial(board, 0)] * 2
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return [svg(job()) for job in JOBS]
+
+
+def test_serial(expected):
+    assert render_many(JOBS) == expected
+    assert render_many([job() for job in JOBS]) == expected
+
+
+def test_functions_render_in_sessions(expected):
+    render_many(JOBS[:1])  # (first use sets up things like infix notation)
+    before = counters()
+    assert render_many(JOBS) == expected
+    assert counters() == before
+
+
+def test_thread_pool(expected):
+    with ThreadPoolExecutor(4) as executor:
+        assert render_many(JOBS, executor=executor) == expected
+        # canvases sharing the global environment take turns
+        canvases = [job() for job in JOBS]
+        assert render_many(canvases, executor=executor) == expected
+
+
+def test_process_pool(expected):
+    with ProcessPoolExecutor(2) as executor:
+        assert render_many(JOBS, executor=executor) == expected
+        with pytest.raises(TypeError):
+            render_many([board()], executor=executor)
+
+
+def test_kwargs_are_passed_on(expected):
+    rounded = render_many(JOBS[:1], precision=1)
+    assert rounded != expected[:1]
+    assert rounded == [svg(board(), precision=1)]
+
+
+def test_asyncio_tasks(expected):
+    async def task(job):
+        with obsidian.session() as s:
+            await asyncio.sleep(0.01)  # let the other tasks enter theirs
+            assert get_env() is s.env
+            canvas = job()
+            await asyncio.sleep(0.01)
+            assert get_env() is s.env
+            return svg(canvas)
+
+    async def main():
+        return await asyncio.gather(*map(task, JOBS))
+
+    assert asyncio.run(main()) == expected
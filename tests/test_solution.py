@@ -0,0 +1,64 @@
+"""
+Solutions should read like pysmt models, read many values at once, and
+survive a trip through pickle.
+"""
+
+import pickle
+import warnings
+
+from pysmt.shortcuts import Real, Symbol
+from pysmt.typing import REAL
+
+from obsidian import Group, EQ
+from obsidian.geometry import Rectangle
+from obsidian.groups import ShapeGrid
+from obsidian.infix import LEFT_BY
+from obsidian.solve import Solution
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def test_reads_like_a_model():
+    a, b = Symbol("sol_a", REAL), Symbol("sol_b", REAL)
+    solution = Solution({a: 1.5, b: 4})
+    assert len(solution) == 2 and a in solution
+    assert solution[a] == Real(1.5)
+    assert solution.get_value(b) == Real(4)
+    assert solution.value(a) == 1.5
+    assert type(solution.value(b)) is float
+    assert solution.value(a * 2 + b) == 7
+    assert solution.value(Real(3)) == 3
+    assert solution.value(Symbol("sol_unknown", REAL)) == 0
+
+
+def test_values_of_and_field():
+    grid = ShapeGrid(w=3, h=2, spacing=2,
+                     factory=Rectangle.factory(width=10, height=5))
+    grid.constraints += [grid.shapes[0].x |EQ| 1, grid.shapes[0].y |EQ| 0]
+    solution = grid.solve()
+    assert list(solution.field(grid.shapes, "x")) == [1, 13, 25] * 2
+    assert list(solution.field(grid.shapes, "bounds.bottom_edge")) == [5] * 3 + [12] * 3
+    shape = grid.shapes[4]
+    assert list(solution.values_of([shape.x, shape.x + shape.width])) == [13, 23]
+
+
+def test_pickling():
+    a, b = Rectangle(width=10, height=5), Rectangle(width=3, height=4)
+    group = Group([a, b], [a |LEFT_BY(2)| b, a.x |EQ| 1, a.y |EQ| 0, b.y |EQ| 3])
+    solution = group.solve()
+    assert solution.presolve_stats is not None
+
+    copy = pickle.loads(pickle.dumps(solution))
+    assert copy.symbols == solution.symbols  # same names, same environment
+    assert copy.presolve_stats == solution.presolve_stats
+    for term in (a.x, b.x, b.y, b.x + b.width):
+        assert copy.value(term) == solution.value(term)
+    assert copy.value(b.x) == 13
+
+
+def test_pickles_symbols_by_name():
+    a = Symbol("sol_named", REAL)
+    data = pickle.dumps(Solution({a: 2}))
+    assert b"sol_named" in data
+    assert pickle.loads(data).value(a) == 2
@@ -0,0 +1,89 @@
+"""
+Profiled renders should time their phases and count what they did, without
+changing the output; unprofiled ones shouldn't keep any stats at all.
+"""
+
+import io
+import warnings
+
+from pysmt.shortcuts import Equals, Real, Symbol
+from pysmt.typing import REAL
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Circle, Rectangle
+from obsidian.infix import LEFT_BY
+from obsidian.stats import NULL_STATS, RenderStats, active, dag_size, recording
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+
+def group():
+    a = Rectangle(width=10, height=5, style={"fill": "red"})
+    b = Rectangle(width=3, height=4, style={"fill": "blue"})
+    c = Circle(radius=2, style={"fill": "green"})
+    return Group([a, Group([b, c], [c.x |EQ| b.x, c.y |EQ| b.y])],
+                 [a |LEFT_BY(2)| b, a.y |EQ| b.y])
+
+
+def test_profiled_render():
+    g = group()
+    canvas = Canvas(g)
+    svg = canvas.render(profile=True).asSvg()
+    assert svg == Canvas(g).render().asSvg()
+
+    stats = canvas.stats
+    for phase in ("align", "constraints", "solve", "presolve", "render"):
+        assert stats.times[phase] >= 0
+    assert stats.times["solve"] >= stats.times["presolve"]
+    aligned = Group([g], canvas.get_align_rules())
+    assert stats.counters["constraints"] == len(aligned.constraints)
+    assert stats.counters["solver_calls"] >= 1
+    assert stats.counters["symbols"] > 0
+    assert stats.counters["dag_size"] > stats.counters["symbols"]
+    assert stats.shapes == {"Rectangle": 2, "Circle": 1}
+    assert stats.as_dict()["shapes"] == {"Rectangle": 2, "Circle": 1}
+    assert "solve" in stats.report()
+
+
+def test_unprofiled_render():
+    canvas = Canvas(group())
+    canvas.render()
+    assert canvas.stats is None
+    assert active() is NULL_STATS
+
+
+def test_hooks():
+    calls = []
+    canvas = Canvas(group())
+    canvas.render(hooks=[lambda phase, t, stats: calls.append((phase, stats))])
+    assert canvas.stats is not None
+    phases = [phase for phase, _ in calls]
+    assert phases[0] == "align"
+    assert "solve" in phases and "render" in phases
+    assert all(stats is canvas.stats for _, stats in calls)
+
+
+def test_output_bytes():
+    canvas = Canvas(group())
+    stream = io.StringIO()
+    canvas.render(profile=True, stream=stream)
+    assert canvas.stats.counters["output_bytes"] == len(stream.getvalue())
+
+
+def test_phases_accumulate_and_nest():
+    stats = RenderStats()
+    with recording(stats):
+        assert active() is stats
+        for _ in range(3):
+            with stats.phase("outer"), stats.phase("inner"):
+                stats.count("things")
+    assert active() is NULL_STATS
+    assert stats.counters["things"] == 3
+    assert stats.times["outer"] >= stats.times["inner"] > 0
+
+
+def test_dag_size():
+    x = Symbol("stats_x", REAL)
+    term = x + x
+    assert dag_size(Equals(term * term, Real(1))) == 5
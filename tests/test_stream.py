@@ -0,0 +1,81 @@
+"""
+Streamed output should be the same document drawSvg would have produced.
+"""
+
+import io
+import os
+import sys
+import warnings
+import xml.etree.ElementTree as ET
+
+from obsidian import Canvas, Group, EQ
+from obsidian.geometry import Circle, Line, Point, Rectangle
+from obsidian.markers import arrow
+from obsidian.symbols import Text
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "examples"))
+from go_board import GoBoard  # noqa: E402
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def streamed(canvas, **kwargs):
+    out = io.StringIO()
+    canvas.render(use_cached_model=True, stream=out, **kwargs)
+    return out.getvalue()
+
+
+def board():
+    board = GoBoard(300, 300, 20, rows=9, cols=9)
+    for i in range(5):
+        board.add_stone("BW"[i % 2], i, (3 * i) % 9)
+    return Canvas(board.get_group(), bg_color="#eeeeee")
+
+
+def test_same_as_drawsvg():
+    canvas = board()
+    assert streamed(canvas) == canvas.render().asSvg()
+
+
+def test_same_shapes_as_drawsvg():
+    rect = Rectangle(5, 5, 20, 10, style={"fill": "red", "stroke_width": 2})
+    circle = Circle(40, 10, 5, style={"fill": "blue"})
+    text = Text("a < b & c", 12, Point(10, 30), style={"fill": "black"})
+    line = Line(Point(0, 40), Point(50, 40), style={"stroke": "black"})
+    canvas = Canvas(Group([rect, circle, text, line]), 60, 50, alignment=None)
+    assert streamed(canvas) == canvas.render().asSvg()
+
+
+def test_markers_are_defined_before_use():
+    style = {"stroke": "black", "marker_end": arrow(4, "black")}
+    lines = [Line(Point(0, 10 * i), Point(50, 10 * i), style=style)
+             for i in range(1, 4)]
+    canvas = Canvas(Group(lines), 60, 40, alignment=None)
+    drawn = ET.fromstring(canvas.render().asSvg())
+    out = streamed(canvas)
+    root = ET.fromstring(out)
+
+    # only the position of the defs may differ
+    def shapes(root):
+        return [(el.tag, el.attrib) for el in root if el.tag != f"{SVG}defs"]
+    assert shapes(root) == shapes(drawn)
+    marker, = root.findall(f".//{SVG}marker")
+    assert out.index(f'id="{marker.get("id")}"') < out.index("marker-end=")
+
+
+def test_save_svg_stream(tmp_path):
+    canvas = board()
+    canvas.save_svg(tmp_path / "plain.svg")
+    canvas.save_svg(tmp_path / "streamed.svg", stream=True)
+    with open(tmp_path / "plain.svg") as plain, open(tmp_path / "streamed.svg") as out:
+        assert plain.read() == out.read()
+
+
+def test_binary_streams():
+    canvas = board()
+    out = io.BytesIO()
+    canvas.render(stream=out)
+    assert out.getvalue().decode() == canvas.render().asSvg()
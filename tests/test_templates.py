@@ -0,0 +1,100 @@
+"""
+Template instances should render exactly like the groups they stand in for,
+while only adding an offset to the formula.
+"""
+
+import io
+import warnings
+from dataclasses import dataclass
+
+import pytest
+from pysmt.shortcuts import Symbol
+from pysmt.typing import REAL
+
+from obsidian import Canvas, Group, EQ
+from obsidian.arrange import center_align_y
+from obsidian.environments import session
+from obsidian.fields import SMTField, STYLE, StyleField
+from obsidian.geometry import Circle, Line, Point, Rectangle
+from obsidian.infix import LEFT_BY
+from obsidian.symbols import EqSymbol, XorSymbol
+from obsidian.templates import Instance
+
+
+warnings.simplefilter("ignore")  # pysmt's deprecation warnings
+
+STROKE = {"stroke": "black", "stroke_width": 1}
+
+
+@dataclass
+class Tagged(Group):
+    """A box with a named dot in its corner."""
+    width: REAL = SMTField()
+    style: STYLE = StyleField()
+
+    def __post_init__(self):
+        box = Rectangle(width=self.width, height=5, style=self.style)
+        dot = Circle(radius=1, style=self.style)
+        self.shapes.extend([box, dot])
+        self.named_shapes["dot"] = dot
+        self.constraints += [dot.center |EQ| Point(box.x, box.y)]
+
+
+def row(n, instanced):
+    make = (lambda cls, **kwargs: cls.instance(**kwargs)) if instanced else (
+        lambda cls, **kwargs: cls(**kwargs))
+    shapes = [make(XorSymbol, diameter=20, style=STROKE) if i % 2 == 0
+              else make(EqSymbol, w=20, h=6, style=STROKE) for i in range(n)]
+    constraints = [a |LEFT_BY(5)| b for a, b in zip(shapes, shapes[1:])]
+    constraints.append(center_align_y(shapes))
+    return Canvas(Group(shapes, constraints), margin=4)
+
+
+def streamed(canvas):
+    out = io.StringIO()
+    canvas.render(stream=out, precision=6)  # (float noise aside)
+    return out.getvalue()
+
+
+def test_same_output_as_plain_groups():
+    assert streamed(row(10, False)) == streamed(row(10, True))
+
+
+def test_fewer_symbols_and_constraints():
+    counters = []
+    for instanced in (False, True):
+        canvas = row(20, instanced)
+        canvas.render(profile=True)
+        counters.append(canvas.stats.counters)
+    plain, instanced = counters
+    assert instanced["symbols"] < plain["symbols"]
+    assert instanced["constraints"] < plain["constraints"]
+
+
+def test_prototypes_are_cached():
+    a, b = XorSymbol.instance(diameter=10), XorSymbol.instance(diameter=10)
+    assert isinstance(a, Instance)
+    assert a.template is b.template
+    assert a.x is not b.x
+    assert XorSymbol.instance(diameter=12).template is not a.template
+    with session():
+        assert XorSymbol.instance(diameter=10).template is not a.template
+
+
+def test_named_shapes_can_be_constrained():
+    tagged = Tagged.instance(width=30, style={"fill": "red"})
+    line = Line(Point(0, 0), tagged["dot"].center, style=STROKE)
+    group = Group([tagged, line], [tagged.bounds.left_edge |EQ| 10,
+                                   tagged.bounds.top_edge |EQ| 20])
+    solution = group.solve()
+    # the dot sticks out by its radius, past the box's corner
+    assert solution.value(line.pt2.x) == 11
+    assert solution.value(line.pt2.y) == 21
+    assert solution.value(tagged.bounds.right_edge) == 41
+
+
+def test_arguments_must_be_constants():
+    with pytest.raises(ValueError):
+        XorSymbol.instance(style=STROKE)  # no diameter
+    with pytest.raises(ValueError):
+        XorSymbol.instance(diameter=Symbol("tmpl_d", REAL) + 1)